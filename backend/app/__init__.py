@@ -44,6 +44,10 @@ def create_app(config_name='default'):
 
     socketio.init_app(app, **socketio_config)
 
+    # 初始化响应编码器
+    from app.utils.response import init_response_encoder
+    init_response_encoder(app)
+
     # 配置日志
     setup_logging(app)
 
@@ -54,7 +58,7 @@ def create_app(config_name='default'):
     register_socketio_handlers()
 
     # 初始化定时任务
-    if not app.config.get('TESTING'):
+    if not app.config.get('TESTING') and app.config.get('SCHEDULER_ENABLED', True):
         init_scheduler(app)
 
     # 创建上传目录
@@ -102,7 +106,6 @@ def register_socketio_handlers():
 
 
 def init_scheduler(app):
-    """初始化定时任务"""
-    with app.app_context():
-        from app.services.scheduler_service import init_scheduler
-        init_scheduler()
+    """初始化定时任务，任务执行时复用当前应用实例"""
+    from app.services.scheduler_service import init_scheduler
+    init_scheduler(app)
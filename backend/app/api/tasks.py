@@ -1,10 +1,14 @@
 """
 任务管理API
 """
-from flask import Blueprint, request, send_file
-from app.services.task_service import TaskService
-from app.utils.response import success_response, error_response, login_required, get_current_user
-from app.models.task_transfer import TaskTransfer
+from flask import Blueprint, Response, request, send_file, stream_with_context
+from app.services.task_service import TaskService, TaskConflictError
+from app.services.export_service import ExportService
+from app.services.analytics_service import AnalyticsService
+from app.services.warning_service import WarningService
+from app.services.recurrence_service import RecurrenceService
+from app.utils.response import success_response, error_response, login_required, admin_required, \
+    get_current_user, make_etag, conditional_response, json_response
 from app.models.task_comment import TaskComment
 from app.models.task_attachment import TaskAttachment
 from datetime import datetime
@@ -15,6 +19,20 @@ from app import db
 tasks_bp = Blueprint('tasks', __name__)
 
 
+def parse_task_filters():
+    """从查询参数解析任务列表筛选条件"""
+    filters = {
+        'search': request.args.get('search', ''),
+        'status': request.args.get('status', ''),
+        'category': request.args.get('category', ''),
+        'current_handler_id': request.args.get('current_handler_id', type=int),
+        'creator_id': request.args.get('creator_id', type=int)
+    }
+
+    # 移除空值
+    return {k: v for k, v in filters.items() if v}
+
+
 @tasks_bp.route('', methods=['GET'])
 @login_required
 def get_tasks():
@@ -22,20 +40,117 @@ def get_tasks():
     try:
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
+        filters = parse_task_filters()
+
+        # 稀疏字段集，例如 fields=id,title,status
+        fields = TaskService.parse_list_fields(request.args.get('fields', ''))
+
+        # 总数统计方式: exact(默认) / estimate / none，游标分页默认不统计
+        count_mode = request.args.get('count')
+        if count_mode and count_mode not in TaskService.COUNT_MODES:
+            return error_response('count参数只能是exact、estimate或none')
+
+        def build_response():
+            # 携带 cursor 参数（可为空表示第一页）时使用游标分页，否则保持页码分页
+            if 'cursor' in request.args:
+                result = TaskService.list_tasks_by_cursor(request.args.get('cursor'), per_page,
+                                                          count_mode or TaskService.COUNT_NONE, fields, **filters)
+            else:
+                result = TaskService.list_tasks(page, per_page, count_mode or TaskService.COUNT_EXACT,
+                                                fields, **filters)
+            return success_response(result)
+
+        # ETag由规范化后的请求参数和任务列表版本号生成，不查询任务表
+        etag = make_etag('tasks', sorted(filters.items()), fields, request.args.get('cursor'),
+                         'cursor' in request.args, page, per_page, count_mode, TaskService.get_list_version())
+        return conditional_response(etag, build_response)
+
+    except ValueError as e:
+        return error_response(str(e))
+    except Exception as e:
+        return error_response(str(e), code=500, status_code=500)
+
 
-        filters = {
-            'search': request.args.get('search', ''),
-            'status': request.args.get('status', ''),
-            'category': request.args.get('category', ''),
-            'current_handler_id': request.args.get('current_handler_id', type=int),
-            'creator_id': request.args.get('creator_id', type=int)
-        }
+@tasks_bp.route('/batch', methods=['GET'])
+@login_required
+def get_tasks_batch():
+    """按ID批量获取任务（ids=1,2,3，最多200个）"""
+    try:
+        raw_ids = ','.join(request.args.getlist('ids'))
+        try:
+            task_ids = [int(task_id) for task_id in raw_ids.split(',') if task_id.strip()]
+        except ValueError:
+            return error_response('ids参数格式错误')
 
-        # 移除空值
-        filters = {k: v for k, v in filters.items() if v}
+        if not task_ids:
+            return error_response('请提供任务ID')
+        if len(task_ids) > 200:
+            return error_response('一次最多获取200个任务')
 
-        result = TaskService.list_tasks(page, per_page, **filters)
-        return success_response(result)
+        fields = TaskService.parse_list_fields(request.args.get('fields', ''))
+        return success_response(TaskService.get_tasks_by_ids(task_ids, fields))
+
+    except ValueError as e:
+        return error_response(str(e))
+    except Exception as e:
+        return error_response(str(e), code=500, status_code=500)
+
+
+@tasks_bp.route('/export', methods=['GET'])
+@login_required
+def export_tasks():
+    """
+    流式导出任务/流转记录/留言
+    type: tasks(默认) / transfers / comments
+    format: csv(默认) / ndjson / xlsx，筛选参数与任务列表一致
+    """
+    try:
+        export_type = request.args.get('type', 'tasks')
+        export_format = request.args.get('format', ExportService.FORMAT_CSV)
+
+        if export_type not in ExportService.COLUMNS:
+            return error_response('type参数只能是tasks、transfers或comments')
+        if export_format not in ExportService.FORMATS:
+            return error_response('format参数只能是csv、ndjson或xlsx')
+
+        filters = parse_task_filters()
+        columns = ExportService.COLUMNS[export_type]
+        rows = ExportService.iter_rows(export_type, **filters)
+
+        filename = f"{export_type}_{datetime.now().strftime('%Y%m%d%H%M%S')}.{export_format}"
+        headers = {'Content-Disposition': f'attachment; filename={filename}'}
+        mimetype = ExportService.MIMETYPES[export_format]
+
+        if export_format == ExportService.FORMAT_XLSX:
+            path = ExportService.write_xlsx(rows, columns, export_type)
+            return Response(ExportService.stream_file(path), mimetype=mimetype, headers=headers)
+
+        if export_format == ExportService.FORMAT_NDJSON:
+            stream = ExportService.stream_ndjson(rows)
+        else:
+            stream = ExportService.stream_csv(rows, columns)
+        return Response(stream_with_context(stream), mimetype=mimetype, headers=headers)
+
+    except Exception as e:
+        return error_response(str(e), code=500, status_code=500)
+
+
+@tasks_bp.route('/search', methods=['GET'])
+@login_required
+def search_tasks():
+    """
+    全文搜索任务（按相关度排序，返回高亮片段）
+    trigram索引要求每个检索词不少于3个字符；含1～2个字符的词时按标题/描述LIKE全表匹配，
+    结果按创建时间倒序，不返回相关度和摘要
+    """
+    try:
+        keyword = request.args.get('q', '').strip()
+        limit = request.args.get('limit', 20, type=int)
+        if not keyword:
+            return error_response('请提供搜索关键词')
+
+        tasks = TaskService.search_tasks(keyword, min(limit, 100))
+        return success_response(tasks)
 
     except Exception as e:
         return error_response(str(e), code=500, status_code=500)
@@ -46,11 +161,40 @@ def get_tasks():
 def get_task(task_id):
     """获取任务详情"""
     try:
-        task = TaskService.get_task_by_id(task_id)
-        if not task:
+        version = TaskService.get_task_version(task_id)
+        if version is None:
             return error_response('任务不存在', code=404, status_code=404)
 
-        return success_response(task.to_dict(include_details=True))
+        def build_response():
+            task = TaskService.get_task_by_id(task_id)
+            return success_response(task.to_dict(include_details=True))
+
+        return conditional_response(make_etag('task', version), build_response)
+
+    except Exception as e:
+        return error_response(str(e), code=500, status_code=500)
+
+
+@tasks_bp.route('/<int:task_id>/bundle', methods=['GET'])
+@login_required
+def get_task_bundle(task_id):
+    """
+    获取任务详情聚合数据（详情、流转记录、留言、附件）
+    include: 逗号分隔的子列表，默认 transfers,comments,attachments
+    """
+    try:
+        include = request.args.get('include')
+        if include is not None:
+            include = [name.strip() for name in include.split(',') if name.strip()]
+            unknown = [name for name in include if name not in TaskService.BUNDLE_INCLUDES]
+            if unknown:
+                return error_response(f"不支持的include: {', '.join(unknown)}")
+
+        bundle = TaskService.get_task_bundle(task_id, include)
+        if bundle is None:
+            return error_response('任务不存在', code=404, status_code=404)
+
+        return success_response(bundle)
 
     except Exception as e:
         return error_response(str(e), code=500, status_code=500)
@@ -62,25 +206,20 @@ def update_task(task_id):
     """更新任务"""
     try:
         current_user = get_current_user()
-        task = TaskService.get_task_by_id(task_id)
+        data = request.get_json() or {}
 
+        task = TaskService.update_task(task_id, current_user, data)
         if not task:
             return error_response('任务不存在', code=404, status_code=404)
 
-        if not current_user.is_admin and task.current_handler_id != current_user.id:
-            return error_response('只有当前处理人或管理员可以编辑任务', code=403, status_code=403)
-
-        data = request.get_json()
-        if 'description' in data:
-            task.description = data['description']
-        if 'progress' in data:
-            task.progress = data['progress']
-
-        from app import db
-        db.session.commit()
-
         return success_response(task.to_dict(include_details=True), message='任务更新成功')
 
+    except TaskConflictError as e:
+        return error_response(str(e), code=409, status_code=409)
+    except PermissionError as e:
+        return error_response(str(e), code=403, status_code=403)
+    except ValueError as e:
+        return error_response(str(e))
     except Exception as e:
         return error_response(str(e), code=500, status_code=500)
 
@@ -127,6 +266,172 @@ def create_task():
         return error_response(str(e), code=500, status_code=500)
 
 
+@tasks_bp.route('/bulk', methods=['POST'])
+@login_required
+def bulk_create_tasks():
+    """
+    批量创建任务（最多500个）
+    tasks: 任务列表，字段与创建任务一致；atomic: 为true时任一任务校验失败则整批不创建
+    """
+    try:
+        current_user = get_current_user()
+        data = request.get_json() or {}
+
+        items = data.get('tasks')
+        atomic = data.get('atomic', False) is True or str(data.get('atomic')).lower() == 'true'
+
+        if not isinstance(items, list) or not items:
+            return error_response('请提供任务列表')
+        if len(items) > 500:
+            return error_response('一次最多创建500个任务')
+
+        result = TaskService.bulk_create_tasks(items, current_user.id, atomic=atomic)
+
+        if atomic and result['errors']:
+            return json_response({
+                'code': 400,
+                'message': '存在校验失败的任务，未创建任何任务',
+                'data': result
+            }, 400)
+
+        message = f"成功创建{len(result['created'])}个任务"
+        if result['errors']:
+            message += f"，{len(result['errors'])}个失败"
+        return success_response(result, message=message)
+
+    except ValueError as e:
+        return error_response(str(e))
+    except Exception as e:
+        return error_response(str(e), code=500, status_code=500)
+
+
+@tasks_bp.route('/recurrences', methods=['GET'])
+@login_required
+def get_recurrences():
+    """获取周期任务规则列表，include_inactive为true时包含已停用的规则"""
+    try:
+        current_user = get_current_user()
+        include_inactive = request.args.get('include_inactive', '').lower() == 'true'
+        return success_response(RecurrenceService.list_recurrences(current_user, include_inactive))
+    except Exception as e:
+        return error_response(str(e), code=500, status_code=500)
+
+
+@tasks_bp.route('/recurrences', methods=['POST'])
+@login_required
+def create_recurrence():
+    """
+    创建周期任务规则
+    rule_type: cron(默认，5段: 分 时 日 月 周) / rrule(RFC 5545 RRULE)；rule: 规则内容；
+    dtstart: 规则起始时间，不带时区时按调度器时区解析；duration_hours: 每次任务的期望完成时长；
+    catch_up: 停机期间错过的执行是否逐次补建，为false时只补建最近一次
+    """
+    try:
+        current_user = get_current_user()
+        data = request.get_json() or {}
+        recurrence = RecurrenceService.create_recurrence(data, current_user.id)
+        return success_response(recurrence.to_dict(), message='周期任务创建成功')
+    except ValueError as e:
+        return error_response(str(e))
+    except Exception as e:
+        return error_response(str(e), code=500, status_code=500)
+
+
+@tasks_bp.route('/recurrences/<int:recurrence_id>', methods=['PUT'])
+@login_required
+def update_recurrence(recurrence_id):
+    """更新周期任务规则（创建人或管理员），已生成的任务不受影响"""
+    try:
+        current_user = get_current_user()
+        data = request.get_json() or {}
+        recurrence = RecurrenceService.update_recurrence(recurrence_id, data, current_user)
+        if not recurrence:
+            return error_response('周期任务不存在', code=404, status_code=404)
+        return success_response(recurrence.to_dict(), message='周期任务更新成功')
+    except ValueError as e:
+        return error_response(str(e))
+    except PermissionError as e:
+        return error_response(str(e), code=403, status_code=403)
+    except Exception as e:
+        return error_response(str(e), code=500, status_code=500)
+
+
+@tasks_bp.route('/recurrences/<int:recurrence_id>', methods=['DELETE'])
+@login_required
+def deactivate_recurrence(recurrence_id):
+    """停用周期任务规则（创建人或管理员），已生成的任务保留"""
+    try:
+        current_user = get_current_user()
+        recurrence = RecurrenceService.deactivate_recurrence(recurrence_id, current_user)
+        if not recurrence:
+            return error_response('周期任务不存在', code=404, status_code=404)
+        return success_response(recurrence.to_dict(), message='周期任务已停用')
+    except PermissionError as e:
+        return error_response(str(e), code=403, status_code=403)
+    except Exception as e:
+        return error_response(str(e), code=500, status_code=500)
+
+
+@tasks_bp.route('/bulk/<action>', methods=['POST'])
+@login_required
+def bulk_transition(action):
+    """
+    批量流转/完成/关闭任务（action: transfer / complete / close，最多1000个）
+    task_ids: 任务ID列表；target_user_id: 流转目标用户（仅transfer）；atomic: 为true时任一任务失败则整批不处理
+    """
+    try:
+        if action not in TaskService.BULK_ACTIONS:
+            return error_response('不支持的批量操作', code=404, status_code=404)
+
+        current_user = get_current_user()
+        data = request.get_json() or {}
+
+        task_ids = data.get('task_ids')
+        target_user_id = data.get('target_user_id')
+        message = data.get('message', '')
+        atomic = data.get('atomic', False) is True or str(data.get('atomic')).lower() == 'true'
+
+        if not isinstance(task_ids, list) or not task_ids:
+            return error_response('请提供任务ID列表')
+        if not all(isinstance(task_id, int) and not isinstance(task_id, bool) for task_id in task_ids):
+            return error_response('task_ids参数格式错误')
+        if len(task_ids) > 1000:
+            return error_response('一次最多处理1000个任务')
+        if action == 'transfer':
+            if target_user_id is None or target_user_id == '':
+                return error_response('请指定流转目标用户')
+            # 接受整数或数字字符串，其他类型（布尔、小数等）视为格式错误
+            if isinstance(target_user_id, bool) or not str(target_user_id).strip().isdigit():
+                return error_response('target_user_id参数格式错误')
+            target_user_id = int(target_user_id)
+
+        result = TaskService.bulk_transition(
+            action, task_ids, current_user.id,
+            target_user_id=target_user_id if action == 'transfer' else None,
+            message=message,
+            atomic=atomic
+        )
+
+        if atomic and result['errors']:
+            return json_response({
+                'code': 400,
+                'message': '存在无法处理的任务，未处理任何任务',
+                'data': result
+            }, 400)
+
+        message = f"成功处理{len(result['updated'])}个任务"
+        if result['errors']:
+            message += f"，{len(result['errors'])}个失败"
+        return success_response(result, message=message)
+
+    except TaskConflictError as e:
+        return error_response(str(e), code=409, status_code=409)
+    except ValueError as e:
+        return error_response(str(e))
+    except Exception as e:
+        return error_response(str(e), code=500, status_code=500)
+
+
 @tasks_bp.route('/<int:task_id>/transfer', methods=['POST'])
 @login_required
 def transfer_task(task_id):
@@ -141,10 +446,13 @@ def transfer_task(task_id):
         if not target_user_id:
             return error_response('请指定流转目标用户')
 
-        task = TaskService.transfer_task(task_id, current_user.id, target_user_id, message)
+        task = TaskService.transfer_task(task_id, current_user.id, target_user_id, message,
+                                         expected_version=data.get('version'))
 
         return success_response(task.to_dict(), message='任务流转成功')
 
+    except TaskConflictError as e:
+        return error_response(str(e), code=409, status_code=409)
     except PermissionError as e:
         return error_response(str(e), code=403, status_code=403)
     except ValueError as e:
@@ -159,10 +467,13 @@ def respond_task(task_id):
     """响应任务"""
     try:
         current_user = get_current_user()
-        task = TaskService.respond_task(task_id, current_user.id)
+        data = request.get_json(silent=True) or {}
+        task = TaskService.respond_task(task_id, current_user.id, expected_version=data.get('version'))
 
         return success_response(task.to_dict(), message='任务已响应')
 
+    except TaskConflictError as e:
+        return error_response(str(e), code=409, status_code=409)
     except PermissionError as e:
         return error_response(str(e), code=403, status_code=403)
     except ValueError as e:
@@ -188,6 +499,8 @@ def respond_task_by_umcode(task_id):
 
         return success_response(task.to_dict(), message='任务已响应')
 
+    except TaskConflictError as e:
+        return error_response(str(e), code=409, status_code=409)
     except PermissionError as e:
         return error_response(str(e), code=403, status_code=403)
     except ValueError as e:
@@ -205,10 +518,12 @@ def complete_task(task_id):
         data = request.get_json() or {}
         message = data.get('message', '')
 
-        task = TaskService.complete_task(task_id, current_user.id, message)
+        task = TaskService.complete_task(task_id, current_user.id, message, expected_version=data.get('version'))
 
         return success_response(task.to_dict(), message='任务已完成')
 
+    except TaskConflictError as e:
+        return error_response(str(e), code=409, status_code=409)
     except PermissionError as e:
         return error_response(str(e), code=403, status_code=403)
     except ValueError as e:
@@ -217,18 +532,50 @@ def complete_task(task_id):
         return error_response(str(e), code=500, status_code=500)
 
 
+def timeline_response(list_func):
+    """
+    流转记录/留言时间线响应
+    未携带 limit/cursor/since_id 参数时返回完整列表；否则返回分页结果
+    {'items': [...], 'next_cursor': ...}
+    """
+    task_id = request.view_args['task_id']
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor')
+    since_id = request.args.get('since_id', type=int)
+
+    if not any([limit, cursor, since_id]):
+        items, _ = list_func(task_id)
+        return success_response(items)
+
+    items, next_cursor = list_func(task_id, cursor, since_id, min(limit or 50, 200))
+    return success_response({'items': items, 'next_cursor': next_cursor})
+
+
 @tasks_bp.route('/<int:task_id>/transfers', methods=['GET'])
 @login_required
 def get_task_transfers(task_id):
     """获取任务流转记录"""
     try:
-        task = TaskService.get_task_by_id(task_id)
-        if not task:
+        if not TaskService.task_exists(task_id):
             return error_response('任务不存在', code=404, status_code=404)
 
-        transfers = TaskTransfer.query.filter_by(task_id=task_id).order_by(TaskTransfer.created_at.asc()).all()
+        return timeline_response(TaskService.list_task_transfers)
+
+    except ValueError as e:
+        return error_response(str(e))
+    except Exception as e:
+        return error_response(str(e), code=500, status_code=500)
 
-        return success_response([t.to_dict() for t in transfers])
+
+@tasks_bp.route('/<int:task_id>/warnings', methods=['GET'])
+@login_required
+def get_task_warnings(task_id):
+    """获取任务时间进度预警记录"""
+    try:
+        if not TaskService.task_exists(task_id):
+            return error_response('任务不存在', code=404, status_code=404)
+
+        return success_response(WarningService.get_task_warnings(task_id))
 
     except Exception as e:
         return error_response(str(e), code=500, status_code=500)
@@ -239,15 +586,13 @@ def get_task_transfers(task_id):
 def get_task_comments(task_id):
     """获取任务留言"""
     try:
-        task = TaskService.get_task_by_id(task_id)
-        if not task:
+        if not TaskService.task_exists(task_id):
             return error_response('任务不存在', code=404, status_code=404)
 
-        comments = TaskComment.query.filter_by(task_id=task_id, is_deleted=False)\
-            .order_by(TaskComment.created_at.asc()).all()
-
-        return success_response([c.to_dict() for c in comments])
+        return timeline_response(TaskService.list_task_comments)
 
+    except ValueError as e:
+        return error_response(str(e))
     except Exception as e:
         return error_response(str(e), code=500, status_code=500)
 
@@ -290,10 +635,12 @@ def suspend_task(task_id):
         data = request.get_json() or {}
         message = data.get('message', '')
 
-        task = TaskService.suspend_task(task_id, current_user.id, message)
+        task = TaskService.suspend_task(task_id, current_user.id, message, expected_version=data.get('version'))
 
         return success_response(task.to_dict(), message='任务已挂起')
 
+    except TaskConflictError as e:
+        return error_response(str(e), code=409, status_code=409)
     except PermissionError as e:
         return error_response(str(e), code=403, status_code=403)
     except ValueError as e:
@@ -311,10 +658,12 @@ def close_task(task_id):
         data = request.get_json() or {}
         message = data.get('message', '')
 
-        task = TaskService.close_task(task_id, current_user.id, message)
+        task = TaskService.close_task(task_id, current_user.id, message, expected_version=data.get('version'))
 
         return success_response(task.to_dict(), message='任务已关闭')
 
+    except TaskConflictError as e:
+        return error_response(str(e), code=409, status_code=409)
     except PermissionError as e:
         return error_response(str(e), code=403, status_code=403)
     except ValueError as e:
@@ -488,12 +837,90 @@ const AUTO_CONFIG = {{
 def get_statistics():
     """获取任务统计数据"""
     try:
-        stats = TaskService.get_statistics_from_cache()
+        snapshot = TaskService.get_statistics_snapshot()
+        return conditional_response(snapshot['etag'], lambda: success_response(
+            dict(snapshot['data'], version=snapshot['version'])
+        ))
+    except Exception as e:
+        return error_response(str(e), code=500, status_code=500)
+
+
+@tasks_bp.route('/workload', methods=['GET'])
+@login_required
+def get_workload():
+    """
+    人员工作量排行榜
+    role: handler(默认，按当前处理人) / creator(按创建人)
+    sort: open_total(默认) / overdue / completed_7d / completed_30d，降序
+    """
+    try:
+        role = request.args.get('role', 'handler')
+        sort = request.args.get('sort', 'open_total')
+        limit = min(request.args.get('limit', 50, type=int), 500)
+
+        return success_response(TaskService.get_workload_leaderboard(role, sort, limit))
+    except ValueError as e:
+        return error_response(str(e))
+    except Exception as e:
+        return error_response(str(e), code=500, status_code=500)
+
+
+@tasks_bp.route('/analytics', methods=['GET'])
+@login_required
+def get_analytics():
+    """
+    任务分析：每日创建/完成数、完成周期与各状态停留时长分布
+    days: 最近天数，默认30；category: 任务分类，为空表示全部
+    """
+    try:
+        days = request.args.get('days', 30, type=int)
+        category = request.args.get('category', '')
+        if category and category not in TaskService.CATEGORIES:
+            return error_response('无效的任务分类')
+
+        return success_response(AnalyticsService.get_analytics(days, category))
+    except ValueError as e:
+        return error_response(str(e))
+    except Exception as e:
+        return error_response(str(e), code=500, status_code=500)
+
+
+@tasks_bp.route('/cache-stats', methods=['GET'])
+@admin_required
+def get_cache_stats():
+    """获取进程内缓存命中统计（管理员）"""
+    try:
+        from app.services.user_service import UserService
+        stats = TaskService.get_cache_stats()
+        stats['user'] = UserService.get_cache_stats()
+        stats['warning_index'] = WarningService.get_index_stats()
         return success_response(stats)
     except Exception as e:
         return error_response(str(e), code=500, status_code=500)
 
 
+@tasks_bp.route('/scheduler-jobs', methods=['GET'])
+@admin_required
+def get_scheduler_jobs():
+    """获取定时任务的下次执行时间、执行耗时和影响行数（管理员）"""
+    try:
+        from app.services.scheduler_service import SchedulerService
+        return success_response(SchedulerService.get_job_stats())
+    except Exception as e:
+        return error_response(str(e), code=500, status_code=500)
+
+
+@tasks_bp.route('/scheduler-lease', methods=['GET'])
+@admin_required
+def get_scheduler_lease():
+    """获取调度器租约的持有者、令牌和过期时间，以及处理本请求的进程是否为主进程（管理员）"""
+    try:
+        from app.services.lease_service import LeaseService
+        return success_response(LeaseService.get_lease_status())
+    except Exception as e:
+        return error_response(str(e), code=500, status_code=500)
+
+
 @tasks_bp.route('/my-pending', methods=['GET'])
 @login_required
 def get_my_pending():
@@ -501,8 +928,11 @@ def get_my_pending():
     try:
         current_user = get_current_user()
         limit = request.args.get('limit', 10, type=int)
+        # 待办结果来自进程内缓存，ETag直接由结果内容生成；每次请求仍需一次按唯一键的单行查询
+        # 读取用户队列版本号（其他进程的变更据此立即可见），缓存命中时不查询任务表
         tasks = TaskService.get_my_pending_tasks(current_user.id, limit)
-        return success_response(tasks)
+        etag = make_etag('my-pending', current_user.id, tasks)
+        return conditional_response(etag, lambda: success_response(tasks))
     except Exception as e:
         return error_response(str(e), code=500, status_code=500)
 
@@ -513,7 +943,7 @@ def get_urgent():
     """获取紧急任务列表"""
     try:
         hours = request.args.get('hours', 24, type=int)
-        tasks = TaskService.get_urgent_tasks(hours)
-        return success_response(tasks)
+        etag = make_etag('urgent', hours, TaskService.get_list_version())
+        return conditional_response(etag, lambda: success_response(TaskService.get_urgent_tasks(hours)))
     except Exception as e:
         return error_response(str(e), code=500, status_code=500)
@@ -138,19 +138,8 @@ def get_notifications():
             return error_response('用户不存在', code=404, status_code=404)
 
         # 获取用户待处理的任务作为通知
-        from app.models.task import Task
-        tasks = Task.query.filter(
-            Task.current_handler_id == user.id,
-            Task.status.in_(['新建', '待响应'])
-        ).order_by(Task.created_at.desc()).limit(10).all()
-
-        notifications = [{
-            'id': task.id,
-            'title': '新任务待响应',
-            'content': task.title,
-            'task_id': task.id,
-            'timestamp': task.created_at.isoformat()
-        } for task in tasks]
+        from app.services.task_service import TaskService
+        notifications = TaskService.get_user_notifications(user.id)
 
         return success_response(notifications)
 
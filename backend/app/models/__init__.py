@@ -5,5 +5,6 @@ from app.models.user import User
 from app.models.task import Task
 from app.models.task_transfer import TaskTransfer
 from app.models.task_comment import TaskComment
+from app.models.task_recurrence import TaskRecurrence
 
-__all__ = ['User', 'Task', 'TaskTransfer', 'TaskComment']
+__all__ = ['User', 'Task', 'TaskTransfer', 'TaskComment', 'TaskRecurrence']
@@ -2,6 +2,23 @@
 数据模型基类
 """
 from app import db
+from datetime import timezone
+
+
+def as_utc(dt):
+    """转换为带UTC时区的datetime；数据库中的时间均为UTC，SQLite读出时不带时区"""
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def format_datetime(dt):
+    """格式化datetime为ISO字符串，确保带UTC时区信息"""
+    if not dt:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.isoformat()
 
 
 class BaseModel(db.Model):
@@ -0,0 +1,31 @@
+"""
+调度器租约模型
+"""
+from app import db
+from app.models.base import format_datetime
+
+
+class SchedulerLease(db.Model):
+    """调度器租约表，每个租约一行，持有者定期续约，过期后其他进程可以接管"""
+    __tablename__ = 'scheduler_leases'
+
+    name = db.Column(db.String(50), primary_key=True, comment='租约名称')
+    owner = db.Column(db.String(200), nullable=False, comment='持有者(主机名:进程号:随机串)')
+    token = db.Column(db.Integer, nullable=False, default=1, comment='持有者变更时递增的令牌')
+    acquired_at = db.Column(db.DateTime, nullable=False, comment='当前持有者获取时间')
+    heartbeat_at = db.Column(db.DateTime, nullable=False, comment='最近续约时间')
+    expires_at = db.Column(db.DateTime, nullable=False, comment='过期时间')
+
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'name': self.name,
+            'owner': self.owner,
+            'token': self.token,
+            'acquired_at': format_datetime(self.acquired_at),
+            'heartbeat_at': format_datetime(self.heartbeat_at),
+            'expires_at': format_datetime(self.expires_at),
+        }
+
+    def __repr__(self):
+        return f'<SchedulerLease {self.name} {self.owner}#{self.token}>'
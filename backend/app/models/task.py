@@ -2,8 +2,110 @@
 任务模型
 """
 from app import db
-from app.models.base import BaseModel
+from app.models.base import BaseModel, format_datetime
 from datetime import datetime, timezone
+from sqlalchemy import case, cast, func, literal, or_
+import numpy as np
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def calculate_time_progress(expected_start_time, expected_end_time, now=None):
+    """根据期望开始/完成时间计算时间进度(0-100)"""
+    try:
+        if not expected_start_time or not expected_end_time:
+            return 0
+
+        if now is None:
+            now = datetime.now(timezone.utc)
+
+        # 确保时间对象都带时区信息
+        start_time = expected_start_time.replace(tzinfo=timezone.utc) if expected_start_time.tzinfo is None else expected_start_time
+        end_time = expected_end_time.replace(tzinfo=timezone.utc) if expected_end_time.tzinfo is None else expected_end_time
+
+        if now < start_time:
+            return 0
+        elif now > end_time:
+            return 100
+        else:
+            total_duration = (end_time - start_time).total_seconds()
+            if total_duration <= 0:
+                return 0
+            elapsed_duration = (now - start_time).total_seconds()
+            return int((elapsed_duration / total_duration) * 100)
+    except Exception:
+        return 0
+
+
+def _utc_seconds(dt):
+    """datetime转换为UTC秒数，无时区信息的时间按UTC处理，空值返回NaN"""
+    if dt is None:
+        return np.nan
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return (dt - _EPOCH).total_seconds()
+
+
+def calculate_time_progress_batch(expected_start_times, expected_end_times, now=None):
+    """
+    批量计算时间进度，整批使用同一个当前时间
+    计算规则与 calculate_time_progress 一致
+    :return: 时间进度(0-100)列表，顺序与输入一致
+    """
+    if now is None:
+        now = datetime.now(timezone.utc)
+    now_seconds = _utc_seconds(now)
+
+    starts = np.array([_utc_seconds(dt) for dt in expected_start_times], dtype=np.float64)
+    ends = np.array([_utc_seconds(dt) for dt in expected_end_times], dtype=np.float64)
+    if not len(starts):
+        return []
+
+    total = ends - starts
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.floor((now_seconds - starts) / total * 100)
+
+    # 按顺序匹配：缺少期望时间、未开始、已超期、时长非法，其余按已用时长比例计算
+    progress = np.select(
+        [np.isnan(starts) | np.isnan(ends), now_seconds < starts, now_seconds > ends, total <= 0],
+        [0, 0, 100, 0],
+        default=np.nan_to_num(ratio)
+    )
+    return progress.astype(np.int64).tolist()
+
+
+def _epoch_seconds_sql(column, dialect_name):
+    """数据库端将时间列转换为UTC秒数，时间列均按UTC存储"""
+    if dialect_name == 'sqlite':
+        return (func.julianday(column) - 2440587.5) * 86400.0
+    if dialect_name == 'postgresql':
+        return func.extract('epoch', column)
+    raise ValueError(f"不支持在数据库端计算时间进度: {dialect_name}")
+
+
+def time_progress_sql(start_column, end_column, dialect_name, now=None):
+    """
+    数据库端计算时间进度的SQL表达式(0-100)，支持 SQLite 和 PostgreSQL
+    计算规则与 calculate_time_progress 一致，比例向下取整
+    """
+    if now is None:
+        now = datetime.now(timezone.utc)
+    now_seconds = literal(_utc_seconds(now))
+    start = _epoch_seconds_sql(start_column, dialect_name)
+    end = _epoch_seconds_sql(end_column, dialect_name)
+
+    # SQLite 的 CAST 截断小数，PostgreSQL 的 CAST 四舍五入，需先取整
+    ratio = (now_seconds - start) * 100 / (end - start)
+    if dialect_name == 'postgresql':
+        ratio = func.floor(ratio)
+
+    return case(
+        (or_(start_column.is_(None), end_column.is_(None)), 0),
+        (now_seconds < start, 0),
+        (now_seconds > end, 100),
+        (end <= start, 0),
+        else_=cast(ratio, db.Integer)
+    )
 
 
 class Task(BaseModel):
@@ -17,6 +119,7 @@ class Task(BaseModel):
     status = db.Column(db.String(50), nullable=False, default='新建', index=True, comment='任务状态')
     progress = db.Column(db.Integer, default=0, comment='处理进度(0-100)')
     time_progress = db.Column(db.Integer, default=0, comment='时间进度(0-100)')
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1', comment='乐观锁版本号')
 
     creator_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True, comment='创建人ID')
     current_handler_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True, comment='当前处理人ID')
@@ -26,6 +129,9 @@ class Task(BaseModel):
     actual_start_time = db.Column(db.DateTime, comment='实际开始时间')
     actual_end_time = db.Column(db.DateTime, comment='实际完成时间')
 
+    recurrence_id = db.Column(db.Integer, db.ForeignKey('task_recurrences.id', ondelete='SET NULL'), comment='周期任务规则ID')
+    scheduled_at = db.Column(db.DateTime, comment='周期任务本次计划生成时间')
+
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), index=True, comment='创建时间')
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc), comment='更新时间')
 
@@ -38,45 +144,18 @@ class Task(BaseModel):
         db.CheckConstraint('progress >= 0 AND progress <= 100', name='check_progress_range'),
         db.CheckConstraint('time_progress >= 0 AND time_progress <= 100', name='check_time_progress_range'),
         db.CheckConstraint("category IN ('版本任务', '紧急任务', '其他任务', '定时周期任务', '普通任务')", name='check_category'),
+        db.Index('idx_tasks_created_at_id', 'created_at', 'id'),
+        db.UniqueConstraint('recurrence_id', 'scheduled_at', name='uq_task_recurrence_run'),
     )
 
     def calculate_time_progress(self):
         """计算时间进度"""
-        try:
-            if not self.expected_start_time or not self.expected_end_time:
-                return 0
-
-            now = datetime.now(timezone.utc)
-
-            # 确保时间对象都带时区信息
-            start_time = self.expected_start_time.replace(tzinfo=timezone.utc) if self.expected_start_time.tzinfo is None else self.expected_start_time
-            end_time = self.expected_end_time.replace(tzinfo=timezone.utc) if self.expected_end_time.tzinfo is None else self.expected_end_time
-
-            if now < start_time:
-                return 0
-            elif now > end_time:
-                return 100
-            else:
-                total_duration = (end_time - start_time).total_seconds()
-                if total_duration <= 0:
-                    return 0
-                elapsed_duration = (now - start_time).total_seconds()
-                return int((elapsed_duration / total_duration) * 100)
-        except Exception:
-            return 0
+        return calculate_time_progress(self.expected_start_time, self.expected_end_time)
 
     def to_dict(self, include_details=False):
         """转换为字典"""
         from app.models.user import User
 
-        def format_datetime(dt):
-            """格式化datetime为ISO字符串，确保带UTC时区信息"""
-            if not dt:
-                return None
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=timezone.utc)
-            return dt.isoformat()
-
         result = {
             'id': self.id,
             'title': self.title,
@@ -99,6 +178,9 @@ class Task(BaseModel):
                 'description': self.description,
                 'actual_start_time': format_datetime(self.actual_start_time),
                 'actual_end_time': format_datetime(self.actual_end_time),
+                'version': self.version,
+                'recurrence_id': self.recurrence_id,
+                'scheduled_at': format_datetime(self.scheduled_at),
             })
 
         return result
@@ -0,0 +1,63 @@
+"""
+任务分析汇总模型
+由 AnalyticsService 从 task_transfers 增量汇总，供分析接口读取
+"""
+from app import db
+from datetime import datetime, timezone
+
+
+class TaskDailyRollup(db.Model):
+    """任务每日汇总表（按日期、分类）"""
+    __tablename__ = 'task_daily_rollups'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    day = db.Column(db.Date, nullable=False, comment='日期(UTC)')
+    category = db.Column(db.String(50), nullable=False, comment='任务分类')
+    created_count = db.Column(db.Integer, nullable=False, default=0, comment='创建任务数')
+    completed_count = db.Column(db.Integer, nullable=False, default=0, comment='完成任务数')
+    lead_time_seconds = db.Column(db.Float, nullable=False, default=0, comment='当日完成任务的创建到完成耗时合计(秒)')
+    new_seconds = db.Column(db.Float, nullable=False, default=0, comment='当日完成任务处于新建状态的时长合计(秒)')
+    pending_seconds = db.Column(db.Float, nullable=False, default=0, comment='当日完成任务处于待响应状态的时长合计(秒)')
+    processing_seconds = db.Column(db.Float, nullable=False, default=0, comment='当日完成任务处于处理中状态的时长合计(秒)')
+    suspended_seconds = db.Column(db.Float, nullable=False, default=0, comment='当日完成任务处于挂起状态的时长合计(秒)')
+
+    __table_args__ = (
+        db.UniqueConstraint('day', 'category', name='uq_daily_rollup_day_category'),
+    )
+
+    def __repr__(self):
+        return f'<TaskDailyRollup {self.day} {self.category}>'
+
+
+class TaskCycleMetric(db.Model):
+    """任务完成周期明细表，每次完成一行，用于计算分位数"""
+    __tablename__ = 'task_cycle_metrics'
+
+    transfer_id = db.Column(db.Integer, primary_key=True, autoincrement=False, comment='完成流转记录ID')
+    task_id = db.Column(db.Integer, nullable=False, index=True, comment='任务ID')
+    category = db.Column(db.String(50), nullable=False, comment='任务分类')
+    completed_day = db.Column(db.Date, nullable=False, comment='完成日期(UTC)')
+    lead_time_seconds = db.Column(db.Float, nullable=False, comment='创建到完成耗时(秒)')
+    new_seconds = db.Column(db.Float, nullable=False, default=0, comment='新建状态时长(秒)')
+    pending_seconds = db.Column(db.Float, nullable=False, default=0, comment='待响应状态时长(秒)')
+    processing_seconds = db.Column(db.Float, nullable=False, default=0, comment='处理中状态时长(秒)')
+    suspended_seconds = db.Column(db.Float, nullable=False, default=0, comment='挂起状态时长(秒)')
+
+    __table_args__ = (
+        db.Index('idx_cycle_metrics_day_category', 'completed_day', 'category'),
+    )
+
+    def __repr__(self):
+        return f'<TaskCycleMetric task={self.task_id} transfer={self.transfer_id}>'
+
+
+class RollupWatermark(db.Model):
+    """增量汇总高水位表"""
+    __tablename__ = 'rollup_watermarks'
+
+    name = db.Column(db.String(50), primary_key=True, comment='汇总名称')
+    last_id = db.Column(db.Integer, nullable=False, default=0, comment='已处理的最大源记录ID')
+    updated_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc), comment='更新时间')
+
+    def __repr__(self):
+        return f'<RollupWatermark {self.name}={self.last_id}>'
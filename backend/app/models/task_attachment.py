@@ -1,7 +1,7 @@
 """
 任务附件模型
 """
-from app.models.base import BaseModel
+from app.models.base import BaseModel, format_datetime
 from app import db
 from datetime import datetime, timezone
 
@@ -25,13 +25,6 @@ class TaskAttachment(BaseModel):
 
     def to_dict(self):
         """转换为字典"""
-        def format_datetime(dt):
-            if not dt:
-                return None
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=timezone.utc)
-            return dt.isoformat()
-
         return {
             'id': self.id,
             'task_id': self.task_id,
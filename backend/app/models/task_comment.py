@@ -2,7 +2,7 @@
 任务留言模型
 """
 from app import db
-from app.models.base import BaseModel
+from app.models.base import BaseModel, format_datetime
 from datetime import datetime, timezone
 
 
@@ -21,15 +21,13 @@ class TaskComment(BaseModel):
     # 关系
     user = db.relationship('User')
 
+    # 索引
+    __table_args__ = (
+        db.Index('idx_task_comments_task_deleted_created', 'task_id', 'is_deleted', 'created_at'),
+    )
+
     def to_dict(self):
         """转换为字典"""
-        def format_datetime(dt):
-            if not dt:
-                return None
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=timezone.utc)
-            return dt.isoformat()
-
         return {
             'id': self.id,
             'task_id': self.task_id,
@@ -0,0 +1,71 @@
+"""
+周期任务规则模型
+"""
+from app import db
+from app.models.base import BaseModel, format_datetime
+from datetime import datetime, timezone
+
+
+class TaskRecurrence(BaseModel):
+    """周期任务规则表，按规则到期时生成新的任务实例"""
+    __tablename__ = 'task_recurrences'
+
+    RULE_TYPE_CRON = 'cron'
+    RULE_TYPE_RRULE = 'rrule'
+    RULE_TYPES = [RULE_TYPE_CRON, RULE_TYPE_RRULE]
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    title = db.Column(db.String(500), nullable=False, comment='任务标题')
+    category = db.Column(db.String(50), nullable=False, default='定时周期任务', comment='任务分类')
+    description = db.Column(db.Text, comment='任务详情描述')
+    creator_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True, comment='创建人ID')
+    handler_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, comment='处理人ID')
+
+    rule_type = db.Column(db.String(10), nullable=False, default=RULE_TYPE_CRON, comment='规则类型(cron/rrule)')
+    rule = db.Column(db.String(500), nullable=False, comment='cron表达式或RRULE')
+    dtstart = db.Column(db.DateTime, nullable=False, comment='规则起始时间')
+    duration_minutes = db.Column(db.Integer, nullable=False, default=7 * 24 * 60, comment='每次任务的期望完成时长(分钟)')
+    catch_up = db.Column(db.Boolean, nullable=False, default=True, comment='停机期间错过的执行是否逐次补建')
+
+    next_run_at = db.Column(db.DateTime, comment='下次生成时间，规则结束时为空')
+    last_run_at = db.Column(db.DateTime, comment='最近一次生成的计划时间')
+    is_active = db.Column(db.Boolean, nullable=False, default=True, comment='是否启用')
+
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), comment='创建时间')
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc), comment='更新时间')
+
+    # 关系
+    creator = db.relationship('User', foreign_keys=[creator_id])
+    handler = db.relationship('User', foreign_keys=[handler_id])
+
+    __table_args__ = (
+        db.CheckConstraint("rule_type IN ('cron', 'rrule')", name='check_recurrence_rule_type'),
+        db.CheckConstraint('duration_minutes > 0', name='check_recurrence_duration'),
+        db.Index('idx_task_recurrences_active_next_run', 'is_active', 'next_run_at'),
+    )
+
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'id': self.id,
+            'title': self.title,
+            'category': self.category,
+            'description': self.description,
+            'creator_id': self.creator_id,
+            'creator_name': self.creator.name if self.creator else None,
+            'handler_id': self.handler_id,
+            'handler_name': self.handler.name if self.handler else None,
+            'rule_type': self.rule_type,
+            'rule': self.rule,
+            'dtstart': format_datetime(self.dtstart),
+            'duration_minutes': self.duration_minutes,
+            'catch_up': self.catch_up,
+            'next_run_at': format_datetime(self.next_run_at),
+            'last_run_at': format_datetime(self.last_run_at),
+            'is_active': self.is_active,
+            'created_at': format_datetime(self.created_at),
+            'updated_at': format_datetime(self.updated_at),
+        }
+
+    def __repr__(self):
+        return f'<TaskRecurrence {self.id} {self.rule_type}:{self.rule}>'
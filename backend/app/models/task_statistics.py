@@ -1,49 +1,148 @@
 """
-任务统计模型
+任务统计计数器模型
 """
 from app import db
 from datetime import datetime, timezone
-import json
+from sqlalchemy import event, update, bindparam
+from sqlalchemy.orm import Session
+from itertools import count as _count
 
+# 本进程计数器写入序号生成器，每次提交了计数变更的事务后递增
+_write_sequence = _count(1)
 
-class TaskStatistics(db.Model):
-    """任务统计表"""
-    __tablename__ = 'task_statistics'
+
+class TaskCounter(db.Model):
+    """任务计数器表"""
+    __tablename__ = 'task_counters'
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    stat_type = db.Column(db.String(50), nullable=False, comment='统计类型')
-    stat_key = db.Column(db.String(50), nullable=True, comment='统计键')
-    stat_value = db.Column(db.Text, nullable=False, comment='统计值JSON')
+    counter_type = db.Column(db.String(50), nullable=False, comment='计数类型')
+    counter_key = db.Column(db.String(50), nullable=False, comment='计数键')
+    count = db.Column(db.BigInteger, nullable=False, default=0, server_default='0', comment='计数值')
     updated_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc), comment='更新时间')
 
     __table_args__ = (
-        db.UniqueConstraint('stat_type', 'stat_key', name='uq_stat_type_key'),
-        db.Index('idx_stat_type_key', 'stat_type', 'stat_key'),
+        db.UniqueConstraint('counter_type', 'counter_key', name='uq_counter_type_key'),
     )
 
+    # 会话info中暂存本事务计数增量的键
+    PENDING_KEY = 'task_counter_deltas'
+    # 会话info中标记本事务已写入计数的键
+    WRITTEN_KEY = 'task_counter_written'
+
+    # 本进程最近一次计数变更的序号，统计快照据此判断是否需要刷新
+    local_version = 0
+
     @staticmethod
-    def get_stat(stat_type, stat_key=None):
-        """获取统计数据"""
-        stat = TaskStatistics.query.filter_by(stat_type=stat_type, stat_key=stat_key).first()
-        if stat:
-            return json.loads(stat.stat_value)
-        return None
+    def add_deltas(deltas, session=None):
+        """
+        记录计数增量，在当前事务提交前合并写入
+        :param deltas: {(counter_type, counter_key): 增量}
+        """
+        session = session or db.session
+        pending = session.info.setdefault(TaskCounter.PENDING_KEY, {})
+        for key, delta in deltas.items():
+            pending[key] = pending.get(key, 0) + delta
 
     @staticmethod
-    def set_stat(stat_type, stat_key, value):
-        """设置统计数据"""
-        stat = TaskStatistics.query.filter_by(stat_type=stat_type, stat_key=stat_key).first()
-        if stat:
-            stat.stat_value = json.dumps(value, ensure_ascii=False)
-            stat.updated_at = datetime.now(timezone.utc)
-        else:
-            stat = TaskStatistics(
-                stat_type=stat_type,
-                stat_key=stat_key,
-                stat_value=json.dumps(value, ensure_ascii=False),
-                updated_at=datetime.now(timezone.utc)
+    def apply_deltas(deltas, session=None):
+        """
+        将计数增量写入数据库：count = count + :delta，计数行不存在时插入
+        SQLite/PostgreSQL 使用 INSERT ... ON CONFLICT DO UPDATE 一条语句完成，其他数据库先UPDATE后补INSERT
+        """
+        session = session or db.session
+        now = datetime.now(timezone.utc)
+        rows = [{
+            'counter_type': counter_type,
+            'counter_key': counter_key,
+            'count': delta,
+            'updated_at': now,
+        } for (counter_type, counter_key), delta in deltas.items() if delta]
+        if not rows:
+            return
+        session.info[TaskCounter.WRITTEN_KEY] = True
+
+        dialect = session.get_bind().dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            if dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            stmt = insert(TaskCounter)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['counter_type', 'counter_key'],
+                set_={
+                    'count': TaskCounter.count + stmt.excluded.count,
+                    'updated_at': stmt.excluded.updated_at,
+                }
             )
-            db.session.add(stat)
+            session.execute(stmt, rows)
+            return
+
+        update_stmt = update(TaskCounter.__table__).where(
+            TaskCounter.__table__.c.counter_type == bindparam('b_type'),
+            TaskCounter.__table__.c.counter_key == bindparam('b_key'),
+        ).values(count=TaskCounter.__table__.c.count + bindparam('b_delta'), updated_at=bindparam('b_now'))
+        for row in rows:
+            result = session.execute(update_stmt, {
+                'b_type': row['counter_type'], 'b_key': row['counter_key'],
+                'b_delta': row['count'], 'b_now': now,
+            })
+            if result.rowcount == 0:
+                session.execute(TaskCounter.__table__.insert(), row)
+
+    @staticmethod
+    def lock_counters(counter_types, session=None):
+        """
+        在当前事务中锁住计数器，其他事务的计数增量写入等到本事务提交后再执行，
+        用于按任务表重置计数：加锁后读取的任务表已包含全部已写入增量的事务，
+        之后提交的事务的增量叠加在重置结果上，两者不会重复或丢失。须作为事务的第一条语句执行
+        PostgreSQL 锁表；其他数据库更新这些类型的计数行（SQLite 因此持有整库写锁）
+        """
+        session = session or db.session
+        if session.get_bind().dialect.name == 'postgresql':
+            session.execute(db.text('LOCK TABLE task_counters IN SHARE ROW EXCLUSIVE MODE'))
+            return
+        session.execute(update(TaskCounter.__table__).where(
+            TaskCounter.__table__.c.counter_type.in_(counter_types)
+        ).values(count=TaskCounter.__table__.c.count))
+
+    @staticmethod
+    def set_counts(counter_type, counts, session=None):
+        """按给定值重置某一类型的全部计数"""
+        session = session or db.session
+        session.info[TaskCounter.WRITTEN_KEY] = True
+        now = datetime.now(timezone.utc)
+        session.execute(TaskCounter.__table__.delete().where(TaskCounter.counter_type == counter_type))
+        if counts:
+            session.execute(TaskCounter.__table__.insert(), [{
+                'counter_type': counter_type,
+                'counter_key': key,
+                'count': count,
+                'updated_at': now,
+            } for key, count in counts.items()])
 
     def __repr__(self):
-        return f'<TaskStatistics {self.stat_type}:{self.stat_key}>'
+        return f'<TaskCounter {self.counter_type}:{self.counter_key}={self.count}>'
+
+
+@event.listens_for(Session, 'before_commit')
+def _flush_counter_deltas(session):
+    """事务提交前将本事务累计的计数增量一次写入"""
+    deltas = session.info.pop(TaskCounter.PENDING_KEY, None)
+    if deltas:
+        TaskCounter.apply_deltas(deltas, session=session)
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_counter_version(session):
+    """计数变更提交后递增本进程计数版本"""
+    if session.info.pop(TaskCounter.WRITTEN_KEY, False):
+        TaskCounter.local_version = next(_write_sequence)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_counter_deltas(session):
+    """事务回滚时丢弃未写入的计数增量"""
+    session.info.pop(TaskCounter.PENDING_KEY, None)
+    session.info.pop(TaskCounter.WRITTEN_KEY, None)
@@ -2,7 +2,7 @@
 任务流转记录模型
 """
 from app import db
-from app.models.base import BaseModel
+from app.models.base import BaseModel, format_datetime
 from datetime import datetime, timezone
 
 
@@ -25,17 +25,11 @@ class TaskTransfer(BaseModel):
     # 约束
     __table_args__ = (
         db.CheckConstraint("transfer_type IN ('创建', '流转', '响应', '挂起', '恢复', '完成', '关闭')", name='check_transfer_type'),
+        db.Index('idx_task_transfers_task_created', 'task_id', 'created_at'),
     )
 
     def to_dict(self):
         """转换为字典"""
-        def format_datetime(dt):
-            if not dt:
-                return None
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=timezone.utc)
-            return dt.isoformat()
-
         return {
             'id': self.id,
             'task_id': self.task_id,
@@ -0,0 +1,42 @@
+"""
+任务预警记录模型
+"""
+from app import db
+from app.models.base import format_datetime
+from datetime import datetime, timezone
+
+
+class TaskWarning(db.Model):
+    """任务预警记录表，同一任务同一期望完成时间下每个阈值只记录一次"""
+    __tablename__ = 'task_warnings'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    task_id = db.Column(db.Integer, db.ForeignKey('tasks.id', ondelete='CASCADE'), nullable=False, comment='任务ID')
+    handler_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, comment='预警时的处理人ID')
+    threshold = db.Column(db.Integer, nullable=False, comment='时间进度阈值(80/90/95)')
+    progress = db.Column(db.Integer, nullable=False, default=0, comment='预警时的处理进度')
+    expected_end_time = db.Column(db.DateTime, nullable=False, comment='预警时的期望完成时间')
+    due_at = db.Column(db.DateTime, nullable=False, comment='时间进度到达阈值的时间')
+    fired_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc), comment='预警时间')
+
+    __table_args__ = (
+        db.UniqueConstraint('task_id', 'threshold', 'expected_end_time', name='uq_task_warning_threshold'),
+        db.Index('idx_task_warnings_handler_fired', 'handler_id', 'fired_at'),
+    )
+
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'id': self.id,
+            'task_id': self.task_id,
+            'handler_id': self.handler_id,
+            'threshold': self.threshold,
+            'remaining': 100 - self.threshold,
+            'progress': self.progress,
+            'expected_end_time': format_datetime(self.expected_end_time),
+            'due_at': format_datetime(self.due_at),
+            'fired_at': format_datetime(self.fired_at),
+        }
+
+    def __repr__(self):
+        return f'<TaskWarning task={self.task_id} {self.threshold}%>'
@@ -0,0 +1,348 @@
+"""
+任务分析服务
+以 task_transfers 为事实来源，按高水位增量汇总每日创建/完成数、完成周期和各状态停留时长，
+分位数在读取时基于完成周期明细用 pandas 计算。
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from itertools import groupby
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import tuple_, func, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models.task import Task
+from app.models.task_transfer import TaskTransfer
+from app.models.task_analytics import TaskDailyRollup, TaskCycleMetric, RollupWatermark
+from app.models.base import as_utc, format_datetime
+
+
+class AnalyticsService:
+    """任务分析业务逻辑服务"""
+
+    WATERMARK_NAME = 'task_transfers'
+
+    # 每批处理的流转记录数
+    BATCH_SIZE = 5000
+
+    # 只汇总早于该时长的流转记录，避免并发事务晚提交的较小ID被高水位跳过
+    SAFETY_LAG = timedelta(seconds=30)
+
+    # 流转类型 -> 流转后任务所处状态；完成/关闭之后的时间不计入任何状态
+    STATUS_AFTER_TRANSFER = {
+        '创建': '新建',
+        '流转': '待响应',
+        '响应': '处理中',
+        '挂起': '挂起',
+        '恢复': '处理中',
+    }
+
+    # 状态 -> 汇总表字段
+    STATUS_FIELDS = {
+        '新建': 'new_seconds',
+        '待响应': 'pending_seconds',
+        '处理中': 'processing_seconds',
+        '挂起': 'suspended_seconds',
+    }
+
+    PERCENTILES = [0.5, 0.85, 0.95]
+
+    MAX_DAYS = 366
+
+    @staticmethod
+    def _get_watermark():
+        """读取高水位，不存在时创建"""
+        last_id = db.session.query(RollupWatermark.last_id).filter(
+            RollupWatermark.name == AnalyticsService.WATERMARK_NAME
+        ).scalar()
+        if last_id is not None:
+            return last_id
+
+        try:
+            db.session.add(RollupWatermark(name=AnalyticsService.WATERMARK_NAME, last_id=0))
+            db.session.commit()
+        except IntegrityError:
+            # 其他进程已创建
+            db.session.rollback()
+            return db.session.query(RollupWatermark.last_id).filter(
+                RollupWatermark.name == AnalyticsService.WATERMARK_NAME
+            ).scalar()
+        return 0
+
+    @staticmethod
+    def run_rollup(batch_size=None, now=None):
+        """
+        增量汇总新的流转记录，直到追上安全水位
+        每批在一个事务内写入汇总并推进高水位，高水位以比较并设置方式更新，多个进程同时执行时只有一个生效
+        :return: {'processed': 处理的流转记录数, 'created': 创建数, 'completed': 完成数, 'last_id': 高水位}
+        """
+        batch_size = batch_size or AnalyticsService.BATCH_SIZE
+        cutoff = (now or datetime.now(timezone.utc)) - AnalyticsService.SAFETY_LAG
+        totals = {'processed': 0, 'created': 0, 'completed': 0}
+
+        while True:
+            last_id = AnalyticsService._get_watermark()
+            rows = db.session.query(
+                TaskTransfer.id, TaskTransfer.task_id, TaskTransfer.transfer_type,
+                TaskTransfer.created_at, Task.category
+            ).join(Task, Task.id == TaskTransfer.task_id).filter(
+                TaskTransfer.id > last_id,
+                TaskTransfer.created_at <= cutoff
+            ).order_by(TaskTransfer.id.asc()).limit(batch_size).all()
+
+            if not rows:
+                db.session.commit()
+                break
+
+            new_last_id = rows[-1].id
+            stats = AnalyticsService._rollup_batch(rows)
+
+            advanced = db.session.execute(
+                update(RollupWatermark).where(
+                    RollupWatermark.name == AnalyticsService.WATERMARK_NAME,
+                    RollupWatermark.last_id == last_id
+                ).values(last_id=new_last_id, updated_at=datetime.now(timezone.utc))
+            ).rowcount
+            if not advanced:
+                # 其他进程已处理这一批
+                db.session.rollback()
+                break
+
+            db.session.commit()
+            totals['processed'] += len(rows)
+            totals['created'] += stats['created']
+            totals['completed'] += stats['completed']
+
+            if len(rows) < batch_size:
+                break
+
+        totals['last_id'] = AnalyticsService._get_watermark()
+        db.session.commit()
+        return totals
+
+    @staticmethod
+    def _rollup_batch(rows):
+        """汇总一批流转记录到每日汇总和完成周期明细（不提交）"""
+        buckets = defaultdict(lambda: defaultdict(float))
+        created = 0
+
+        for row in rows:
+            if row.transfer_type == '创建':
+                day = as_utc(row.created_at).date()
+                buckets[(day, row.category)]['created_count'] += 1
+                created += 1
+
+        completions = [row for row in rows if row.transfer_type == '完成']
+        metrics = AnalyticsService._cycle_metrics(completions)
+        for metric in metrics:
+            bucket = buckets[(metric['completed_day'], metric['category'])]
+            bucket['completed_count'] += 1
+            bucket['lead_time_seconds'] += metric['lead_time_seconds']
+            for field in AnalyticsService.STATUS_FIELDS.values():
+                bucket[field] += metric[field]
+
+        if metrics:
+            db.session.bulk_insert_mappings(TaskCycleMetric, metrics)
+        if buckets:
+            AnalyticsService._merge_daily(buckets)
+
+        return {'created': created, 'completed': len(metrics)}
+
+    @staticmethod
+    def _cycle_metrics(completions):
+        """
+        计算一批完成记录的完成周期和各状态停留时长
+        一次查询取出相关任务在各自完成点之前的全部流转记录；
+        周期起点为创建记录，周期任务被重置后再次完成时为上一次完成记录
+        """
+        if not completions:
+            return []
+
+        task_ids = {row.task_id for row in completions}
+        max_id = max(row.id for row in completions)
+        history = db.session.query(
+            TaskTransfer.id, TaskTransfer.task_id, TaskTransfer.transfer_type, TaskTransfer.created_at
+        ).filter(
+            TaskTransfer.task_id.in_(task_ids),
+            TaskTransfer.id <= max_id
+        ).order_by(TaskTransfer.task_id.asc(), TaskTransfer.id.asc()).all()
+
+        completion_ids = {row.id: row for row in completions}
+        metrics = []
+        for task_id, transfers in groupby(history, key=lambda t: t.task_id):
+            cycle_start = None
+            status = None
+            status_since = None
+            durations = defaultdict(float)
+
+            for transfer in transfers:
+                at = as_utc(transfer.created_at)
+                if cycle_start is None:
+                    cycle_start = at
+                if status in AnalyticsService.STATUS_FIELDS:
+                    durations[status] += max((at - status_since).total_seconds(), 0)
+
+                if transfer.id in completion_ids:
+                    metric = {
+                        'transfer_id': transfer.id,
+                        'task_id': task_id,
+                        'category': completion_ids[transfer.id].category,
+                        'completed_day': at.date(),
+                        'lead_time_seconds': max((at - cycle_start).total_seconds(), 0),
+                    }
+                    for name, field in AnalyticsService.STATUS_FIELDS.items():
+                        metric[field] = durations[name]
+                    metrics.append(metric)
+
+                if transfer.transfer_type == '完成':
+                    # 下一个周期从本次完成开始
+                    cycle_start = at
+                    durations = defaultdict(float)
+
+                status = AnalyticsService.STATUS_AFTER_TRANSFER.get(transfer.transfer_type)
+                status_since = at
+
+        return metrics
+
+    @staticmethod
+    def _merge_daily(buckets):
+        """按(日期, 分类)合并到每日汇总表，一次查询读取已有行"""
+        existing = {
+            (rollup.day, rollup.category): rollup
+            for rollup in TaskDailyRollup.query.filter(
+                tuple_(TaskDailyRollup.day, TaskDailyRollup.category).in_(list(buckets.keys()))
+            )
+        }
+
+        fields = ['created_count', 'completed_count', 'lead_time_seconds'] + \
+            list(AnalyticsService.STATUS_FIELDS.values())
+        for key, values in buckets.items():
+            rollup = existing.get(key)
+            if rollup is None:
+                rollup = TaskDailyRollup(day=key[0], category=key[1],
+                                         **{field: 0 for field in fields})
+                db.session.add(rollup)
+            for field in fields:
+                if values.get(field):
+                    setattr(rollup, field, getattr(rollup, field) + values[field])
+
+    @staticmethod
+    def rebuild():
+        """清空汇总结果和高水位，从头重新汇总"""
+        TaskDailyRollup.query.delete()
+        TaskCycleMetric.query.delete()
+        RollupWatermark.query.filter(RollupWatermark.name == AnalyticsService.WATERMARK_NAME).delete()
+        db.session.commit()
+        return AnalyticsService.run_rollup()
+
+    @staticmethod
+    def _describe(values):
+        """耗时分布（秒 -> 小时）"""
+        values = np.asarray(values, dtype=float) / 3600
+        if not values.size:
+            return {'count': 0, 'mean': None, 'p50': None, 'p85': None, 'p95': None}
+
+        p50, p85, p95 = np.percentile(values, [p * 100 for p in AnalyticsService.PERCENTILES])
+        return {
+            'count': int(values.size),
+            'mean': round(float(values.mean()), 2),
+            'p50': round(float(p50), 2),
+            'p85': round(float(p85), 2),
+            'p95': round(float(p95), 2),
+        }
+
+    @staticmethod
+    def _describe_frame(frame):
+        """按分类分组计算耗时分布"""
+        hours = frame[['category', 'value']].assign(value=frame['value'] / 3600)
+        grouped = hours.groupby('category')['value']
+        quantiles = grouped.quantile(AnalyticsService.PERCENTILES).unstack()
+        summary = pd.concat([grouped.size().rename('count'), grouped.mean().rename('mean'), quantiles], axis=1)
+
+        return {
+            category: {
+                'count': int(row['count']),
+                'mean': round(float(row['mean']), 2),
+                'p50': round(float(row[0.5]), 2),
+                'p85': round(float(row[0.85]), 2),
+                'p95': round(float(row[0.95]), 2),
+            }
+            for category, row in summary.iterrows()
+        }
+
+    @staticmethod
+    def get_analytics(days=30, category=None):
+        """
+        获取任务分析数据
+        :param days: 统计最近多少天（按UTC日期，含今天）
+        :param category: 任务分类，为空表示全部
+        """
+        if days < 1 or days > AnalyticsService.MAX_DAYS:
+            raise ValueError(f"days必须在1到{AnalyticsService.MAX_DAYS}之间")
+
+        since = datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+
+        daily_query = db.session.query(
+            TaskDailyRollup.day,
+            func.sum(TaskDailyRollup.created_count),
+            func.sum(TaskDailyRollup.completed_count),
+            func.sum(TaskDailyRollup.lead_time_seconds),
+        ).filter(TaskDailyRollup.day >= since)
+        if category:
+            daily_query = daily_query.filter(TaskDailyRollup.category == category)
+        daily = [
+            {
+                'day': day.isoformat(),
+                'created': int(created or 0),
+                'completed': int(completed or 0),
+                'avg_lead_time_hours': round(lead_time / completed / 3600, 2) if completed else None,
+            }
+            for day, created, completed, lead_time in
+            daily_query.group_by(TaskDailyRollup.day).order_by(TaskDailyRollup.day.asc())
+        ]
+
+        status_columns = [getattr(TaskCycleMetric, field) for field in AnalyticsService.STATUS_FIELDS.values()]
+        metric_query = db.session.query(
+            TaskCycleMetric.category, TaskCycleMetric.lead_time_seconds, *status_columns
+        ).filter(TaskCycleMetric.completed_day >= since)
+        if category:
+            metric_query = metric_query.filter(TaskCycleMetric.category == category)
+        frame = pd.DataFrame(
+            metric_query.all(),
+            columns=['category', 'lead_time_seconds'] + list(AnalyticsService.STATUS_FIELDS.values())
+        )
+
+        lead_time = {
+            'all': AnalyticsService._describe(frame['lead_time_seconds']),
+            'by_category': AnalyticsService._describe_frame(
+                frame[['category']].assign(value=frame['lead_time_seconds'])
+            ) if not frame.empty else {},
+        }
+        status_time = {
+            status: AnalyticsService._describe(frame[field])
+            for status, field in AnalyticsService.STATUS_FIELDS.items()
+        }
+
+        watermark = db.session.get(RollupWatermark, AnalyticsService.WATERMARK_NAME)
+        max_transfer_id = db.session.query(func.max(TaskTransfer.id)).scalar() or 0
+        last_id = watermark.last_id if watermark else 0
+
+        return {
+            'days': days,
+            'since': since.isoformat(),
+            'category': category or None,
+            'daily': daily,
+            'totals': {
+                'created': sum(item['created'] for item in daily),
+                'completed': sum(item['completed'] for item in daily),
+            },
+            'lead_time': lead_time,
+            'status_time': status_time,
+            'watermark': {
+                'last_id': last_id,
+                'pending': max(max_transfer_id - last_id, 0),
+                'updated_at': format_datetime(watermark.updated_at) if watermark else None,
+            },
+        }
@@ -0,0 +1,248 @@
+"""
+数据导出服务
+按任务列表的筛选条件流式导出任务、流转记录和留言，支持 CSV / NDJSON / XLSX。
+数据库端使用 yield_per 分批读取，导出过程中内存占用与总行数无关。
+"""
+import csv
+import io
+import os
+import tempfile
+from itertools import islice
+
+from app import db
+from app.models.task import Task
+from app.models.user import User
+from app.models.task_transfer import TaskTransfer
+from app.models.task_comment import TaskComment
+from app.models.base import format_datetime
+from app.services.task_service import TaskService
+from sqlalchemy.orm import aliased
+
+
+class ExportService:
+    """数据导出服务"""
+
+    # 每批从数据库读取的行数
+    BATCH_SIZE = 1000
+
+    FORMAT_CSV = 'csv'
+    FORMAT_NDJSON = 'ndjson'
+    FORMAT_XLSX = 'xlsx'
+    FORMATS = [FORMAT_CSV, FORMAT_NDJSON, FORMAT_XLSX]
+
+    MIMETYPES = {
+        FORMAT_CSV: 'text/csv; charset=utf-8',
+        FORMAT_NDJSON: 'application/x-ndjson',
+        FORMAT_XLSX: 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    }
+
+    # CSV中以这些字符开头的文本在Excel中打开时会被当作公式执行，导出时前加单引号
+    FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+    # 导出列定义: (字段名, 表头)
+    COLUMNS = {
+        'tasks': [
+            ('id', '任务ID'),
+            ('title', '任务标题'),
+            ('category', '任务分类'),
+            ('status', '任务状态'),
+            ('progress', '处理进度'),
+            ('time_progress', '时间进度'),
+            ('creator_name', '创建人'),
+            ('current_handler_name', '当前处理人'),
+            ('expected_start_time', '期望开始时间'),
+            ('expected_end_time', '期望完成时间'),
+            ('created_at', '创建时间'),
+            ('updated_at', '更新时间'),
+        ],
+        'transfers': [
+            ('id', '流转ID'),
+            ('task_id', '任务ID'),
+            ('task_title', '任务标题'),
+            ('transfer_type', '流转类型'),
+            ('operator_name', '操作人'),
+            ('target_user_name', '目标用户'),
+            ('message', '流转留言'),
+            ('created_at', '流转时间'),
+        ],
+        'comments': [
+            ('id', '留言ID'),
+            ('task_id', '任务ID'),
+            ('task_title', '任务标题'),
+            ('user_name', '留言人'),
+            ('content', '留言内容'),
+            ('created_at', '留言时间'),
+        ],
+    }
+
+    @staticmethod
+    def iter_rows(export_type, **filters):
+        """
+        按筛选条件逐行产出导出数据
+        :param export_type: tasks / transfers / comments
+        :return: 字典生成器，时间字段保持datetime
+        """
+        if export_type == 'tasks':
+            return ExportService._iter_task_rows(**filters)
+        if export_type == 'transfers':
+            return ExportService._iter_transfer_rows(**filters)
+        if export_type == 'comments':
+            return ExportService._iter_comment_rows(**filters)
+        raise ValueError(f"不支持的导出类型: {export_type}")
+
+    @staticmethod
+    def _iter_batches(query):
+        """使用服务端游标分批读取查询结果"""
+        result = iter(query.yield_per(ExportService.BATCH_SIZE))
+        while True:
+            batch = list(islice(result, ExportService.BATCH_SIZE))
+            if not batch:
+                break
+            yield batch
+
+    @staticmethod
+    def _iter_task_rows(**filters):
+        fields = [name for name, _ in ExportService.COLUMNS['tasks']]
+        query = TaskService.apply_task_filters(Task.query, **filters).order_by(Task.id.asc())
+        query = TaskService.select_task_rows(query, fields)
+
+        for batch in ExportService._iter_batches(query):
+            yield from TaskService.serialize_task_rows(batch, fields)
+
+    @staticmethod
+    def _iter_transfer_rows(**filters):
+        operator = aliased(User)
+        target_user = aliased(User)
+        query = TaskService.apply_task_filters(
+            db.session.query(
+                TaskTransfer.id,
+                TaskTransfer.task_id,
+                Task.title.label('task_title'),
+                TaskTransfer.transfer_type,
+                operator.name.label('operator_name'),
+                target_user.name.label('target_user_name'),
+                TaskTransfer.message,
+                TaskTransfer.created_at,
+            ).select_from(TaskTransfer).join(Task, Task.id == TaskTransfer.task_id)
+            .outerjoin(operator, operator.id == TaskTransfer.operator_id)
+            .outerjoin(target_user, target_user.id == TaskTransfer.target_user_id),
+            **filters
+        ).order_by(TaskTransfer.id.asc())
+
+        for batch in ExportService._iter_batches(query):
+            for row in batch:
+                yield dict(row._mapping)
+
+    @staticmethod
+    def _iter_comment_rows(**filters):
+        query = TaskService.apply_task_filters(
+            db.session.query(
+                TaskComment.id,
+                TaskComment.task_id,
+                Task.title.label('task_title'),
+                User.name.label('user_name'),
+                TaskComment.content,
+                TaskComment.created_at,
+            ).select_from(TaskComment).join(Task, Task.id == TaskComment.task_id)
+            .outerjoin(User, User.id == TaskComment.user_id)
+            .filter(TaskComment.is_deleted.is_(False)),
+            **filters
+        ).order_by(TaskComment.id.asc())
+
+        for batch in ExportService._iter_batches(query):
+            for row in batch:
+                yield dict(row._mapping)
+
+    @staticmethod
+    def stream_ndjson(rows):
+        """逐行输出NDJSON"""
+        from app.utils.response import encode_json
+
+        for row in rows:
+            yield encode_json(row) + b'\n'
+
+    @staticmethod
+    def stream_csv(rows, columns):
+        """逐批输出CSV，带BOM以便Excel正确识别中文"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow([label for _, label in columns])
+        yield '\ufeff' + buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+        count = 0
+        for row in rows:
+            writer_row = []
+            for name, _ in columns:
+                value = row[name]
+                if hasattr(value, 'isoformat'):
+                    value = format_datetime(value)
+                elif isinstance(value, str) and value.startswith(ExportService.FORMULA_PREFIXES):
+                    value = "'" + value
+                writer_row.append(value)
+            writer.writerow(writer_row)
+
+            count += 1
+            if count % ExportService.BATCH_SIZE == 0:
+                chunk = buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+                yield chunk
+
+        yield buffer.getvalue()
+
+    @staticmethod
+    def write_xlsx(rows, columns, sheet_title):
+        """
+        以openpyxl只写模式生成XLSX临时文件
+        :return: 临时文件路径，由调用方负责删除
+        """
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet(title=sheet_title)
+        sheet.append([label for _, label in columns])
+
+        for row in rows:
+            sheet.append([ExportService._xlsx_value(sheet, row[name]) for name, _ in columns])
+
+        fd, path = tempfile.mkstemp(suffix='.xlsx')
+        os.close(fd)
+        workbook.save(path)
+        return path
+
+    @staticmethod
+    def _xlsx_value(sheet, value):
+        """
+        转换为可写入XLSX的单元格值
+        文本去掉XML不允许的控制字符（否则openpyxl在导出中途抛出 IllegalCharacterError），
+        以等号开头的文本写为文本单元格，不被当作公式
+        """
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+        if isinstance(value, str):
+            value = ILLEGAL_CHARACTERS_RE.sub('', value)
+            if value.startswith('='):
+                cell = WriteOnlyCell(sheet, value)
+                cell.data_type = 's'
+                return cell
+            return value
+        # Excel不支持带时区的时间，数据库中的时间均为UTC
+        if hasattr(value, 'tzinfo') and value.tzinfo:
+            return value.replace(tzinfo=None)
+        return value
+
+    @staticmethod
+    def stream_file(path, chunk_size=64 * 1024):
+        """分块读取文件并在读取完成后删除"""
+        try:
+            with open(path, 'rb') as f:
+                while True:
+                    chunk = f.read(chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+        finally:
+            os.remove(path)
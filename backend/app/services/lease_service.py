@@ -0,0 +1,187 @@
+"""
+调度器租约服务
+每个进程都会启动调度器，通过数据库中的租约行选出唯一的主进程执行定时任务：
+持有者每 TTL/3 续约一次，进程退出时释放；持有者失联时租约过期，其他进程在下次续约时接管
+"""
+from datetime import datetime, timedelta, timezone
+import os
+import socket
+import threading
+import time
+import uuid
+
+from flask import current_app
+from sqlalchemy import case, or_
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models.scheduler_lease import SchedulerLease
+
+# owner: 本进程的持有者标识，按进程号生成，fork出的子进程重新生成；token: 持有租约时的令牌；
+# held: 上次续约后是否持有租约；valid_until: 本进程认为租约有效的截止时间(time.monotonic)；expires_at: 数据库中的过期时间
+lease_state = {
+    'pid': None,
+    'owner': None,
+    'held': False,
+    'token': None,
+    'valid_until': 0.0,
+    'expires_at': None,
+}
+lease_state_lock = threading.Lock()
+
+
+class LeaseService:
+    """调度器租约业务逻辑服务"""
+
+    # 调度器租约名称
+    SCHEDULER_LEASE = 'scheduler'
+
+    # 默认租约时长(秒)
+    DEFAULT_TTL = 30
+
+    @staticmethod
+    def ttl():
+        """租约时长(秒)"""
+        return current_app.config.get('SCHEDULER_LEASE_TTL') or LeaseService.DEFAULT_TTL
+
+    @staticmethod
+    def heartbeat_interval():
+        """续约间隔(秒)，租约时长内可以容忍两次续约失败"""
+        return LeaseService.ttl() / 3
+
+    @staticmethod
+    def owner():
+        """本进程的持有者标识"""
+        if lease_state['pid'] != os.getpid():
+            with lease_state_lock:
+                lease_state.update({
+                    'pid': os.getpid(),
+                    'owner': f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}',
+                    'held': False,
+                    'token': None,
+                    'valid_until': 0.0,
+                    'expires_at': None,
+                })
+        return lease_state['owner']
+
+    @staticmethod
+    def is_leader():
+        """
+        本进程是否持有租约
+        本地有效期比数据库过期时间提前一个续约间隔结束，续约失败或进程停顿时在其他进程接管前停止执行
+        """
+        return lease_state['pid'] == os.getpid() and time.monotonic() < lease_state['valid_until']
+
+    @staticmethod
+    def _try_acquire(name, owner, now, expires_at):
+        """
+        获取或续约租约，租约不存在、由本进程持有或已过期时成功
+        :return: 成功时返回令牌，否则返回None
+        """
+        table = SchedulerLease.__table__
+        row = {
+            'name': name, 'owner': owner, 'token': 1,
+            'acquired_at': now, 'heartbeat_at': now, 'expires_at': expires_at,
+        }
+
+        dialect = db.session.get_bind().dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            if dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            if db.session.execute(insert(table).on_conflict_do_nothing(index_elements=['name']), row).rowcount == 1:
+                return 1
+        elif not db.session.query(SchedulerLease.name).filter_by(name=name).first():
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(table.insert(), row)
+                return 1
+            except IntegrityError:
+                pass
+
+        # 同一持有者续约时令牌和获取时间不变，更换持有者时令牌递增
+        same_owner = table.c.owner == owner
+        result = db.session.execute(table.update().where(
+            table.c.name == name,
+            or_(same_owner, table.c.expires_at < now)
+        ).values(
+            owner=owner,
+            token=case((same_owner, table.c.token), else_=table.c.token + 1),
+            acquired_at=case((same_owner, table.c.acquired_at), else_=now),
+            heartbeat_at=now,
+            expires_at=expires_at
+        ))
+        if result.rowcount != 1:
+            return None
+        return db.session.query(SchedulerLease.token).filter_by(name=name).scalar()
+
+    @staticmethod
+    def heartbeat(name=None):
+        """
+        获取或续约租约，由调度器按续约间隔调用（不受主进程限制）
+        数据库异常时保留本地有效期，到期后自然失去主进程身份
+        :return: (是否持有租约, 持有状态是否变化)
+        """
+        name = name or LeaseService.SCHEDULER_LEASE
+        owner = LeaseService.owner()
+        ttl = LeaseService.ttl()
+
+        # 本地有效期从发出续约语句前开始计算
+        started = time.monotonic()
+        now = datetime.now(timezone.utc)
+        expires_at = now + timedelta(seconds=ttl)
+        try:
+            token = LeaseService._try_acquire(name, owner, now, expires_at)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f'[{datetime.now()}] 调度器租约续约失败: {str(e)}')
+            token = lease_state['token'] if LeaseService.is_leader() else None
+        else:
+            with lease_state_lock:
+                if token is None:
+                    lease_state.update({'token': None, 'valid_until': 0.0, 'expires_at': None})
+                else:
+                    lease_state.update({
+                        'token': token,
+                        'valid_until': started + ttl - LeaseService.heartbeat_interval(),
+                        'expires_at': expires_at,
+                    })
+
+        held = token is not None
+        with lease_state_lock:
+            changed = held != lease_state['held']
+            lease_state['held'] = held
+        return held, changed
+
+    @staticmethod
+    def release(name=None):
+        """释放本进程持有的租约，其他进程下次续约时即可接管"""
+        name = name or LeaseService.SCHEDULER_LEASE
+        owner = LeaseService.owner()
+        with lease_state_lock:
+            lease_state.update({'held': False, 'token': None, 'valid_until': 0.0, 'expires_at': None})
+
+        table = SchedulerLease.__table__
+        try:
+            db.session.execute(table.update().where(
+                table.c.name == name,
+                table.c.owner == owner
+            ).values(expires_at=datetime.now(timezone.utc) - timedelta(seconds=1)))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+
+    @staticmethod
+    def get_lease_status(name=None):
+        """租约状态及本进程是否持有"""
+        name = name or LeaseService.SCHEDULER_LEASE
+        lease = db.session.get(SchedulerLease, name)
+        return {
+            'lease': lease.to_dict() if lease else None,
+            'owner': LeaseService.owner(),
+            'is_leader': LeaseService.is_leader(),
+            'token': lease_state['token'],
+            'ttl': LeaseService.ttl(),
+        }
@@ -0,0 +1,500 @@
+"""
+周期任务服务
+周期规则(cron表达式或RRULE)按 SCHEDULER_TIMEZONE 计算执行时间，下次执行时间 next_run_at 建有索引；
+生成任务时一次范围查询取出全部到期规则，每次执行生成一个新的任务实例，已完成的历史任务保持不变
+"""
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+from dateutil import rrule as rr
+from dateutil import tz
+from flask import current_app
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models.base import as_utc
+from app.models.task_recurrence import TaskRecurrence
+from app.models.user import User
+
+
+class RecurrenceService:
+    """周期任务业务逻辑服务"""
+
+    # 每次生成最多处理的到期规则数
+    BATCH_SIZE = 500
+
+    # 停机期间错过的执行逐次补建时，每个规则最多补建的次数（保留最近的）
+    CATCH_UP_LIMIT = 100
+
+    # cron 字段: (rrule参数, 最小值, 最大值)
+    CRON_FIELDS = [
+        ('byminute', 0, 59),
+        ('byhour', 0, 23),
+        ('bymonthday', 1, 31),
+        ('bymonth', 1, 12),
+        ('byweekday', 0, 7),
+    ]
+
+    # 各月份最多天数，用于排除永远不会执行的 cron 表达式（如2月30日）
+    MONTH_DAYS = [31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+
+    @staticmethod
+    def _local_tz():
+        """规则按调度器时区计算"""
+        return tz.gettz(current_app.config.get('SCHEDULER_TIMEZONE') or 'UTC')
+
+    @staticmethod
+    def _parse_cron_field(text, low, high):
+        """解析cron单个字段，支持 *、列表、范围和步长"""
+        values = set()
+        for part in text.split(','):
+            step = 1
+            if '/' in part:
+                part, step = part.split('/', 1)
+                step = int(step)
+                if step < 1:
+                    raise ValueError
+            if part == '*':
+                start, end = low, high
+            elif '-' in part:
+                start, end = (int(value) for value in part.split('-', 1))
+            else:
+                start = int(part)
+                end = high if step > 1 else start
+            if start < low or end > high or start > end:
+                raise ValueError
+            values.update(range(start, end + 1, step))
+        return sorted(values)
+
+    @staticmethod
+    def parse_cron(expression, dtstart):
+        """
+        将5段cron表达式(分 时 日 月 周)转换为 rrule
+        不支持同时限制日期和星期（cron中两者为“或”的关系）
+        """
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError("cron表达式应为5段: 分 时 日 月 周")
+
+        kwargs = {}
+        for text, (name, low, high) in zip(fields, RecurrenceService.CRON_FIELDS):
+            try:
+                values = RecurrenceService._parse_cron_field(text, low, high)
+            except ValueError:
+                raise ValueError(f"cron表达式字段无效: {text}")
+            # 日、月、周为 * 时不限制，分和时总是显式给出
+            if text != '*' or name in ('byminute', 'byhour'):
+                kwargs[name] = values
+
+        if 'bymonthday' in kwargs and 'byweekday' in kwargs:
+            raise ValueError("cron表达式不支持同时限制日期和星期")
+        if 'byweekday' in kwargs:
+            # cron中0和7为周日，rrule中0为周一
+            kwargs['byweekday'] = sorted({(day - 1) % 7 for day in kwargs['byweekday']})
+        if 'bymonthday' in kwargs:
+            months = kwargs.get('bymonth', range(1, 13))
+            if not any(day <= RecurrenceService.MONTH_DAYS[month - 1]
+                       for month in months for day in kwargs['bymonthday']):
+                raise ValueError("cron表达式永远不会执行")
+
+        return rr.rrule(rr.DAILY, dtstart=dtstart, bysecond=0, **kwargs)
+
+    @staticmethod
+    def build_rule(rule_type, rule, dtstart):
+        """
+        构造周期规则
+        :param dtstart: 带时区的起始时间，规则按其所在时区计算；生成任务按分钟执行，秒数忽略
+        :return: dateutil rrule/rruleset
+        """
+        dtstart = dtstart.replace(second=0, microsecond=0)
+        if rule_type == TaskRecurrence.RULE_TYPE_CRON:
+            return RecurrenceService.parse_cron(rule, dtstart)
+        if rule_type == TaskRecurrence.RULE_TYPE_RRULE:
+            if 'DTSTART' in rule.upper():
+                raise ValueError("RRULE中不能包含DTSTART，请通过dtstart设置起始时间")
+            try:
+                return rr.rrulestr(rule, dtstart=dtstart)
+            except (ValueError, TypeError) as e:
+                raise ValueError(f"RRULE无效: {e}")
+        raise ValueError(f"不支持的规则类型: {rule_type}")
+
+    @staticmethod
+    def _rule_of(recurrence, local_tz=None):
+        """构造周期规则对象的规则"""
+        local_tz = local_tz or RecurrenceService._local_tz()
+        dtstart = as_utc(recurrence.dtstart).astimezone(local_tz)
+        return RecurrenceService.build_rule(recurrence.rule_type, recurrence.rule, dtstart)
+
+    @staticmethod
+    def next_run(recurrence, after, inc=False):
+        """
+        计算 after 之后的下次执行时间
+        :return: UTC时间，规则已结束时返回None
+        """
+        local_tz = RecurrenceService._local_tz()
+        rule = RecurrenceService._rule_of(recurrence, local_tz)
+        run = rule.after(as_utc(after).astimezone(local_tz), inc=inc)
+        return run.astimezone(timezone.utc) if run else None
+
+    @staticmethod
+    def _validate(data, recurrence=None):
+        """
+        校验周期规则字段，更新时未提供的字段沿用原值
+        :return: 需要写入的字段字典
+        """
+        values = {}
+        for key in ('title', 'category', 'description', 'rule_type', 'rule'):
+            if key in data:
+                values[key] = data[key].strip() if isinstance(data[key], str) else data[key]
+        if 'current_handler_id' in data:
+            values['handler_id'] = data['current_handler_id']
+
+        def current(key, default=None):
+            if key in values:
+                return values[key]
+            return getattr(recurrence, key) if recurrence else default
+
+        from app.services.task_service import TaskService
+
+        title = current('title')
+        if not title or not current('rule') or not current('handler_id'):
+            raise ValueError("请提供完整信息")
+        if len(title) > 480:
+            raise ValueError("任务标题过长")
+        if current('category', TaskService.CATEGORY_PERIODIC) not in TaskService.CATEGORIES:
+            raise ValueError(f"不支持的任务分类: {current('category')}")
+        if current('rule_type', TaskRecurrence.RULE_TYPE_CRON) not in TaskRecurrence.RULE_TYPES:
+            raise ValueError(f"不支持的规则类型: {current('rule_type')}")
+
+        try:
+            values['handler_id'] = int(current('handler_id'))
+        except (TypeError, ValueError):
+            raise ValueError("处理人不存在")
+        if not db.session.query(User.id).filter_by(id=values['handler_id'], is_active=True).first():
+            raise ValueError("处理人不存在")
+
+        if 'duration_hours' in data:
+            try:
+                values['duration_minutes'] = int(round(float(data['duration_hours']) * 60))
+            except (TypeError, ValueError):
+                raise ValueError("期望完成时长格式错误")
+            if values['duration_minutes'] <= 0:
+                raise ValueError("期望完成时长必须大于0")
+
+        if 'catch_up' in data:
+            values['catch_up'] = data['catch_up'] is True or str(data['catch_up']).lower() == 'true'
+
+        if data.get('dtstart'):
+            try:
+                dtstart = datetime.fromisoformat(str(data['dtstart']).replace('Z', '+00:00'))
+            except ValueError:
+                raise ValueError("时间格式错误")
+            if dtstart.tzinfo is None:
+                dtstart = dtstart.replace(tzinfo=RecurrenceService._local_tz())
+            values['dtstart'] = dtstart.astimezone(timezone.utc)
+        elif not recurrence:
+            values['dtstart'] = datetime.now(timezone.utc)
+
+        # 校验规则本身
+        dtstart = as_utc(current('dtstart')).astimezone(RecurrenceService._local_tz())
+        RecurrenceService.build_rule(
+            current('rule_type', TaskRecurrence.RULE_TYPE_CRON), current('rule'), dtstart
+        )
+        return values
+
+    @staticmethod
+    def _schedule_from_now(recurrence):
+        """从当前时间（且不早于起始时间）重新计算下次执行时间，停用期间和过去的执行不补建"""
+        now = datetime.now(timezone.utc)
+        start = max(now, as_utc(recurrence.dtstart))
+        recurrence.next_run_at = RecurrenceService.next_run(recurrence, start, inc=True)
+        if recurrence.next_run_at is None:
+            recurrence.is_active = False
+
+    @staticmethod
+    def create_recurrence(data, creator_id):
+        """创建周期规则"""
+        from app.services.task_service import TaskService
+
+        values = RecurrenceService._validate(data)
+        values.setdefault('rule_type', TaskRecurrence.RULE_TYPE_CRON)
+        values.setdefault('category', TaskService.CATEGORY_PERIODIC)
+        values.setdefault('duration_minutes', 7 * 24 * 60)
+        values.setdefault('catch_up', True)
+        recurrence = TaskRecurrence(creator_id=creator_id, is_active=True, **values)
+        RecurrenceService._schedule_from_now(recurrence)
+        if recurrence.next_run_at is None:
+            raise ValueError("周期规则在起始时间之后不会再执行")
+        db.session.add(recurrence)
+        db.session.commit()
+        return recurrence
+
+    @staticmethod
+    def convert_legacy_tasks():
+        """
+        为尚未关联周期规则的“定时周期任务”创建周期规则
+        原任务按完成后7天重置，转换为以期望开始时间为起点、每周执行一次的规则（不补建错过的执行），
+        期望完成时长沿用原任务，原任务关联到新规则后保持不变；已关联的任务跳过，可重复执行
+        :return: 创建的周期规则数
+        """
+        from app.models.task import Task
+        from app.services.task_service import TaskService
+
+        tasks = Task.query.filter(
+            Task.category == TaskService.CATEGORY_PERIODIC,
+            Task.recurrence_id.is_(None)
+        ).order_by(Task.id.asc()).all()
+
+        converted = 0
+        for task in tasks:
+            dtstart = task.expected_start_time or task.created_at or datetime.now(timezone.utc)
+            duration_minutes = 7 * 24 * 60
+            if task.expected_start_time and task.expected_end_time:
+                window = task.expected_end_time - task.expected_start_time
+                if window.total_seconds() >= 60:
+                    duration_minutes = int(window.total_seconds() // 60)
+
+            recurrence = TaskRecurrence(
+                title=task.title,
+                category=task.category,
+                description=task.description or '',
+                creator_id=task.creator_id,
+                handler_id=task.current_handler_id,
+                rule_type=TaskRecurrence.RULE_TYPE_RRULE,
+                rule='FREQ=WEEKLY',
+                dtstart=as_utc(dtstart),
+                duration_minutes=duration_minutes,
+                catch_up=False,
+                is_active=True
+            )
+            RecurrenceService._schedule_from_now(recurrence)
+            db.session.add(recurrence)
+            db.session.flush()
+            task.recurrence_id = recurrence.id
+            converted += 1
+
+        db.session.commit()
+        return converted
+
+    @staticmethod
+    def _get_for_update(recurrence_id, user):
+        """获取待修改的周期规则并校验权限"""
+        recurrence = db.session.get(TaskRecurrence, recurrence_id)
+        if not recurrence:
+            return None
+        if not user.is_admin and recurrence.creator_id != user.id:
+            raise PermissionError("只有创建人或管理员可以修改周期任务")
+        return recurrence
+
+    @staticmethod
+    def update_recurrence(recurrence_id, data, user):
+        """
+        更新周期规则，规则或起始时间变化、重新启用时从当前时间重新计算下次执行时间
+        :return: 周期规则，不存在时返回None
+        """
+        recurrence = RecurrenceService._get_for_update(recurrence_id, user)
+        if not recurrence:
+            return None
+
+        values = RecurrenceService._validate(data, recurrence)
+        reschedule = any(
+            key in values and values[key] != getattr(recurrence, key) for key in ('rule_type', 'rule', 'dtstart')
+        )
+        for key, value in values.items():
+            setattr(recurrence, key, value)
+
+        if 'is_active' in data:
+            is_active = data['is_active'] is True or str(data['is_active']).lower() == 'true'
+            reschedule |= is_active and not recurrence.is_active
+            recurrence.is_active = is_active
+
+        if reschedule and recurrence.is_active:
+            RecurrenceService._schedule_from_now(recurrence)
+        db.session.commit()
+        return recurrence
+
+    @staticmethod
+    def deactivate_recurrence(recurrence_id, user):
+        """停用周期规则，已生成的任务保留"""
+        recurrence = RecurrenceService._get_for_update(recurrence_id, user)
+        if not recurrence:
+            return None
+        recurrence.is_active = False
+        db.session.commit()
+        return recurrence
+
+    @staticmethod
+    def list_recurrences(user, include_inactive=False):
+        """获取周期规则列表，非管理员只能看到自己创建或处理的规则"""
+        query = TaskRecurrence.query
+        if not user.is_admin:
+            query = query.filter(or_(TaskRecurrence.creator_id == user.id, TaskRecurrence.handler_id == user.id))
+        if not include_inactive:
+            query = query.filter(TaskRecurrence.is_active.is_(True))
+        return [recurrence.to_dict() for recurrence in query.order_by(TaskRecurrence.id.desc()).all()]
+
+    @staticmethod
+    def _due_runs(rule, start, now, catch_up):
+        """
+        规则在 [start, now] 内的执行时间
+        :return: (需要生成的执行时间列表, 因超过补建上限而跳过的次数)
+        """
+        limit = RecurrenceService.CATCH_UP_LIMIT if catch_up else 1
+        runs = deque(maxlen=limit)
+        total = 0
+        for run in rule.xafter(start, inc=True):
+            if run > now:
+                break
+            runs.append(run)
+            total += 1
+        return list(runs), total - len(runs)
+
+    @staticmethod
+    def generate_due(now=None):
+        """
+        为全部到期的周期规则生成任务实例
+        一次范围查询取出 next_run_at 已到期的规则，停机期间错过的执行按规则设置逐次补建或只补建最近一次，
+        任务与流转记录批量插入，规则的下次执行时间以原值为条件批量更新，整批一个事务提交；
+        PostgreSQL 下到期规则加行锁并跳过已被锁定的规则，(规则ID, 计划时间)唯一约束保证每次执行只生成一个任务，
+        单个规则插入失败只跳过该规则本次生成的任务
+        :return: 生成的任务数
+        """
+        from app.services.task_service import TaskService
+
+        now = now or datetime.now(timezone.utc)
+        local_tz = RecurrenceService._local_tz()
+        local_now = now.astimezone(local_tz)
+
+        query = TaskRecurrence.query.filter(
+            TaskRecurrence.is_active.is_(True),
+            TaskRecurrence.next_run_at <= now
+        ).order_by(TaskRecurrence.next_run_at.asc(), TaskRecurrence.id.asc()).limit(RecurrenceService.BATCH_SIZE)
+        if db.engine.dialect.name == 'postgresql':
+            query = query.with_for_update(skip_locked=True)
+        recurrences = query.all()
+        if not recurrences:
+            return 0
+
+        rows = []
+        advances = []
+        for recurrence in recurrences:
+            advance = {
+                'b_id': recurrence.id,
+                'b_previous': recurrence.next_run_at,
+                'b_next_run_at': recurrence.next_run_at,
+                'b_last_run_at': recurrence.last_run_at,
+                'b_is_active': False,
+            }
+            advances.append(advance)
+            try:
+                rule = RecurrenceService._rule_of(recurrence, local_tz)
+            except ValueError as e:
+                print(f'周期规则无效，已停用 recurrence_id={recurrence.id}: {str(e)}')
+                continue
+
+            start = as_utc(recurrence.next_run_at).astimezone(local_tz)
+            runs, skipped = RecurrenceService._due_runs(rule, start, local_now, recurrence.catch_up)
+            if skipped:
+                print(f'周期任务 {recurrence.title} 停机期间错过 {skipped + len(runs)} 次执行，'
+                      f'补建最近 {len(runs)} 次')
+
+            duration = timedelta(minutes=recurrence.duration_minutes)
+            for run in runs:
+                scheduled_at = run.astimezone(timezone.utc)
+                rows.append({
+                    'title': f'{recurrence.title}（{run:%Y-%m-%d %H:%M}）',
+                    'category': recurrence.category,
+                    'description': recurrence.description or '',
+                    'creator_id': recurrence.creator_id,
+                    'current_handler_id': recurrence.handler_id,
+                    'status': TaskService.STATUS_NEW,
+                    'progress': 0,
+                    'time_progress': 0,
+                    'expected_start_time': scheduled_at,
+                    'expected_end_time': scheduled_at + duration,
+                    'recurrence_id': recurrence.id,
+                    'scheduled_at': scheduled_at,
+                    'created_at': now,
+                    'updated_at': now,
+                })
+
+            next_run = rule.after(local_now)
+            advance['b_next_run_at'] = next_run.astimezone(timezone.utc) if next_run else None
+            advance['b_is_active'] = next_run is not None
+            if runs:
+                advance['b_last_run_at'] = runs[-1].astimezone(timezone.utc)
+
+        table = TaskRecurrence.__table__
+        try:
+            # 以原 next_run_at 为条件推进全部规则；影响行数不足说明其他进程已处理，整批放弃，下次执行重新查询
+            result = db.session.execute(table.update().where(
+                table.c.id == db.bindparam('b_id'),
+                table.c.next_run_at == db.bindparam('b_previous')
+            ).values(
+                next_run_at=db.bindparam('b_next_run_at'),
+                last_run_at=db.bindparam('b_last_run_at'),
+                is_active=db.bindparam('b_is_active'),
+                updated_at=now
+            ), advances)
+            if db.engine.dialect.supports_sane_multi_rowcount and result.rowcount != len(advances):
+                db.session.rollback()
+                return 0
+
+            created = RecurrenceService._insert_runs(rows, now) if rows else 0
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        return created
+
+    @staticmethod
+    def _insert_runs(rows, now):
+        """
+        插入生成的任务实例（不提交事务）
+        先在一个保存点内整批插入；违反唯一约束等错误时按规则逐个重试：跳过已存在的计划时间，
+        仍然失败的规则只放弃本次生成的任务，规则的 next_run_at 照常推进，不影响其他规则
+        :return: 插入的任务数
+        """
+        from app.models.task import Task
+
+        if RecurrenceService._insert_in_savepoint(rows, now):
+            return len(rows)
+
+        runs_by_rule = {}
+        for row in rows:
+            runs_by_rule.setdefault(row['recurrence_id'], []).append(row)
+
+        created = 0
+        for recurrence_id, rule_rows in runs_by_rule.items():
+            existing = {as_utc(scheduled_at) for scheduled_at, in db.session.query(Task.scheduled_at).filter(
+                Task.recurrence_id == recurrence_id,
+                Task.scheduled_at.in_([row['scheduled_at'] for row in rule_rows])
+            )}
+            rule_rows = [row for row in rule_rows if row['scheduled_at'] not in existing]
+            if rule_rows and RecurrenceService._insert_in_savepoint(rule_rows, now, recurrence_id):
+                created += len(rule_rows)
+        return created
+
+    @staticmethod
+    def _insert_in_savepoint(rows, now, recurrence_id=None):
+        """
+        在保存点内插入任务实例，失败时回滚到保存点并撤销期间记录的计数增量
+        :return: 是否插入成功
+        """
+        from app.models.task_statistics import TaskCounter
+        from app.services.task_service import TaskService
+
+        pending = dict(db.session.info.get(TaskCounter.PENDING_KEY, {}))
+        try:
+            with db.session.begin_nested():
+                TaskService._insert_new_tasks(rows, now)
+            return True
+        except IntegrityError as e:
+            db.session.info[TaskCounter.PENDING_KEY] = pending
+            if recurrence_id is None:
+                print(f'周期任务整批生成失败，按规则逐个重试: {str(e.orig)}')
+            else:
+                print(f'周期任务生成失败，跳过本次执行 recurrence_id={recurrence_id}: {str(e.orig)}')
+            return False
@@ -1,152 +1,218 @@
 """
 定时任务调度服务
+调度器启动时捕获应用实例，各任务由 SchedulerService.run_job 在新推入的应用上下文中执行，
+不再在每次执行时调用 create_app()；
+每个进程都会启动调度器，只有持有调度器租约的主进程执行定时任务，其余进程跳过
 """
-from app import scheduler
-from app.models.task import Task
-from datetime import datetime
+from app import db, scheduler
+from app.models.base import format_datetime
+from app.services.lease_service import LeaseService
+from datetime import datetime, timezone
+from flask import current_app
+import atexit
+import threading
+import time
+
+# 定时任务执行统计: job_id -> {'runs', 'failures', 'last_run_at', 'last_duration_ms', ...}
+job_stats = {}
+job_stats_lock = threading.Lock()
 
 
 class SchedulerService:
     """定时任务业务逻辑服务"""
 
     @staticmethod
-    def update_all_time_progress():
+    def run_job(app, job_id, func, leader_only=True):
         """
-        更新所有处理中任务的时间进度
+        在应用上下文中执行定时任务，记录耗时和影响行数
+        Flask-SQLAlchemy 的会话按应用上下文隔离，上下文退出时会话被移除、连接归还连接池，
+        任务之间不共享会话，也不会创建新的引擎
+        :param func: 任务函数，返回影响的行数
+        :param leader_only: 为True时本进程未持有调度器租约则跳过
         """
-        from app import db, create_app
-        from app.services.task_service import TaskService
+        if leader_only and not LeaseService.is_leader():
+            SchedulerService._record_skip(job_id)
+            return 0
+
+        started = time.perf_counter()
+        rows = 0
+        error = None
 
-        app = create_app()
         with app.app_context():
-            print(f'[{datetime.now()}] 开始更新时间进度')
+            try:
+                rows = func() or 0
+            except Exception as e:
+                db.session.rollback()
+                error = str(e)
+                print(f'[{datetime.now()}] 定时任务执行失败 {job_id}: {error}')
 
-            tasks = Task.query.filter(
-                Task.status.in_([TaskService.STATUS_PROCESSING]),
-                Task.expected_start_time.isnot(None),
-                Task.expected_end_time.isnot(None)
-            ).all()
+        duration_ms = (time.perf_counter() - started) * 1000
+        SchedulerService._record_job(job_id, duration_ms, rows, error)
+        return rows
 
-            for task in tasks:
-                try:
-                    task.time_progress = task.calculate_time_progress()
-                except Exception as e:
-                    print(f'更新时间进度失败 task_id={task.id}: {str(e)}')
+    @staticmethod
+    def _record_job(job_id, duration_ms, rows, error=None):
+        """记录一次任务执行结果"""
+        with job_stats_lock:
+            stats = job_stats.setdefault(job_id, {
+                'runs': 0,
+                'failures': 0,
+                'total_duration_ms': 0.0,
+                'max_duration_ms': 0.0,
+                'total_rows': 0,
+            })
+            stats['runs'] += 1
+            stats['failures'] += 1 if error else 0
+            stats['total_duration_ms'] += duration_ms
+            stats['max_duration_ms'] = max(stats['max_duration_ms'], duration_ms)
+            stats['total_rows'] += rows
+            stats['last_run_at'] = datetime.now(timezone.utc)
+            stats['last_duration_ms'] = duration_ms
+            stats['last_rows'] = rows
+            stats['last_error'] = error
 
-            db.session.commit()
-            print(f'[{datetime.now()}] 时间进度更新完成，共更新 {len(tasks)} 个任务')
+    @staticmethod
+    def _record_skip(job_id):
+        """记录一次因未持有租约而跳过的执行"""
+        with job_stats_lock:
+            stats = job_stats.setdefault(job_id, {
+                'runs': 0,
+                'failures': 0,
+                'total_duration_ms': 0.0,
+                'max_duration_ms': 0.0,
+                'total_rows': 0,
+            })
+            stats['skipped'] = stats.get('skipped', 0) + 1
+
+    @staticmethod
+    def get_job_stats():
+        """获取已注册定时任务的下次执行时间和执行统计"""
+        with job_stats_lock:
+            snapshot = {job_id: dict(stats) for job_id, stats in job_stats.items()}
+
+        result = []
+        for job in scheduler.get_jobs():
+            stats = snapshot.get(job.id, {})
+            runs = stats.get('runs', 0)
+            result.append({
+                'id': job.id,
+                'trigger': str(job.trigger),
+                'next_run_time': format_datetime(getattr(job, 'next_run_time', None)),
+                'runs': runs,
+                'failures': stats.get('failures', 0),
+                'skipped': stats.get('skipped', 0),
+                'last_run_at': format_datetime(stats.get('last_run_at')),
+                'last_duration_ms': round(stats['last_duration_ms'], 2) if runs else None,
+                'avg_duration_ms': round(stats['total_duration_ms'] / runs, 2) if runs else None,
+                'max_duration_ms': round(stats['max_duration_ms'], 2) if runs else None,
+                'last_rows': stats.get('last_rows'),
+                'total_rows': stats.get('total_rows', 0),
+                'last_error': stats.get('last_error'),
+            })
+        return result
 
     @staticmethod
-    def check_task_warnings():
+    def renew_scheduler_lease():
         """
-        检查任务预警
-        检查所有"处理中"状态的任务，如果时间进度超过阈值但处理进度不足，发送预警
+        获取或续约调度器租约
+        成为主进程时加载预警索引，失去租约时清空预警索引
+        :return: 持有租约时返回1
         """
-        from app import db, create_app
-        from app.services.task_service import TaskService
-
-        app = create_app()
-        with app.app_context():
-            print(f'[{datetime.now()}] 开始检查任务预警')
-
-            # 查询处理中的任务
-            processing_tasks = Task.query.filter(
-                Task.status == TaskService.STATUS_PROCESSING,
-                Task.expected_start_time.isnot(None),
-                Task.expected_end_time.isnot(None)
-            ).all()
-
-            warning_count = 0
-            for task in processing_tasks:
-                try:
-                    # 更新时间进度
-                    time_progress = task.calculate_time_progress()
-                    task.time_progress = time_progress
-                    db.session.commit()
-
-                    # 检查预警条件
-                    warning_level = SchedulerService._check_warning_level(task)
-                    if warning_level:
-                        # TODO: 发送预警通知
-                        print(f'任务预警: {task.title} - {warning_level}%剩余时间，当前进度{task.progress}%')
-                        warning_count += 1
-
-                except Exception as e:
-                    print(f'检查任务预警失败 task_id={task.id}: {str(e)}')
-                    db.session.rollback()
-
-            print(f'[{datetime.now()}] 任务预警检查完成，发现 {warning_count} 个预警')
+        from app.services.warning_service import WarningService
+
+        held, changed = LeaseService.heartbeat()
+        if changed and held:
+            print(f'[{datetime.now()}] 本进程成为调度主进程 {LeaseService.owner()}')
+            add_job(current_app._get_current_object(), WarningService.load_deadlines, 'load_task_deadlines',
+                    trigger='date')
+        elif changed:
+            print(f'[{datetime.now()}] 本进程失去调度器租约 {LeaseService.owner()}')
+            WarningService.unload_deadlines()
+        return 1 if held else 0
 
     @staticmethod
-    def _check_warning_level(task):
+    def update_all_time_progress():
         """
-        检查预警级别
-        :return: 20, 10, 5 或 None
+        更新所有处理中任务的时间进度
+        :return: 时间进度发生变化的任务数
         """
-        time_progress = task.time_progress
-        progress = task.progress
-
-        # 时间进度95%，但处理进度<95%
-        if time_progress >= 95 and progress < 95:
-            return 5
+        from app.services.task_service import TaskService
 
-        # 时间进度90%，但处理进度<90%
-        if time_progress >= 90 and progress < 90:
-            return 10
+        print(f'[{datetime.now()}] 开始更新时间进度')
+        updated = TaskService.refresh_time_progress()
+        print(f'[{datetime.now()}] 时间进度更新完成，共更新 {updated} 个任务')
+        return updated
 
-        # 时间进度80%，但处理进度<80%
-        if time_progress >= 80 and progress < 80:
-            return 20
+    @staticmethod
+    def generate_recurring_tasks():
+        """
+        按周期规则生成到期的周期任务实例
+        :return: 生成的任务数
+        """
+        from app.services.recurrence_service import RecurrenceService
 
-        return None
+        created = RecurrenceService.generate_due()
+        if created:
+            print(f'[{datetime.now()}] 周期任务生成完成，共生成 {created} 个任务')
+        return created
 
     @staticmethod
     def reset_periodic_tasks():
         """
-        重置周期任务
-        检查所有"定时周期任务"类型的任务，如果已完成或关闭，根据周期重置
+        重置尚未转换为周期规则的周期任务
+        只处理未关联周期规则(recurrence_id为空)的“定时周期任务”，已完成或关闭超过7天的原地重置；
+        运行 init_recurrences.py 转换后这些任务改由周期规则生成新实例
+        :return: 重置的任务数
         """
-        from app import db, create_app
+        from app.models.task import Task
         from app.services.task_service import TaskService
+        from app.services.warning_service import WarningService
         from datetime import timedelta
 
-        app = create_app()
-        with app.app_context():
-            print(f'[{datetime.now()}] 开始重置周期任务')
-
-            # 查询所有定时周期任务
-            periodic_tasks = Task.query.filter(
-                Task.category == TaskService.CATEGORY_PERIODIC,
-                Task.status.in_([TaskService.STATUS_COMPLETED, TaskService.STATUS_CLOSED])
-            ).all()
-
-            reset_count = 0
-            for task in periodic_tasks:
-                try:
-                    # 检查是否到达周期时间点
-                    if SchedulerService._should_reset_task(task):
-                        # 重置任务状态
-                        task.status = TaskService.STATUS_NEW
-                        task.progress = 0
-                        task.time_progress = 0
-                        task.actual_start_time = None
-                        task.actual_end_time = None
-
-                        # 更新期望时间(简单示例：7天周期)
-                        task.expected_start_time = datetime.now()
-                        task.expected_end_time = datetime.now() + timedelta(days=7)
-
-                        db.session.commit()
-
-                        # TODO: 发送通知
-                        print(f'周期任务已重置: {task.title}')
-                        reset_count += 1
-
-                except Exception as e:
-                    print(f'重置任务失败 task_id={task.id}: {str(e)}')
-                    db.session.rollback()
+        periodic_tasks = Task.query.filter(
+            Task.category == TaskService.CATEGORY_PERIODIC,
+            Task.recurrence_id.is_(None),
+            Task.status.in_([TaskService.STATUS_COMPLETED, TaskService.STATUS_CLOSED])
+        ).all()
+
+        reset_count = 0
+        for task in periodic_tasks:
+            try:
+                if SchedulerService._should_reset_task(task):
+                    before = TaskService._task_image(task)
+                    old_status = task.status
+
+                    # 重置任务状态
+                    task.status = TaskService.STATUS_NEW
+                    task.progress = 0
+                    task.time_progress = 0
+                    task.actual_start_time = None
+                    task.actual_end_time = None
+                    task.version = Task.version + 1
+
+                    # 更新期望时间(7天周期)
+                    task.expected_start_time = datetime.now()
+                    task.expected_end_time = datetime.now() + timedelta(days=7)
+
+                    # 更新状态统计、人员工作量和预警索引
+                    TaskService.update_statistics_on_update(old_status, task.status)
+                    WarningService.track(task.id, task.status, task.expected_start_time, task.expected_end_time)
+                    TaskService.apply_statistics_deltas(TaskService.workload_deltas(
+                        before=before, after=TaskService._task_image(task)
+                    ))
+
+                    TaskService.invalidate_list_cache()
+                    TaskService.invalidate_user_queue(task.current_handler_id)
+                    db.session.commit()
+                    reset_count += 1
+
+            except Exception as e:
+                print(f'重置任务失败 task_id={task.id}: {str(e)}')
+                db.session.rollback()
 
+        if reset_count:
             print(f'[{datetime.now()}] 周期任务重置完成，共重置 {reset_count} 个任务')
+        return reset_count
 
     @staticmethod
     def _should_reset_task(task):
@@ -160,63 +226,112 @@ class SchedulerService:
         days_since_completion = (datetime.now() - task.actual_end_time).days
         return days_since_completion >= 7
 
-
     @staticmethod
     def calculate_task_statistics():
-        """计算任务统计数据"""
-        from app import create_app
+        """
+        计算任务统计数据
+        :return: 统计的任务数
+        """
         from app.services.task_service import TaskService
 
-        app = create_app()
-        with app.app_context():
-            print(f'[{datetime.now()}] 开始计算任务统计')
-            try:
-                TaskService.calculate_full_statistics()
-                print(f'[{datetime.now()}] 任务统计计算完成')
-            except Exception as e:
-                print(f'计算任务统计失败: {str(e)}')
+        print(f'[{datetime.now()}] 开始计算任务统计')
+        total = TaskService.calculate_full_statistics()
+        print(f'[{datetime.now()}] 任务统计计算完成')
+        return total
 
+    @staticmethod
+    def reconcile_workload_counters():
+        """
+        按任务表校正人员工作量计数
+        :return: None
+        """
+        from app.services.task_service import TaskService
 
-def init_scheduler():
-    """初始化定时任务"""
+        print(f'[{datetime.now()}] 开始校正人员工作量计数')
+        TaskService.reconcile_workload_counters()
+        print(f'[{datetime.now()}] 人员工作量计数校正完成')
 
-    # 1. 更新时间进度 - 每30分钟执行一次
-    scheduler.add_job(
-        func=SchedulerService.update_all_time_progress,
-        trigger='interval',
-        minutes=30,
-        id='update_time_progress',
-        replace_existing=True
-    )
+    @staticmethod
+    def rollup_task_analytics():
+        """
+        增量汇总任务分析数据
+        :return: 处理的流转记录数
+        """
+        from app.services.analytics_service import AnalyticsService
 
-    # 2. 任务预警检测 - 每小时执行一次
-    scheduler.add_job(
-        func=SchedulerService.check_task_warnings,
-        trigger='interval',
-        hours=1,
-        id='check_task_warnings',
-        replace_existing=True
-    )
+        result = AnalyticsService.run_rollup()
+        print(f'[{datetime.now()}] 任务分析汇总完成，处理 {result["processed"]} 条流转记录')
+        return result['processed']
 
-    # 3. 周期任务重置 - 每天凌晨2点执行
-    scheduler.add_job(
-        func=SchedulerService.reset_periodic_tasks,
-        trigger='cron',
-        hour=2,
-        minute=0,
-        id='reset_periodic_tasks',
-        replace_existing=True
-    )
 
-    # 4. 任务统计计算 - 每5分钟执行一次
+def add_job(app, func, job_id, leader_only=True, **trigger_args):
+    """
+    注册由 SchedulerService.run_job 包装执行的定时任务
+    :param leader_only: 为True时只在持有调度器租约的进程中执行
+    """
     scheduler.add_job(
-        func=SchedulerService.calculate_task_statistics,
-        trigger='interval',
-        minutes=5,
-        id='calculate_task_statistics',
-        replace_existing=True
+        func=SchedulerService.run_job,
+        args=[app, job_id, func, leader_only],
+        id=job_id,
+        replace_existing=True,
+        **trigger_args
     )
 
+
+def add_lease_job(app):
+    """注册调度器租约续约任务，启动后立即执行一次；进程退出时释放租约"""
+    with app.app_context():
+        interval = LeaseService.heartbeat_interval()
+    add_job(app, SchedulerService.renew_scheduler_lease, 'renew_scheduler_lease', leader_only=False,
+            trigger='interval', seconds=interval, next_run_time=datetime.now(timezone.utc))
+    atexit.register(release_lease, app)
+
+
+def release_lease(app):
+    """释放调度器租约"""
+    with app.app_context():
+        LeaseService.release()
+
+
+def init_scheduler(app):
+    """
+    初始化定时任务
+    :param app: 应用实例，所有任务复用该实例推入应用上下文
+    """
+    from app.services.warning_service import WarningService
+
+    # 0. 调度器租约 - 每 TTL/3 续约一次，只有持有租约的进程执行以下任务
+    add_lease_job(app)
+
+    # 1. 更新时间进度 - 每30分钟执行一次
+    add_job(app, SchedulerService.update_all_time_progress, 'update_time_progress',
+            trigger='interval', minutes=30)
+
+    # 2. 任务预警 - 在预警索引中最早的阈值到达时间执行，没有待触发预警时每小时执行一次；
+    #    成为主进程时分批加载处理中任务的预警时刻，每分钟按流转记录同步其他进程的状态变更
+    add_job(app, WarningService.fire_due_warnings, WarningService.JOB_ID,
+            trigger='interval', hours=1, coalesce=True, misfire_grace_time=None)
+    add_job(app, WarningService.sync_deadlines, 'sync_task_deadlines', trigger='interval', minutes=1)
+
+    # 3. 周期任务生成 - 每分钟执行一次，按索引只查询 next_run_at 已到期的周期规则
+    add_job(app, SchedulerService.generate_recurring_tasks, 'generate_recurring_tasks',
+            trigger='interval', minutes=1, coalesce=True)
+
+    #    未转换为周期规则的旧周期任务仍按原方式每天凌晨2点重置
+    add_job(app, SchedulerService.reset_periodic_tasks, 'reset_periodic_tasks',
+            trigger='cron', hour=2, minute=0)
+
+    # 4. 任务统计计算 - 每5分钟按任务表重置全局统计计数；人员工作量计数由增量维护，
+    #    需要扫描全部未结束任务的校正每天凌晨3点执行一次
+    add_job(app, SchedulerService.calculate_task_statistics, 'calculate_task_statistics',
+            trigger='interval', minutes=5)
+    add_job(app, SchedulerService.reconcile_workload_counters, 'reconcile_workload_counters',
+            trigger='cron', hour=3, minute=0)
+
+    # 5. 任务分析增量汇总 - 每5分钟执行一次
+    add_job(app, SchedulerService.rollup_task_analytics, 'rollup_task_analytics',
+            trigger='interval', minutes=5)
+
     # 启动调度器
     if not scheduler.running:
         scheduler.start()
@@ -0,0 +1,235 @@
+"""
+任务全文搜索服务
+基于SQLite FTS5 trigram分词建立任务标题和描述的全文索引，中文无需分词即可做子串匹配。
+索引为外部内容表，由 tasks 表上的触发器保持同步；描述为富文本HTML，经 strip_html() 去除标签后再入索引，
+标签名和属性值不会被搜到。非SQLite数据库或索引未初始化时退化为LIKE查询。
+"""
+import html
+import re
+import sqlite3
+import time
+
+from app import db
+from app.models.task import Task
+from sqlalchemy import event, func, text, or_
+from sqlalchemy.engine import Engine
+
+# trigram 分词要求每个检索词至少3个字符
+MIN_TERM_LENGTH = 3
+
+# 高亮标记使用私用区字符，转义HTML后再替换为<mark>，原文中的标签和实体不会被当作HTML输出
+HIGHLIGHT_OPEN = '\ue000'
+HIGHLIGHT_CLOSE = '\ue001'
+
+# 摘要长度(字符)
+SNIPPET_LENGTH = 64
+
+# 索引未建立时重新检查的间隔(秒)
+INDEX_RECHECK_SECONDS = 60
+
+SCRIPT_PATTERN = re.compile(r'<(script|style)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+TAG_PATTERN = re.compile(r'<[^>]*>')
+SPACE_PATTERN = re.compile(r'\s+')
+
+INDEX_TRIGGERS = ['task_search_ai', 'task_search_ad', 'task_search_au']
+
+# 触发器删除索引条目时必须传入与写入时相同的值，因此写入和删除都经过 strip_html()
+INDEX_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS task_search USING fts5(
+        title, description,
+        content='tasks', content_rowid='id',
+        tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER task_search_ai AFTER INSERT ON tasks BEGIN
+        INSERT INTO task_search(rowid, title, description)
+        VALUES (new.id, new.title, strip_html(new.description));
+    END
+    """,
+    """
+    CREATE TRIGGER task_search_ad AFTER DELETE ON tasks BEGIN
+        INSERT INTO task_search(task_search, rowid, title, description)
+        VALUES ('delete', old.id, old.title, strip_html(old.description));
+    END
+    """,
+    """
+    CREATE TRIGGER task_search_au AFTER UPDATE OF title, description ON tasks BEGIN
+        INSERT INTO task_search(task_search, rowid, title, description)
+        VALUES ('delete', old.id, old.title, strip_html(old.description));
+        INSERT INTO task_search(rowid, title, description)
+        VALUES (new.id, new.title, strip_html(new.description));
+    END
+    """,
+]
+
+# 索引可用性缓存 {engine_url: (是否可用, 检查时间)}，已建立的索引不会消失，未建立时定期重新检查
+_index_available = {}
+
+
+class SearchService:
+    """任务全文搜索服务"""
+
+    @staticmethod
+    def is_supported():
+        """当前数据库是否支持FTS5索引"""
+        return db.engine.dialect.name == 'sqlite'
+
+    @staticmethod
+    def is_available():
+        """全文索引是否已建立"""
+        key = str(db.engine.url)
+        cached = _index_available.get(key)
+        if cached and (cached[0] or time.monotonic() - cached[1] < INDEX_RECHECK_SECONDS):
+            return cached[0]
+
+        available = False
+        if SearchService.is_supported():
+            available = db.session.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'task_search'"
+            )).first() is not None
+        _index_available[key] = (available, time.monotonic())
+        return available
+
+    @staticmethod
+    def init_index():
+        """
+        创建全文索引表并重建同步触发器
+        旧版本触发器按原始HTML写入索引，触发器变更后需调用 rebuild_index() 重写已有条目
+        """
+        if not SearchService.is_supported():
+            raise RuntimeError("全文索引仅支持SQLite数据库")
+
+        for trigger in INDEX_TRIGGERS:
+            db.session.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+        for ddl in INDEX_DDL:
+            db.session.execute(text(ddl))
+        db.session.commit()
+        _index_available[str(db.engine.url)] = (True, time.monotonic())
+
+    @staticmethod
+    def rebuild_index():
+        """
+        根据tasks表重建全文索引
+        FTS5的 'rebuild' 命令直接读取tasks表原文，这里清空后按去除标签的描述重新写入
+        """
+        SearchService.init_index()
+        db.session.execute(text("INSERT INTO task_search(task_search) VALUES ('delete-all')"))
+        db.session.execute(text("""
+            INSERT INTO task_search(rowid, title, description)
+            SELECT id, title, strip_html(description) FROM tasks
+        """))
+        db.session.commit()
+
+    @staticmethod
+    def build_match_query(keyword):
+        """
+        将搜索词转换为FTS5 MATCH表达式
+        以空白分隔的多个词按AND组合；存在少于3个字符的词时无法使用trigram索引，返回None
+        """
+        terms = keyword.split()
+        if not terms or any(len(term) < MIN_TERM_LENGTH for term in terms):
+            return None
+        return ' AND '.join('"' + term.replace('"', '""') + '"' for term in terms)
+
+    @staticmethod
+    def render_highlight(marked):
+        """转义HTML后将高亮标记替换为<mark>标签"""
+        if marked is None:
+            return None
+        escaped = html.escape(marked, quote=False)
+        return escaped.replace(HIGHLIGHT_OPEN, '<mark>').replace(HIGHLIGHT_CLOSE, '</mark>')
+
+    @staticmethod
+    def strip_html(value):
+        """去除HTML标签和实体，返回纯文本"""
+        plain = html.unescape(TAG_PATTERN.sub(' ', SCRIPT_PATTERN.sub(' ', value or '')))
+        plain = plain.replace(HIGHLIGHT_OPEN, '').replace(HIGHLIGHT_CLOSE, '')
+        return SPACE_PATTERN.sub(' ', plain).strip()
+
+    @staticmethod
+    def build_snippet(description, terms):
+        """
+        从描述的纯文本中截取第一个命中词附近的摘要并高亮全部命中词
+        描述为富文本HTML，直接截取可能得到不完整的标签，因此先去除标签再截取
+        :return: 转义后的HTML片段，描述为空时返回None
+        """
+        plain = SearchService.strip_html(description)
+        if not plain:
+            return None
+
+        pattern = re.compile('|'.join(re.escape(term) for term in sorted(terms, key=len, reverse=True)),
+                             re.IGNORECASE)
+        match = pattern.search(plain)
+        start = max(0, match.start() - SNIPPET_LENGTH // 4) if match else 0
+        end = min(len(plain), start + SNIPPET_LENGTH)
+        window = pattern.sub(lambda m: HIGHLIGHT_OPEN + m.group(0) + HIGHLIGHT_CLOSE, plain[start:end])
+
+        return ('...' if start > 0 else '') + SearchService.render_highlight(window) + \
+            ('...' if end < len(plain) else '')
+
+    @staticmethod
+    def apply_search_filter(query, keyword):
+        """在任务查询上追加搜索条件"""
+        match_query = SearchService.build_match_query(keyword) if SearchService.is_available() else None
+        if match_query:
+            matched_ids = text("SELECT rowid FROM task_search WHERE task_search MATCH :match_query")\
+                .bindparams(match_query=match_query)
+            return query.filter(Task.id.in_(matched_ids))
+
+        # 与索引一致，SQLite上按去除标签后的描述匹配
+        description = func.strip_html(Task.description) if SearchService.is_supported() else Task.description
+        search_pattern = f"%{keyword}%"
+        return query.filter(or_(
+            Task.title.ilike(search_pattern),
+            description.ilike(search_pattern)
+        ))
+
+    @staticmethod
+    def search(keyword, limit=20):
+        """
+        按相关度搜索任务
+        每个检索词不少于3个字符时走trigram索引并按bm25排序；存在1～2个字符的词时退化为LIKE全表扫描，
+        按创建时间倒序返回，rank 和 snippet 为None
+        :return: [{'id', 'rank', 'title_highlight', 'snippet'}]，按相关度排序
+        """
+        match_query = SearchService.build_match_query(keyword) if SearchService.is_available() else None
+        if not match_query:
+            # 无法使用索引时按创建时间倒序返回匹配结果
+            tasks = SearchService.apply_search_filter(Task.query, keyword)\
+                .order_by(Task.created_at.desc()).limit(limit).all()
+            return [{
+                'id': task.id,
+                'rank': None,
+                'title_highlight': SearchService.render_highlight(task.title),
+                'snippet': None
+            } for task in tasks]
+
+        rows = db.session.execute(text("""
+            SELECT rowid,
+                   bm25(task_search, 10.0, 1.0) AS rank,
+                   highlight(task_search, 0, :open, :close) AS title_highlight,
+                   description
+            FROM task_search
+            WHERE task_search MATCH :match_query
+            ORDER BY rank
+            LIMIT :limit
+        """), {
+            'match_query': match_query, 'limit': limit, 'open': HIGHLIGHT_OPEN, 'close': HIGHLIGHT_CLOSE
+        }).all()
+
+        terms = keyword.split()
+        return [{
+            'id': row.rowid,
+            'rank': row.rank,
+            'title_highlight': SearchService.render_highlight(row.title_highlight),
+            'snippet': SearchService.build_snippet(row.description, terms)
+        } for row in rows]
+
+
+@event.listens_for(Engine, 'connect')
+def _register_sqlite_functions(dbapi_connection, connection_record):
+    """为SQLite连接注册 strip_html()，供索引触发器和LIKE退化查询使用"""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.create_function('strip_html', 1, SearchService.strip_html, deterministic=True)
@@ -2,11 +2,40 @@
 任务服务
 """
 from app import db
-from app.models.task import Task
+from app.models.task import Task, calculate_time_progress, calculate_time_progress_batch, time_progress_sql
+from app.models.base import format_datetime
 from app.models.user import User
 from app.models.task_transfer import TaskTransfer
-from datetime import datetime, timezone
-from sqlalchemy.orm import joinedload
+from app.models.task_comment import TaskComment
+from app.models.task_statistics import TaskCounter
+from app.services.search_service import SearchService
+from app.services.user_service import UserService
+from app.services.warning_service import WarningService
+from datetime import datetime, timedelta, timezone
+from collections import defaultdict
+import threading
+import time
+from sqlalchemy import tuple_, func, insert, update, or_
+from sqlalchemy.orm import aliased, joinedload, selectinload
+from app.utils.cursor import encode_cursor, decode_cursor, DIRECTION_NEXT, DIRECTION_PREV
+from app.utils.cache import TTLCache
+
+# (任务列表版本号, 筛选条件) -> 任务总数 的缓存，任务增删改时递增版本号使旧结果失效；
+# 版本号保存在计数器表中，与任务变更同一事务提交，所有进程读到的版本一致
+task_count_cache = TTLCache(maxsize=1024, ttl=300)
+
+# 用户待办/通知结果缓存，键中带用户队列版本号，队列变化时递增版本号使旧结果失效；
+# 版本号保存在计数器表中，与任务变更同一事务提交，所有进程读到的版本一致；
+# 待办结果包含时间进度，过期时间与列表ETag时间窗口一致
+user_queue_cache = TTLCache(maxsize=4096, ttl=60)
+
+# 统计快照: {'counter_version', 'version', 'loaded_at', 'data', 'etag'}，整体替换，读取无需加锁
+statistics_snapshot = {'current': None}
+statistics_snapshot_lock = threading.Lock()
+
+
+class TaskConflictError(ValueError):
+    """任务已被并发修改（版本号或状态与读取时不一致）"""
 
 
 class TaskService:
@@ -26,14 +55,104 @@ class TaskService:
     CATEGORY_OTHER = '其他任务'
     CATEGORY_PERIODIC = '定时周期任务'
     CATEGORY_NORMAL = '普通任务'
+    CATEGORIES = [CATEGORY_VERSION, CATEGORY_URGENT, CATEGORY_OTHER, CATEGORY_PERIODIC, CATEGORY_NORMAL]
+
+    # 状态流转表: action -> 允许的当前状态、目标状态、流转类型，以及管理员是否可代为操作
+    TRANSITIONS = {
+        'transfer': {
+            'from': [STATUS_NEW, STATUS_PENDING, STATUS_PROCESSING, STATUS_SUSPENDED],
+            'to': STATUS_PENDING,
+            'transfer_type': '流转',
+            'label': '流转',
+            'admin_allowed': True,
+            'permission_error': '只有当前处理人或管理员可以流转任务',
+        },
+        'respond': {
+            'from': [STATUS_NEW, STATUS_PENDING, STATUS_SUSPENDED],
+            'to': STATUS_PROCESSING,
+            'transfer_type': '响应',
+            'label': '响应',
+            'admin_allowed': False,
+            'permission_error': '只有当前处理人可以响应任务',
+        },
+        'suspend': {
+            'from': [STATUS_PROCESSING],
+            'to': STATUS_SUSPENDED,
+            'transfer_type': '挂起',
+            'label': '挂起',
+            'admin_allowed': True,
+            'permission_error': '只有当前处理人或管理员可以挂起任务',
+        },
+        'complete': {
+            'from': [STATUS_NEW, STATUS_PENDING, STATUS_PROCESSING, STATUS_SUSPENDED],
+            'to': STATUS_COMPLETED,
+            'transfer_type': '完成',
+            'label': '完成',
+            'admin_allowed': True,
+            'permission_error': '只有当前处理人或管理员可以完成任务',
+        },
+        'close': {
+            'from': [STATUS_NEW, STATUS_PENDING, STATUS_PROCESSING, STATUS_SUSPENDED, STATUS_COMPLETED],
+            'to': STATUS_CLOSED,
+            'transfer_type': '关闭',
+            'label': '关闭',
+            'admin_allowed': True,
+            'permission_error': '只有当前处理人或管理员可以关闭任务',
+        },
+    }
+
+    # 支持批量执行的操作
+    BULK_ACTIONS = ['transfer', 'complete', 'close']
+
+    # 未结束的任务状态，计入人员工作量
+    OPEN_STATUSES = [STATUS_NEW, STATUS_PENDING, STATUS_PROCESSING, STATUS_SUSPENDED]
+
+    # 工作量统计的角色和排行榜排序字段
+    WORKLOAD_ROLES = ['handler', 'creator']
+    WORKLOAD_SORT_KEYS = ['open_total', 'overdue', 'completed_7d', 'completed_30d']
+    WORKLOAD_COUNTER_TYPES = [f'{role}_{metric}' for role in WORKLOAD_ROLES
+                              for metric in ('status', 'due', 'completed')]
+    # 全局统计使用的计数类型
+    OVERVIEW_COUNTER_TYPES = ['overview', 'status_distribution', 'category_distribution']
+    # 用户队列版本号的计数类型，计数键为用户ID
+    USER_QUEUE_COUNTER = 'user_queue'
+    # 任务列表版本号的计数器
+    LIST_VERSION_COUNTER = ('task_list', 'version')
+
+    # 列表总数统计方式
+    COUNT_EXACT = 'exact'
+    COUNT_ESTIMATE = 'estimate'
+    COUNT_NONE = 'none'
+    COUNT_MODES = [COUNT_EXACT, COUNT_ESTIMATE, COUNT_NONE]
+
+    # 列表接口可返回的字段（与 Task.to_dict() 一致），可通过 fields 参数按需选择
+    LIST_FIELDS = ['id', 'title', 'category', 'status', 'progress', 'time_progress',
+                   'creator_id', 'creator_name', 'current_handler_id', 'current_handler_name',
+                   'expected_start_time', 'expected_end_time', 'created_at', 'updated_at']
+    DATETIME_FIELDS = {'expected_start_time', 'expected_end_time', 'created_at', 'updated_at'}
+
+    # 任务详情聚合接口可附带的子列表
+    BUNDLE_INCLUDES = ['transfers', 'comments', 'attachments']
+
+    # 列表ETag的时间窗口(秒)
+    ETAG_TIME_WINDOW = 60
+
+    # 统计快照最长使用时间(秒)，用于感知其他进程写入的计数
+    STATISTICS_SNAPSHOT_TTL = 5
+
+    # 定时刷新时间进度时每个事务覆盖的任务ID区间大小
+    TIME_PROGRESS_CHUNK_SIZE = 5000
+
+    # 支持在数据库端计算时间进度的数据库
+    TIME_PROGRESS_SQL_DIALECTS = ['sqlite', 'postgresql']
 
     @staticmethod
     def create_task(title, category, description, creator_id, current_handler_id,
                     expected_start_time=None, expected_end_time=None):
         """创建任务"""
         # 验证用户存在
-        creator = User.query.get(creator_id)
-        handler = User.query.get(current_handler_id)
+        creator = UserService.get_user_by_id(creator_id)
+        handler = UserService.get_user_by_id(current_handler_id)
 
         if not creator or not handler:
             raise ValueError("创建人或处理人不存在")
@@ -73,212 +192,464 @@ class TaskService:
         except Exception as e:
             print(f'更新统计失败: {str(e)}')
 
+        TaskService.invalidate_list_cache()
+        TaskService.invalidate_user_queue(current_handler_id)
         db.session.commit()
 
         return task
 
     @staticmethod
-    def get_task_by_id(task_id):
-        """根据ID获取任务"""
-        return Task.query.get(task_id)
+    def _parse_datetime(value):
+        """解析ISO格式时间字符串，空值返回None"""
+        if not value:
+            return None
+        if isinstance(value, datetime):
+            return value
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00'))
 
     @staticmethod
-    def transfer_task(task_id, operator_id, target_user_id, message=''):
-        """流转任务"""
-        task = Task.query.get(task_id)
-        if not task:
-            raise ValueError("任务不存在")
+    def _validate_bulk_item(item, valid_user_ids):
+        """
+        校验批量创建中的单个任务
+        :return: 插入tasks表的行字典
+        """
+        if not isinstance(item, dict):
+            raise ValueError("任务数据格式错误")
+
+        title = item.get('title')
+        category = item.get('category')
+        current_handler_id = item.get('current_handler_id')
+
+        if not all([title, category, current_handler_id]):
+            raise ValueError("请提供完整信息")
+        if category not in TaskService.CATEGORIES:
+            raise ValueError(f"不支持的任务分类: {category}")
+        try:
+            current_handler_id = int(current_handler_id)
+        except (TypeError, ValueError):
+            raise ValueError("处理人不存在")
+        if current_handler_id not in valid_user_ids:
+            raise ValueError("处理人不存在")
 
-        # 权限检查
-        operator = User.query.get(operator_id)
-        target_user = User.query.get(target_user_id)
+        try:
+            expected_start_time = TaskService._parse_datetime(item.get('expected_start_time'))
+            expected_end_time = TaskService._parse_datetime(item.get('expected_end_time'))
+        except (TypeError, ValueError):
+            raise ValueError("时间格式错误")
 
-        if not operator or not target_user:
-            raise ValueError("操作人或目标用户不存在")
+        if expected_start_time and expected_end_time:
+            if expected_end_time <= expected_start_time:
+                raise ValueError("期望完成时间必须大于期望开始时间")
 
-        if not operator.is_admin and task.current_handler_id != operator_id:
-            raise PermissionError("只有当前处理人或管理员可以流转任务")
+        return {
+            'title': title,
+            'category': category,
+            'description': item.get('description', ''),
+            'current_handler_id': current_handler_id,
+            'expected_start_time': expected_start_time,
+            'expected_end_time': expected_end_time,
+        }
 
-        # 保存旧状态
-        old_status = task.status
+    @staticmethod
+    def _insert_new_tasks(rows, now):
+        """
+        批量插入新建任务及初始流转记录，并合并写入统计增量（不提交事务）
+        :param rows: 插入tasks表的行字典，需包含 creator_id、current_handler_id、category 和 status
+        :return: 与 rows 顺序一致的任务ID列表
+        """
+        # executemany 插入任务并通过 RETURNING 取回自增ID。
+        # SQLite 不保证 RETURNING 的返回顺序，要求按参数顺序返回时 SQLAlchemy 会退化为逐行插入；
+        # 而同一事务内多行 VALUES 分配的 rowid 与参数顺序一致，因此对ID升序排序即可对应到输入行
+        if db.engine.dialect.name == 'sqlite':
+            task_ids = sorted(db.session.execute(insert(Task).returning(Task.id), rows).scalars().all())
+        else:
+            task_ids = db.session.execute(
+                insert(Task).returning(Task.id, sort_by_parameter_order=True), rows
+            ).scalars().all()
+
+        db.session.execute(insert(TaskTransfer), [{
+            'task_id': task_id,
+            'operator_id': row['creator_id'],
+            'target_user_id': row['current_handler_id'],
+            'message': '任务创建',
+            'transfer_type': '创建',
+            'created_at': now,
+        } for task_id, row in zip(task_ids, rows)])
+
+        # 统计增量合并后一次写入
+        deltas = defaultdict(int)
+        deltas[('overview', 'total')] += len(rows)
+        for row in rows:
+            deltas[('status_distribution', row['status'])] += 1
+            deltas[('category_distribution', row['category'])] += 1
+            for key, delta in TaskService.workload_deltas(after=TaskService._task_image(row)).items():
+                deltas[key] += delta
+        TaskService.apply_statistics_deltas(deltas)
+        TaskService.invalidate_list_cache()
+        TaskService.invalidate_user_queue(*{row['current_handler_id'] for row in rows})
+        return task_ids
 
-        # 更新任务
-        task.current_handler_id = target_user_id
-        task.status = TaskService.STATUS_PENDING
+    @staticmethod
+    def bulk_create_tasks(items, creator_id, atomic=False):
+        """
+        批量创建任务
+        所有用户ID一次查询校验，任务与初始流转记录分别批量插入，统计增量合并后一次写入，整批一个事务提交。
+        :param items: 任务数据列表，字段与单个创建接口一致
+        :param atomic: 为True时任一任务校验失败则整批不创建
+        :return: {'created': [{'index', 'id'}], 'errors': [{'index', 'message'}]}
+        """
+        # 一次查询校验创建人和全部处理人
+        user_ids = {creator_id}
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            try:
+                user_ids.add(int(item.get('current_handler_id')))
+            except (TypeError, ValueError):
+                pass
+        valid_user_ids = {
+            user_id for user_id, in db.session.query(User.id).filter(
+                User.id.in_(user_ids), User.is_active.is_(True)
+            ).all()
+        }
+        if creator_id not in valid_user_ids:
+            raise ValueError("创建人不存在")
+
+        rows = []
+        indexes = []
+        errors = []
+        for index, item in enumerate(items):
+            try:
+                rows.append(TaskService._validate_bulk_item(item, valid_user_ids))
+                indexes.append(index)
+            except ValueError as e:
+                errors.append({'index': index, 'message': str(e)})
+
+        if errors and atomic:
+            return {'created': [], 'errors': errors}
+        if not rows:
+            return {'created': [], 'errors': errors}
 
-        # 创建流转记录
-        transfer = TaskTransfer(
-            task_id=task_id,
-            operator_id=operator_id,
-            target_user_id=target_user_id,
-            message=message,
-            transfer_type='流转'
-        )
-        db.session.add(transfer)
+        now = datetime.now(timezone.utc)
+        for row in rows:
+            row.update({
+                'creator_id': creator_id,
+                'status': TaskService.STATUS_NEW,
+                'progress': 0,
+                'time_progress': 0,
+                'created_at': now,
+                'updated_at': now,
+            })
 
-        # 更新统计
         try:
-            TaskService.update_statistics_on_update(old_status, task.status)
-        except Exception as e:
-            print(f'更新统计失败: {str(e)}')
-
-        db.session.commit()
+            task_ids = TaskService._insert_new_tasks(rows, now)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
 
-        return task
+        return {
+            'created': [{'index': index, 'id': task_id} for index, task_id in zip(indexes, task_ids)],
+            'errors': errors
+        }
 
     @staticmethod
-    def respond_task(task_id, user_id):
-        """响应任务"""
-        task = Task.query.get(task_id)
-        if not task:
-            raise ValueError("任务不存在")
+    def get_task_by_id(task_id):
+        """根据ID获取任务"""
+        return Task.query.get(task_id)
 
-        if task.current_handler_id != user_id:
-            raise PermissionError("只有当前处理人可以响应任务")
+    @staticmethod
+    def _parse_version(value):
+        """解析客户端提交的版本号，未提交返回None"""
+        if value is None:
+            return None
+        if isinstance(value, bool):
+            raise ValueError("版本号格式错误")
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise ValueError("版本号格式错误")
 
-        if task.status not in [TaskService.STATUS_NEW, TaskService.STATUS_PENDING, TaskService.STATUS_SUSPENDED]:
-            raise ValueError(f"任务当前状态({task.status})不允许响应")
+    @staticmethod
+    def update_task(task_id, operator, data):
+        """
+        编辑任务描述和进度
+        以一条 UPDATE ... WHERE id=? AND version=? 完成变更，未提交版本号时使用读取到的版本号；
+        影响行数为0说明任务已被并发修改，抛出 TaskConflictError。
+        :return: 更新后的任务，任务不存在返回None
+        :raises: PermissionError, ValueError
+        """
+        expected_version = TaskService._parse_version(data.get('version'))
+
+        current = db.session.query(Task.version, Task.current_handler_id).filter(Task.id == task_id).first()
+        if not current:
+            return None
+        if not operator.is_admin and current.current_handler_id != operator.id:
+            raise PermissionError("只有当前处理人或管理员可以编辑任务")
+        if expected_version is not None and expected_version != current.version:
+            raise TaskConflictError("任务已被其他人修改，请刷新后重试")
+
+        values = {'version': Task.version + 1}
+        for key in ('description', 'progress'):
+            if key in data:
+                values[key] = data[key]
+
+        result = db.session.execute(
+            update(Task)
+            .where(Task.id == task_id, Task.version == current.version)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            db.session.rollback()
+            raise TaskConflictError("任务已被其他人修改，请刷新后重试")
 
-        old_status = task.status
-        task.status = TaskService.STATUS_PROCESSING
-        if not task.actual_start_time:
-            task.actual_start_time = datetime.now(timezone.utc)
+        TaskService.invalidate_list_cache()
+        TaskService.invalidate_user_queue(current.current_handler_id)
+        db.session.commit()
 
-        # 创建流转记录
-        transfer = TaskTransfer(
-            task_id=task_id,
-            operator_id=user_id,
-            target_user_id=user_id,
-            message='响应任务',
-            transfer_type='响应'
-        )
-        db.session.add(transfer)
+        return db.session.get(Task, task_id, populate_existing=True)
 
-        # 更新统计
-        try:
-            TaskService.update_statistics_on_update(old_status, task.status)
-        except Exception as e:
-            print(f'更新统计失败: {str(e)}')
+    @staticmethod
+    def task_exists(task_id):
+        """任务是否存在（只查询主键）"""
+        return db.session.query(Task.id).filter(Task.id == task_id).first() is not None
 
-        db.session.commit()
+    @staticmethod
+    def _check_transition(action, rule, task_row, operator):
+        """检查操作人权限和任务当前状态是否允许执行该操作"""
+        is_handler = task_row.current_handler_id == operator.id
+        if not is_handler and not (rule['admin_allowed'] and operator.is_admin):
+            raise PermissionError(rule['permission_error'])
+        if task_row.status not in rule['from']:
+            raise ValueError(f"任务当前状态({task_row.status})不允许{rule['label']}")
 
-        return task
+    @staticmethod
+    def _transition_values(action, rule, now, target_user_id=None):
+        """构造状态变更的SET子句，版本号在数据库端自增"""
+        values = {
+            'status': rule['to'],
+            'version': Task.version + 1,
+            'updated_at': now,
+        }
+        if action == 'transfer':
+            values['current_handler_id'] = target_user_id
+        elif action == 'respond':
+            values['actual_start_time'] = func.coalesce(Task.actual_start_time, now)
+        elif action == 'complete':
+            values['progress'] = 100
+            values['actual_end_time'] = now
+        elif action == 'close':
+            values['actual_end_time'] = func.coalesce(Task.actual_end_time, now)
+        return values
 
     @staticmethod
-    def complete_task(task_id, user_id, message=''):
-        """完成任务"""
-        task = Task.query.get(task_id)
-        if not task:
-            raise ValueError("任务不存在")
+    def apply_transition(action, task_id, operator_id, target_user_id=None, message='', expected_version=None):
+        """
+        按状态流转表执行任务状态变更
+        读取任务状态和版本号后，以一条 UPDATE ... WHERE id=? AND status IN (...) AND version=? 完成变更，
+        影响行数为0说明任务已被并发修改，抛出 TaskConflictError。
+        :param expected_version: 客户端持有的版本号，与当前版本不一致时直接报冲突
+        :return: 变更后的任务
+        """
+        rule = TaskService.TRANSITIONS[action]
+
+        operator = UserService.get_user_by_id(operator_id)
+        if not operator:
+            raise ValueError("操作人不存在")
+        if action == 'transfer' and not UserService.get_user_by_id(target_user_id):
+            raise ValueError("操作人或目标用户不存在")
 
-        user = User.query.get(user_id)
-        if not user.is_admin and task.current_handler_id != user_id:
-            raise PermissionError("只有当前处理人或管理员可以完成任务")
+        current = db.session.query(
+            Task.status, Task.version, Task.current_handler_id, Task.creator_id,
+            Task.expected_start_time, Task.expected_end_time
+        ).filter(Task.id == task_id).first()
+        if not current:
+            raise ValueError("任务不存在")
 
-        old_status = task.status
-        task.status = TaskService.STATUS_COMPLETED
-        task.progress = 100
-        task.actual_end_time = datetime.now(timezone.utc)
+        TaskService._check_transition(action, rule, current, operator)
+        expected_version = TaskService._parse_version(expected_version)
+        if expected_version is not None and expected_version != current.version:
+            raise TaskConflictError("任务已被其他人修改，请刷新后重试")
 
-        transfer = TaskTransfer(
+        now = datetime.now(timezone.utc)
+        result = db.session.execute(
+            update(Task)
+            .where(Task.id == task_id, Task.status.in_(rule['from']), Task.version == current.version)
+            .values(**TaskService._transition_values(action, rule, now, target_user_id))
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            db.session.rollback()
+            raise TaskConflictError("任务已被其他人修改，请刷新后重试")
+
+        if action == 'transfer':
+            transfer_target_id = target_user_id
+        elif action == 'respond':
+            transfer_target_id = operator_id
+        else:
+            transfer_target_id = current.current_handler_id
+
+        db.session.add(TaskTransfer(
             task_id=task_id,
-            operator_id=user_id,
-            target_user_id=task.current_handler_id,
+            operator_id=operator_id,
+            target_user_id=transfer_target_id,
             message=message,
-            transfer_type='完成'
-        )
-        db.session.add(transfer)
+            transfer_type=rule['transfer_type']
+        ))
+        WarningService.track(task_id, rule['to'], current.expected_start_time, current.expected_end_time)
 
         # 更新统计
         try:
-            TaskService.update_statistics_on_update(old_status, task.status)
+            TaskService.update_statistics_on_update(current.status, rule['to'])
+            TaskService.apply_statistics_deltas(TaskService.workload_deltas(
+                before=TaskService._task_image(current),
+                after=TaskService._transition_image(action, rule, current, target_user_id),
+                completed=action == 'complete'
+            ))
         except Exception as e:
             print(f'更新统计失败: {str(e)}')
 
+        TaskService.invalidate_list_cache()
+        TaskService.invalidate_user_queue(current.current_handler_id, target_user_id)
         db.session.commit()
 
-        return task
+        return db.session.get(Task, task_id, populate_existing=True)
 
     @staticmethod
-    def suspend_task(task_id, user_id, message=''):
-        """挂起任务"""
-        task = Task.query.get(task_id)
-        if not task:
-            raise ValueError("任务不存在")
-
-        user = User.query.get(user_id)
-        if not user.is_admin and task.current_handler_id != user_id:
-            raise PermissionError("只有当前处理人或管理员可以挂起任务")
-
-        if task.status != TaskService.STATUS_PROCESSING:
-            raise ValueError(f"任务当前状态({task.status})不允许挂起")
-
-        old_status = task.status
-        task.status = TaskService.STATUS_SUSPENDED
-
-        transfer = TaskTransfer(
-            task_id=task_id,
-            operator_id=user_id,
-            target_user_id=task.current_handler_id,
-            message=message,
-            transfer_type='挂起'
-        )
-        db.session.add(transfer)
+    def transfer_task(task_id, operator_id, target_user_id, message='', expected_version=None):
+        """流转任务"""
+        return TaskService.apply_transition('transfer', task_id, operator_id, target_user_id,
+                                            message=message, expected_version=expected_version)
 
-        # 更新统计
-        try:
-            TaskService.update_statistics_on_update(old_status, task.status)
-        except Exception as e:
-            print(f'更新统计失败: {str(e)}')
+    @staticmethod
+    def respond_task(task_id, user_id, expected_version=None):
+        """响应任务"""
+        return TaskService.apply_transition('respond', task_id, user_id,
+                                            message='响应任务', expected_version=expected_version)
 
-        db.session.commit()
+    @staticmethod
+    def complete_task(task_id, user_id, message='', expected_version=None):
+        """完成任务"""
+        return TaskService.apply_transition('complete', task_id, user_id,
+                                            message=message, expected_version=expected_version)
 
-        return task
+    @staticmethod
+    def suspend_task(task_id, user_id, message='', expected_version=None):
+        """挂起任务"""
+        return TaskService.apply_transition('suspend', task_id, user_id,
+                                            message=message, expected_version=expected_version)
 
     @staticmethod
-    def close_task(task_id, user_id, message=''):
+    def close_task(task_id, user_id, message='', expected_version=None):
         """关闭任务"""
-        task = Task.query.get(task_id)
-        if not task:
-            raise ValueError("任务不存在")
+        return TaskService.apply_transition('close', task_id, user_id,
+                                            message=message, expected_version=expected_version)
 
-        user = User.query.get(user_id)
-        if not user.is_admin and task.current_handler_id != user_id:
-            raise PermissionError("只有当前处理人或管理员可以关闭任务")
+    @staticmethod
+    def bulk_transition(action, task_ids, operator_id, target_user_id=None, message='', atomic=False):
+        """
+        批量流转/完成/关闭任务
+        权限一次查询校验，状态以一条集合UPDATE更新，流转记录批量插入，统计增量一次写入。
+        :param action: transfer / complete / close
+        :param target_user_id: 流转目标用户，仅 transfer 需要
+        :param atomic: 为True时任一任务不存在、无权限或状态不允许则整批不处理
+        :return: {'updated': [task_id], 'errors': [{'task_id', 'message'}]}
+        """
+        if action not in TaskService.BULK_ACTIONS:
+            raise ValueError(f"不支持的批量操作: {action}")
+        rule = TaskService.TRANSITIONS[action]
+
+        users = {user.id: user for user in User.query.filter(
+            User.id.in_({operator_id, target_user_id} - {None}), User.is_active.is_(True)
+        ).all()}
+        operator = users.get(operator_id)
+        if not operator:
+            raise ValueError("操作人不存在")
+        if action == 'transfer' and target_user_id not in users:
+            raise ValueError("目标用户不存在")
+
+        # 一次查询取出全部任务的当前状态、版本号和处理人，用于权限检查和统计增量
+        task_ids = list(dict.fromkeys(task_ids))
+        current = {
+            row.id: row for row in db.session.query(
+                Task.id, Task.status, Task.version, Task.current_handler_id, Task.creator_id,
+                Task.expected_start_time, Task.expected_end_time
+            ).filter(Task.id.in_(task_ids)).all()
+        }
 
-        old_status = task.status
-        task.status = TaskService.STATUS_CLOSED
-        if not task.actual_end_time:
-            task.actual_end_time = datetime.now(timezone.utc)
+        allowed = []
+        errors = []
+        for task_id in task_ids:
+            row = current.get(task_id)
+            if not row:
+                errors.append({'task_id': task_id, 'message': '任务不存在'})
+                continue
+            try:
+                TaskService._check_transition(action, rule, row, operator)
+                allowed.append(row)
+            except (PermissionError, ValueError) as e:
+                errors.append({'task_id': task_id, 'message': str(e)})
+
+        if (errors and atomic) or not allowed:
+            return {'updated': [], 'errors': errors}
 
-        transfer = TaskTransfer(
-            task_id=task_id,
-            operator_id=user_id,
-            target_user_id=task.current_handler_id,
-            message=message,
-            transfer_type='关闭'
-        )
-        db.session.add(transfer)
+        now = datetime.now(timezone.utc)
+        values = TaskService._transition_values(action, rule, now, target_user_id)
 
-        # 更新统计
+        allowed_ids = [row.id for row in allowed]
         try:
-            TaskService.update_statistics_on_update(old_status, task.status)
-        except Exception as e:
-            print(f'更新统计失败: {str(e)}')
-
-        db.session.commit()
-
-        return task
+            # 以 (id, version) 作为比较条件，读取之后被并发修改的任务不会被更新
+            result = db.session.execute(
+                update(Task)
+                .where(tuple_(Task.id, Task.version).in_([(row.id, row.version) for row in allowed]),
+                       Task.status.in_(rule['from']))
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount != len(allowed):
+                raise TaskConflictError("部分任务已被其他人修改，请刷新后重试")
+
+            db.session.execute(insert(TaskTransfer), [{
+                'task_id': row.id,
+                'operator_id': operator_id,
+                'target_user_id': target_user_id if action == 'transfer' else row.current_handler_id,
+                'message': message,
+                'transfer_type': rule['transfer_type'],
+                'created_at': now,
+            } for row in allowed])
+
+            deltas = defaultdict(int)
+            for row in allowed:
+                WarningService.track(row.id, rule['to'], row.expected_start_time, row.expected_end_time)
+                deltas[('status_distribution', row.status)] -= 1
+                deltas[('status_distribution', rule['to'])] += 1
+                for key, delta in TaskService.workload_deltas(
+                    before=TaskService._task_image(row),
+                    after=TaskService._transition_image(action, rule, row, target_user_id),
+                    completed=action == 'complete'
+                ).items():
+                    deltas[key] += delta
+            TaskService.apply_statistics_deltas(deltas)
+            TaskService.invalidate_list_cache()
+            TaskService.invalidate_user_queue(target_user_id, *{row.current_handler_id for row in allowed})
+
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        # 会话中已加载的任务对象与数据库不一致，使其在下次访问时重新加载
+        db.session.expire_all()
+
+        return {'updated': allowed_ids, 'errors': errors}
 
     @staticmethod
-    def list_tasks(page=1, per_page=20, **filters):
-        """获取任务列表"""
-        query = Task.query
-
-        # 搜索
+    def apply_task_filters(query, **filters):
+        """按列表筛选条件过滤任务查询"""
+        # 搜索（标题和描述，优先使用全文索引）
         if 'search' in filters and filters['search']:
-            search_pattern = f"%{filters['search']}%"
-            query = query.filter(Task.title.ilike(search_pattern))
+            query = SearchService.apply_search_filter(query, filters['search'])
 
         # 筛选
         if 'creator_id' in filters and filters['creator_id']:
@@ -293,182 +664,862 @@ class TaskService:
         if 'category' in filters and filters['category']:
             query = query.filter(Task.category == filters['category'])
 
+        return query
+
+    @staticmethod
+    def invalidate_list_cache():
+        """
+        任务增删改时递增任务列表版本号，使所有进程的列表总数缓存和列表ETag失效
+        版本号增量随当前事务提交，须在提交任务变更前调用
+        """
+        TaskCounter.add_deltas({TaskService.LIST_VERSION_COUNTER: 1})
+
+    @staticmethod
+    def get_list_cache_version():
+        """读取任务列表版本号（计数器表按唯一键的单行查询）"""
+        counter_type, counter_key = TaskService.LIST_VERSION_COUNTER
+        return db.session.query(TaskCounter.count).filter_by(
+            counter_type=counter_type, counter_key=counter_key
+        ).scalar() or 0
+
+    @staticmethod
+    def invalidate_user_queue(*user_ids):
+        """
+        用户待办队列变化时递增其队列版本号，使所有进程的待办/通知缓存失效
+        版本号增量随当前事务提交，须在提交任务变更前调用
+        """
+        TaskCounter.add_deltas({
+            (TaskService.USER_QUEUE_COUNTER, str(user_id)): 1 for user_id in set(user_ids) if user_id
+        })
+
+    @staticmethod
+    def get_user_queue_version(user_id):
+        """读取用户队列版本号（计数器表按唯一键的单行查询）"""
+        return db.session.query(TaskCounter.count).filter_by(
+            counter_type=TaskService.USER_QUEUE_COUNTER, counter_key=str(user_id)
+        ).scalar() or 0
+
+    @staticmethod
+    def _get_user_queue(kind, user_id, limit, loader):
+        """
+        读取用户队列缓存，未命中时调用loader加载
+        每次调用先查询一次计数器表读取队列版本号（按唯一键的单行查询），命中时不再查询任务表
+        """
+        key = (kind, user_id, limit, TaskService.get_user_queue_version(user_id))
+        result = user_queue_cache.get(key)
+        if result is None:
+            result = loader()
+            user_queue_cache.set(key, result)
+        return result
+
+    @staticmethod
+    def count_tasks(query, count_mode=COUNT_EXACT, **filters):
+        """
+        统计筛选后的任务总数
+        :param count_mode: exact-精确(优先读缓存) estimate-允许近似 none-不统计
+        :return: 总数，none 模式返回 None
+        """
+        if count_mode == TaskService.COUNT_NONE:
+            return None
+
+        # 先读版本号再统计：统计期间提交的变更会递增版本号，按旧版本缓存的结果不会再被读到
+        cache_key = (TaskService.get_list_cache_version(),
+                     tuple(sorted((k, str(v)) for k, v in filters.items() if v)))
+        total = task_count_cache.get(cache_key)
+        if total is not None:
+            return total
+
+        if count_mode == TaskService.COUNT_ESTIMATE:
+            total = TaskService._estimate_task_count(**filters)
+            if total is not None:
+                return total
+
+        total = query.order_by(None).count()
+        task_count_cache.set(cache_key, total)
+        return total
+
+    @staticmethod
+    def _estimate_task_count(**filters):
+        """用计数器估算总数，只支持无筛选或单一状态/分类筛选"""
+        keys = {k for k, v in filters.items() if v}
+        if not keys:
+            counter_key = ('overview', 'total')
+        elif keys == {'status'}:
+            counter_key = ('status_distribution', filters['status'])
+        elif keys == {'category'}:
+            counter_key = ('category_distribution', filters['category'])
+        else:
+            return None
+
+        return db.session.query(TaskCounter.count).filter_by(
+            counter_type=counter_key[0], counter_key=counter_key[1]
+        ).scalar()
+
+    @staticmethod
+    def parse_list_fields(fields):
+        """
+        解析 fields 参数（逗号分隔）
+        :return: 字段列表，为空时返回全部字段
+        :raises: ValueError
+        """
+        if not fields:
+            return list(TaskService.LIST_FIELDS)
+
+        names = [name.strip() for name in fields.split(',') if name.strip()]
+        unknown = [name for name in names if name not in TaskService.LIST_FIELDS]
+        if unknown:
+            raise ValueError(f"不支持的字段: {', '.join(unknown)}")
+        return names
+
+    @staticmethod
+    def select_task_rows(query, fields=None):
+        """
+        列投影查询：只选择列表需要的列及创建人/处理人姓名，不加载ORM对象和description大字段
+        :param query: 已完成筛选和排序的任务查询
+        :param fields: 需要返回的字段，默认全部
+        :return: 查询对象，结果行的属性名与字段名一致
+        """
+        fields = fields or TaskService.LIST_FIELDS
+        creator = aliased(User)
+        handler = aliased(User)
+        columns = {
+            'id': Task.id,
+            'title': Task.title,
+            'category': Task.category,
+            'status': Task.status,
+            'progress': Task.progress,
+            'creator_id': Task.creator_id,
+            'creator_name': creator.name,
+            'current_handler_id': Task.current_handler_id,
+            'current_handler_name': handler.name,
+            'expected_start_time': Task.expected_start_time,
+            'expected_end_time': Task.expected_end_time,
+            'created_at': Task.created_at,
+            'updated_at': Task.updated_at,
+        }
+
+        # id 和 created_at 用于游标分页，时间进度由期望时间计算
+        selected = set(fields) | {'id', 'created_at'}
+        if 'time_progress' in selected:
+            selected |= {'expected_start_time', 'expected_end_time'}
+
+        query = query.with_entities(*[
+            columns[name].label(name) for name in TaskService.LIST_FIELDS
+            if name in selected and name in columns
+        ])
+        if 'creator_name' in selected:
+            query = query.outerjoin(creator, creator.id == Task.creator_id)
+        if 'current_handler_name' in selected:
+            query = query.outerjoin(handler, handler.id == Task.current_handler_id)
+        return query
+
+    @staticmethod
+    def serialize_task_rows(rows, fields=None, format_datetimes=False):
+        """
+        将列投影查询结果直接转换为字典列表
+        :param format_datetimes: 是否将时间字段格式化为ISO字符串；
+            通过 success_response 返回时由响应编码器原生处理datetime，无需格式化
+        """
+        fields = fields or TaskService.LIST_FIELDS
+        plain_fields = [name for name in fields if name != 'time_progress']
+        date_fields = [name for name in fields if name in TaskService.DATETIME_FIELDS] if format_datetimes else []
+
+        result = []
+        for row in rows:
+            mapping = row._mapping
+            item = {name: mapping[name] for name in plain_fields}
+            for name in date_fields:
+                item[name] = format_datetime(mapping[name])
+            result.append(item)
+
+        # 时间进度整批计算，共用同一个当前时间
+        if 'time_progress' in fields:
+            progresses = calculate_time_progress_batch(
+                [row.expected_start_time for row in rows],
+                [row.expected_end_time for row in rows]
+            )
+            for item, time_progress in zip(result, progresses):
+                item['time_progress'] = time_progress
+
+        return result
+
+    @staticmethod
+    def list_tasks(page=1, per_page=20, count_mode=COUNT_EXACT, fields=None, **filters):
+        """获取任务列表"""
+        query = TaskService.apply_task_filters(Task.query, **filters)
+
         # 排序
         query = query.order_by(Task.created_at.desc())
 
-        total = query.count()
+        total = TaskService.count_tasks(query, count_mode, **filters)
 
-        # 使用 joinedload 预加载关联的 creator 和 current_handler，避免 N+1 查询问题
-        tasks = query.options(
-            joinedload(Task.creator),
-            joinedload(Task.current_handler)
-        ).offset((page - 1) * per_page).limit(per_page).all()
+        # 列投影查询，多取一条用于在不统计总数时判断是否还有下一页
+        rows = TaskService.select_task_rows(query, fields)\
+            .offset((page - 1) * per_page).limit(per_page + 1).all()
+
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
 
         return {
-            'tasks': [task.to_dict() for task in tasks],
+            'tasks': TaskService.serialize_task_rows(rows, fields),
             'total': total,
             'page': page,
-            'per_page': per_page
+            'per_page': per_page,
+            'has_more': has_more
+        }
+
+    @staticmethod
+    def list_tasks_by_cursor(cursor=None, per_page=20, count_mode=COUNT_NONE, fields=None, **filters):
+        """
+        游标分页获取任务列表
+        按 (created_at, id) 倒序做键集分页，翻页开销与页码深度无关
+        :param cursor: 上一次返回的 next_cursor/prev_cursor，为空表示第一页
+        :param count_mode: 总数统计方式，默认不统计
+        """
+        query = TaskService.apply_task_filters(Task.query, **filters)
+        total = TaskService.count_tasks(query, count_mode, **filters)
+
+        direction = DIRECTION_NEXT
+        if cursor:
+            created_at, last_id, direction = decode_cursor(cursor)
+            if direction == DIRECTION_NEXT:
+                query = query.filter(tuple_(Task.created_at, Task.id) < (created_at, last_id))
+            else:
+                query = query.filter(tuple_(Task.created_at, Task.id) > (created_at, last_id))
+
+        if direction == DIRECTION_NEXT:
+            query = query.order_by(Task.created_at.desc(), Task.id.desc())
+        else:
+            query = query.order_by(Task.created_at.asc(), Task.id.asc())
+
+        # 多取一条用于判断是否还有更多数据
+        rows = TaskService.select_task_rows(query, fields).limit(per_page + 1).all()
+
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        if direction == DIRECTION_PREV:
+            rows.reverse()
+
+        next_cursor = None
+        prev_cursor = None
+        if rows:
+            first, last = rows[0], rows[-1]
+            # 向后翻页时，后面是否还有数据取决于 has_more；向前翻页时，来源页一定在后面
+            if direction == DIRECTION_PREV or has_more:
+                next_cursor = encode_cursor(last.created_at, last.id, DIRECTION_NEXT)
+            if (direction == DIRECTION_NEXT and cursor) or (direction == DIRECTION_PREV and has_more):
+                prev_cursor = encode_cursor(first.created_at, first.id, DIRECTION_PREV)
+
+        return {
+            'tasks': TaskService.serialize_task_rows(rows, fields),
+            'total': total,
+            'per_page': per_page,
+            'next_cursor': next_cursor,
+            'prev_cursor': prev_cursor
+        }
+
+    @staticmethod
+    def get_task_version(task_id):
+        """
+        任务详情版本，用于生成ETag
+        由任务及创建人/处理人的更新时间和当前时间进度组成，任务不存在时返回None
+        """
+        creator = aliased(User)
+        handler = aliased(User)
+        row = db.session.query(
+            Task.updated_at, Task.expected_start_time, Task.expected_end_time,
+            creator.updated_at, handler.updated_at
+        ).outerjoin(creator, creator.id == Task.creator_id)\
+            .outerjoin(handler, handler.id == Task.current_handler_id)\
+            .filter(Task.id == task_id).first()
+        if row is None:
+            return None
+
+        updated_at, start_time, end_time, creator_updated_at, handler_updated_at = row
+        return (task_id, updated_at, creator_updated_at, handler_updated_at,
+                calculate_time_progress(start_time, end_time))
+
+    @staticmethod
+    def get_list_version():
+        """
+        任务列表版本，用于生成列表、紧急任务等接口的ETag
+        由任务列表版本号（计数器表单行查询，不扫描任务表）和时间窗口组成；任务增删改和
+        人员姓名变化都会递增版本号，时间窗口保证时间进度、剩余时间等随时间变化的字段
+        最多缓存 ETAG_TIME_WINDOW 秒
+        """
+        window = int(datetime.now(timezone.utc).timestamp()) // TaskService.ETAG_TIME_WINDOW
+        return TaskService.get_list_cache_version(), window
+
+    @staticmethod
+    def get_tasks_by_ids(task_ids, fields=None):
+        """
+        按ID批量获取任务，一次IN查询
+        :return: {'tasks': [...], 'missing_ids': [...]}，tasks顺序与请求顺序一致
+        """
+        task_ids = list(dict.fromkeys(task_ids))
+        if not task_ids:
+            return {'tasks': [], 'missing_ids': []}
+
+        query = Task.query.filter(Task.id.in_(task_ids))
+        rows = TaskService.select_task_rows(query, fields).all()
+        task_map = {row.id: item for row, item in zip(rows, TaskService.serialize_task_rows(rows, fields))}
+
+        return {
+            'tasks': [task_map[task_id] for task_id in task_ids if task_id in task_map],
+            'missing_ids': [task_id for task_id in task_ids if task_id not in task_map]
         }
 
+    @staticmethod
+    def _paginate_timeline(query, model, cursor=None, since_id=None, limit=None):
+        """
+        按 (created_at, id) 正序分页时间线
+        :param cursor: 上一页返回的 next_cursor
+        :param since_id: 只返回ID大于该值的新记录
+        :param limit: 每页条数，为空时返回全部
+        :return: (记录列表, next_cursor)
+        """
+        if since_id:
+            query = query.filter(model.id > since_id)
+        if cursor:
+            created_at, last_id, _ = decode_cursor(cursor)
+            query = query.filter(tuple_(model.created_at, model.id) > (created_at, last_id))
+
+        query = query.order_by(model.created_at.asc(), model.id.asc())
+        if not limit:
+            return query.all(), None
+
+        items = query.limit(limit + 1).all()
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = encode_cursor(items[-1].created_at, items[-1].id)
+        return items, next_cursor
+
+    @staticmethod
+    def list_task_transfers(task_id, cursor=None, since_id=None, limit=None):
+        """获取任务流转记录，操作人/目标用户批量预加载"""
+        query = TaskTransfer.query.filter(TaskTransfer.task_id == task_id).options(
+            selectinload(TaskTransfer.operator),
+            selectinload(TaskTransfer.target_user)
+        )
+        transfers, next_cursor = TaskService._paginate_timeline(query, TaskTransfer, cursor, since_id, limit)
+        return [t.to_dict() for t in transfers], next_cursor
+
+    @staticmethod
+    def list_task_comments(task_id, cursor=None, since_id=None, limit=None):
+        """获取任务留言，留言人批量预加载"""
+        query = TaskComment.query.filter(
+            TaskComment.task_id == task_id,
+            TaskComment.is_deleted.is_(False)
+        ).options(selectinload(TaskComment.user))
+        comments, next_cursor = TaskService._paginate_timeline(query, TaskComment, cursor, since_id, limit)
+        return [c.to_dict() for c in comments], next_cursor
+
+    @staticmethod
+    def get_task_bundle(task_id, include=None):
+        """
+        一次获取任务详情及流转记录、留言、附件
+        各子列表只返回用户ID，用户姓名统一放在 users 表中去重
+        :param include: 需要附带的子列表，默认全部
+        :return: 字典，任务不存在时返回None
+        """
+        from app.models.task_attachment import TaskAttachment
+
+        include = TaskService.BUNDLE_INCLUDES if include is None else include
+        task = Task.query.options(
+            joinedload(Task.creator),
+            joinedload(Task.current_handler)
+        ).filter(Task.id == task_id).first()
+        if not task:
+            return None
+
+        user_ids = {task.creator_id, task.current_handler_id}
+        result = {'task': task.to_dict(include_details=True)}
+
+        if 'transfers' in include:
+            rows = db.session.query(
+                TaskTransfer.id, TaskTransfer.task_id, TaskTransfer.operator_id, TaskTransfer.target_user_id,
+                TaskTransfer.message, TaskTransfer.transfer_type, TaskTransfer.created_at
+            ).filter(TaskTransfer.task_id == task_id)\
+                .order_by(TaskTransfer.created_at.asc(), TaskTransfer.id.asc()).all()
+            result['transfers'] = [dict(row._mapping) for row in rows]
+            for row in rows:
+                user_ids.update((row.operator_id, row.target_user_id))
+
+        if 'comments' in include:
+            rows = db.session.query(
+                TaskComment.id, TaskComment.task_id, TaskComment.user_id, TaskComment.content,
+                TaskComment.created_at, TaskComment.updated_at, TaskComment.is_deleted
+            ).filter(TaskComment.task_id == task_id, TaskComment.is_deleted.is_(False))\
+                .order_by(TaskComment.created_at.asc(), TaskComment.id.asc()).all()
+            result['comments'] = [dict(row._mapping) for row in rows]
+            user_ids.update(row.user_id for row in rows)
+
+        if 'attachments' in include:
+            rows = db.session.query(
+                TaskAttachment.id, TaskAttachment.task_id, TaskAttachment.file_name, TaskAttachment.file_path,
+                TaskAttachment.file_size, TaskAttachment.file_type, TaskAttachment.uploaded_by,
+                TaskAttachment.created_at
+            ).filter(TaskAttachment.task_id == task_id).order_by(TaskAttachment.created_at.desc()).all()
+            result['attachments'] = [dict(row._mapping) for row in rows]
+            user_ids.update(row.uploaded_by for row in rows)
+
+        users = db.session.query(User.id, User.um_code, User.name).filter(User.id.in_(user_ids)).all()
+        result['users'] = {user.id: {'id': user.id, 'um_code': user.um_code, 'name': user.name} for user in users}
+        return result
+
+    @staticmethod
+    def search_tasks(keyword, limit=20):
+        """全文搜索任务，按相关度排序并附带高亮片段"""
+        hits = SearchService.search(keyword, limit)
+        if not hits:
+            return []
+
+        query = Task.query.filter(Task.id.in_([hit['id'] for hit in hits]))
+        rows = TaskService.select_task_rows(query).all()
+        task_map = {task['id']: task for task in TaskService.serialize_task_rows(rows)}
+
+        result = []
+        for hit in hits:
+            task_dict = task_map.get(hit['id'])
+            if not task_dict:
+                continue
+            task_dict.update({
+                'rank': hit['rank'],
+                'title_highlight': hit['title_highlight'],
+                'snippet': hit['snippet']
+            })
+            result.append(task_dict)
+
+        return result
+
+    @staticmethod
+    def refresh_time_progress(chunk_size=None, now=None):
+        """
+        批量刷新处理中任务的时间进度
+        按任务ID区间分块，每块一条UPDATE在数据库端计算时间进度并立即提交，写锁只持有一块的时间；
+        只写入时间进度发生变化的行。不支持的数据库按块读取期望时间后在应用端计算
+        :return: 更新的任务数
+        """
+        chunk_size = chunk_size or TaskService.TIME_PROGRESS_CHUNK_SIZE
+        if now is None:
+            now = datetime.now(timezone.utc)
+
+        conditions = [
+            Task.status == TaskService.STATUS_PROCESSING,
+            Task.expected_start_time.isnot(None),
+            Task.expected_end_time.isnot(None),
+        ]
+        min_id, max_id = db.session.query(func.min(Task.id), func.max(Task.id)).filter(*conditions).one()
+        db.session.commit()
+        if min_id is None:
+            return 0
+
+        dialect_name = db.session.get_bind().dialect.name
+        if dialect_name in TaskService.TIME_PROGRESS_SQL_DIALECTS:
+            expression = time_progress_sql(Task.expected_start_time, Task.expected_end_time, dialect_name, now)
+        else:
+            expression = None
+
+        updated = 0
+        for lower in range(min_id, max_id + 1, chunk_size):
+            chunk = [Task.id >= lower, Task.id < lower + chunk_size] + conditions
+            if expression is not None:
+                updated += db.session.execute(
+                    update(Task).where(
+                        *chunk,
+                        or_(Task.time_progress.is_(None), Task.time_progress != expression)
+                    ).values(time_progress=expression).execution_options(synchronize_session=False)
+                ).rowcount
+            else:
+                rows = db.session.query(
+                    Task.id, Task.time_progress, Task.expected_start_time, Task.expected_end_time
+                ).filter(*chunk).all()
+                progresses = calculate_time_progress_batch(
+                    [row.expected_start_time for row in rows], [row.expected_end_time for row in rows], now
+                )
+                changed = [
+                    {'id': row.id, 'time_progress': progress}
+                    for row, progress in zip(rows, progresses) if row.time_progress != progress
+                ]
+                if changed:
+                    db.session.execute(update(Task), changed)
+                updated += len(changed)
+            db.session.commit()
+
+        return updated
+
     @staticmethod
     def calculate_full_statistics():
-        """执行全量统计"""
-        from app.models.task_statistics import TaskStatistics
+        """
+        按任务表重置全局统计计数（总数、状态分布、分类分布），由定时任务每5分钟执行
+        重置前锁住计数器，避免与并发事务写入的增量互相覆盖
+        :return: 任务总数
+        """
         from sqlalchemy import func
 
+        # 丢弃尚未写入的增量，在新事务中先加锁再统计
+        db.session.info.pop(TaskCounter.PENDING_KEY, None)
+        db.session.commit()
+        TaskCounter.lock_counters(TaskService.OVERVIEW_COUNTER_TYPES)
+
         # 统计总任务数
         total_count = Task.query.count()
-        TaskStatistics.set_stat('overview', 'total', {'count': total_count})
+        TaskCounter.set_counts('overview', {'total': total_count})
 
         # 统计各状态任务数
         status_stats = db.session.query(
             Task.status, func.count(Task.id)
         ).group_by(Task.status).all()
-
-        for status, count in status_stats:
-            TaskStatistics.set_stat('status_distribution', status, {'count': count})
+        TaskCounter.set_counts('status_distribution', dict(status_stats))
 
         # 统计各分类任务数
         category_stats = db.session.query(
             Task.category, func.count(Task.id)
         ).group_by(Task.category).all()
+        TaskCounter.set_counts('category_distribution', dict(category_stats))
 
-        for category, count in category_stats:
-            TaskStatistics.set_stat('category_distribution', category, {'count': count})
+        db.session.commit()
+        return total_count
 
+    @staticmethod
+    def reconcile_workload_counters():
+        """
+        按任务表和近30天的完成记录校正人员工作量计数，同时清理计数为0和过期的分桶
+        需要扫描全部未结束任务，由定时任务每天执行一次或通过 init_statistics.py 手动执行；
+        校正前锁住计数器，期间的任务流转等到校正提交后再写入增量
+        """
+        db.session.info.pop(TaskCounter.PENDING_KEY, None)
+        db.session.commit()
+        TaskCounter.lock_counters(TaskService.WORKLOAD_COUNTER_TYPES)
+        TaskService.rebuild_workload_counters()
         db.session.commit()
 
     @staticmethod
     def update_statistics_on_create(task):
         """任务创建时增量更新统计"""
-        from app.models.task_statistics import TaskStatistics
-
-        # 更新总数
-        total_stat = TaskStatistics.get_stat('overview', 'total') or {'count': 0}
-        total_stat['count'] += 1
-        TaskStatistics.set_stat('overview', 'total', total_stat)
-
-        # 更新状态统计
-        status_stat = TaskStatistics.get_stat('status_distribution', task.status) or {'count': 0}
-        status_stat['count'] += 1
-        TaskStatistics.set_stat('status_distribution', task.status, status_stat)
-
-        # 更新分类统计
-        category_stat = TaskStatistics.get_stat('category_distribution', task.category) or {'count': 0}
-        category_stat['count'] += 1
-        TaskStatistics.set_stat('category_distribution', task.category, category_stat)
+        TaskService.apply_statistics_deltas({
+            ('overview', 'total'): 1,
+            ('status_distribution', task.status): 1,
+            ('category_distribution', task.category): 1,
+        })
+        TaskService.apply_statistics_deltas(TaskService.workload_deltas(after=TaskService._task_image(task)))
 
     @staticmethod
     def update_statistics_on_update(old_status, new_status):
         """任务状态更新时增量更新统计"""
-        from app.models.task_statistics import TaskStatistics
-
         if old_status != new_status:
-            # 旧状态-1
-            old_stat = TaskStatistics.get_stat('status_distribution', old_status) or {'count': 0}
-            old_stat['count'] = max(0, old_stat['count'] - 1)
-            TaskStatistics.set_stat('status_distribution', old_status, old_stat)
-
-            # 新状态+1
-            new_stat = TaskStatistics.get_stat('status_distribution', new_status) or {'count': 0}
-            new_stat['count'] += 1
-            TaskStatistics.set_stat('status_distribution', new_status, new_stat)
+            TaskService.apply_statistics_deltas({
+                ('status_distribution', old_status): -1,
+                ('status_distribution', new_status): 1,
+            })
 
     @staticmethod
     def update_statistics_on_delete(task):
         """任务删除时增量更新统计"""
-        from app.models.task_statistics import TaskStatistics
+        TaskService.apply_statistics_deltas({
+            ('overview', 'total'): -1,
+            ('status_distribution', task.status): -1,
+            ('category_distribution', task.category): -1,
+        })
+        TaskService.apply_statistics_deltas(TaskService.workload_deltas(before=TaskService._task_image(task)))
 
-        # 更新总数
-        total_stat = TaskStatistics.get_stat('overview', 'total') or {'count': 0}
-        total_stat['count'] = max(0, total_stat['count'] - 1)
-        TaskStatistics.set_stat('overview', 'total', total_stat)
+    @staticmethod
+    def _task_image(task, **overrides):
+        """提取计算工作量所需的任务字段，task 可以是模型对象、查询行或字典"""
+        image = {
+            key: task[key] if isinstance(task, dict) else getattr(task, key)
+            for key in ('status', 'creator_id', 'current_handler_id', 'expected_end_time')
+        }
+        image.update(overrides)
+        return image
 
-        # 更新状态统计
-        status_stat = TaskStatistics.get_stat('status_distribution', task.status) or {'count': 0}
-        status_stat['count'] = max(0, status_stat['count'] - 1)
-        TaskStatistics.set_stat('status_distribution', task.status, status_stat)
+    @staticmethod
+    def _transition_image(action, rule, task, target_user_id=None):
+        """状态变更后的任务字段"""
+        overrides = {'status': rule['to']}
+        if action == 'transfer':
+            overrides['current_handler_id'] = target_user_id
+        return TaskService._task_image(task, **overrides)
 
-        # 更新分类统计
-        category_stat = TaskStatistics.get_stat('category_distribution', task.category) or {'count': 0}
-        category_stat['count'] = max(0, category_stat['count'] - 1)
-        TaskStatistics.set_stat('category_distribution', task.category, category_stat)
+    @staticmethod
+    def _due_bucket(expected_end_time):
+        """期望完成时间所在的小时（UTC），作为逾期计数的分桶键"""
+        if expected_end_time is None:
+            return None
+        if expected_end_time.tzinfo is not None:
+            expected_end_time = expected_end_time.astimezone(timezone.utc)
+        return expected_end_time.strftime('%Y-%m-%dT%H')
 
     @staticmethod
-    def get_statistics_from_cache():
-        """从统计表读取数据"""
-        from app.models.task_statistics import TaskStatistics
+    def workload_deltas(before=None, after=None, completed=False, completed_at=None):
+        """
+        计算任务变化引起的人员工作量计数增量
+        计数类型（role 为 handler/creator，键为 "用户ID:分桶"）:
+          {role}_status     未结束任务数，按状态分桶
+          {role}_due        未结束且有期望完成时间的任务数，按期望完成时间所在小时分桶，用于计算逾期数
+          {role}_completed  完成次数，按完成日期（UTC）分桶
+        :param before: 变化前的任务字段（_task_image），新建任务为None
+        :param after: 变化后的任务字段，删除任务为None
+        :param completed: 本次变化是否为完成操作
+        """
+        deltas = defaultdict(int)
+        for image, sign in ((before, -1), (after, 1)):
+            if image is None or image['status'] not in TaskService.OPEN_STATUSES:
+                continue
+            due_bucket = TaskService._due_bucket(image['expected_end_time'])
+            for role, user_id in (('handler', image['current_handler_id']), ('creator', image['creator_id'])):
+                deltas[(f'{role}_status', f'{user_id}:{image["status"]}')] += sign
+                if due_bucket:
+                    deltas[(f'{role}_due', f'{user_id}:{due_bucket}')] += sign
+
+        if completed and after is not None:
+            day = (completed_at or datetime.now(timezone.utc)).strftime('%Y-%m-%d')
+            for role, user_id in (('handler', after['current_handler_id']), ('creator', after['creator_id'])):
+                deltas[(f'{role}_completed', f'{user_id}:{day}')] += 1
+
+        return {key: delta for key, delta in deltas.items() if delta}
+
+    @staticmethod
+    def rebuild_workload_counters():
+        """按任务表和近30天的完成记录重建人员工作量计数（不提交，调用方负责加锁）"""
+        counts = defaultdict(lambda: defaultdict(int))
+
+        open_tasks = db.session.query(
+            Task.status, Task.creator_id, Task.current_handler_id, Task.expected_end_time
+        ).filter(Task.status.in_(TaskService.OPEN_STATUSES))
+        for row in open_tasks.yield_per(1000):
+            for (counter_type, counter_key), delta in TaskService.workload_deltas(
+                    after=TaskService._task_image(row)).items():
+                counts[counter_type][counter_key] += delta
+
+        since = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=29)
+        completions = db.session.query(
+            TaskTransfer.target_user_id, Task.creator_id, TaskTransfer.created_at
+        ).join(Task, Task.id == TaskTransfer.task_id).filter(
+            TaskTransfer.transfer_type == '完成',
+            TaskTransfer.created_at >= since
+        )
+        for handler_id, creator_id, created_at in completions.yield_per(1000):
+            day = created_at.strftime('%Y-%m-%d')
+            counts['handler_completed'][f'{handler_id}:{day}'] += 1
+            counts['creator_completed'][f'{creator_id}:{day}'] += 1
+
+        for counter_type in TaskService.WORKLOAD_COUNTER_TYPES:
+            TaskCounter.set_counts(counter_type, dict(counts[counter_type]))
+
+    @staticmethod
+    def get_workload_leaderboard(role='handler', sort='open_total', limit=50):
+        """
+        人员工作量排行榜
+        读取该角色的工作量计数和在职用户列表，不扫描任务表
+        :param role: handler 按当前处理人统计 / creator 按创建人统计
+        :param sort: open_total / overdue / completed_7d / completed_30d，降序
+        :return: [{'user_id', 'user_name', 'open', 'open_total', 'overdue', 'completed_7d', 'completed_30d'}]
+        """
+        if role not in TaskService.WORKLOAD_ROLES:
+            raise ValueError("role参数只能是handler或creator")
+        if sort not in TaskService.WORKLOAD_SORT_KEYS:
+            raise ValueError(f"sort参数只能是{'、'.join(TaskService.WORKLOAD_SORT_KEYS)}")
 
-        # 获取总数
-        total_stat = TaskStatistics.get_stat('overview', 'total') or {'count': 0}
+        now = datetime.now(timezone.utc)
+        current_hour = now.strftime('%Y-%m-%dT%H')
+        today = now.date()
+        since_7d = (today - timedelta(days=6)).isoformat()
+        since_30d = (today - timedelta(days=29)).isoformat()
+
+        board = {
+            user.id: {
+                'user_id': user.id,
+                'user_name': user.name,
+                'open': {status: 0 for status in TaskService.OPEN_STATUSES},
+                'open_total': 0,
+                'overdue': 0,
+                'completed_7d': 0,
+                'completed_30d': 0,
+            }
+            for user in db.session.query(User.id, User.name).filter(User.is_active.is_(True)).all()
+        }
+
+        counters = db.session.query(TaskCounter.counter_type, TaskCounter.counter_key, TaskCounter.count).filter(
+            TaskCounter.counter_type.in_([f'{role}_status', f'{role}_due', f'{role}_completed'])
+        ).all()
+        for counter_type, counter_key, count in counters:
+            user_id, bucket = counter_key.split(':', 1)
+            entry = board.get(int(user_id))
+            if entry is None or not count:
+                continue
+            metric = counter_type[len(role) + 1:]
+            if metric == 'status':
+                entry['open'][bucket] = entry['open'].get(bucket, 0) + count
+                entry['open_total'] += count
+            elif metric == 'due':
+                # 期望完成时间所在小时已过去的分桶计为逾期
+                if bucket < current_hour:
+                    entry['overdue'] += count
+            elif metric == 'completed':
+                if bucket >= since_30d:
+                    entry['completed_30d'] += count
+                    if bucket >= since_7d:
+                        entry['completed_7d'] += count
+
+        result = sorted(board.values(), key=lambda entry: (-entry[sort], entry['user_id']))
+        return result[:limit] if limit else result
+
+    @staticmethod
+    def apply_statistics_deltas(deltas):
+        """
+        记录统计增量，同一事务内的增量合并后在提交前以
+        count = count + :delta 一次写入计数器表，并发事务之间不会互相覆盖
+        :param deltas: {(stat_type, stat_key): 增量}
+        """
+        TaskCounter.add_deltas(deltas)
+
+    @staticmethod
+    def get_statistics_from_cache():
+        """从计数器表读取统计数据"""
+        counters = TaskCounter.query.filter(TaskCounter.counter_type.in_(TaskService.OVERVIEW_COUNTER_TYPES)).all()
+        counts = {(counter.counter_type, counter.counter_key): counter.count for counter in counters}
 
         # 获取各状态统计
         statuses = [TaskService.STATUS_NEW, TaskService.STATUS_PENDING, TaskService.STATUS_PROCESSING,
                    TaskService.STATUS_SUSPENDED, TaskService.STATUS_COMPLETED, TaskService.STATUS_CLOSED]
-        status_stats = {}
-        for status in statuses:
-            stat = TaskStatistics.get_stat('status_distribution', status) or {'count': 0}
-            status_stats[status] = stat['count']
+        status_stats = {status: counts.get(('status_distribution', status), 0) for status in statuses}
 
         # 获取各分类统计
         categories = [TaskService.CATEGORY_VERSION, TaskService.CATEGORY_URGENT, TaskService.CATEGORY_NORMAL,
                      TaskService.CATEGORY_PERIODIC, TaskService.CATEGORY_OTHER]
-        category_stats = {}
-        for category in categories:
-            stat = TaskStatistics.get_stat('category_distribution', category) or {'count': 0}
-            category_stats[category] = stat['count']
+        category_stats = {category: counts.get(('category_distribution', category), 0) for category in categories}
 
         # 获取最后更新时间
-        from app.models.task_statistics import TaskStatistics as TSModel
-        last_update = TSModel.query.order_by(TSModel.updated_at.desc()).first()
-        updated_at = last_update.updated_at.isoformat() if last_update else None
+        updated_at = max((counter.updated_at for counter in counters), default=None)
 
         return {
-            'total': total_stat['count'],
+            'total': counts.get(('overview', 'total'), 0),
             'status_distribution': status_stats,
             'category_distribution': category_stats,
-            'updated_at': updated_at
+            'updated_at': updated_at.isoformat() if updated_at else None
         }
 
     @staticmethod
-    def get_my_pending_tasks(user_id, limit=10):
-        """获取用户待办任务"""
-        tasks = Task.query.filter(
+    def _snapshot_is_fresh(snapshot):
+        return snapshot is not None \
+            and snapshot['counter_version'] == TaskCounter.local_version \
+            and time.monotonic() - snapshot['loaded_at'] < TaskService.STATISTICS_SNAPSHOT_TTL
+
+    @staticmethod
+    def get_statistics_snapshot():
+        """
+        获取进程内统计快照
+        本进程提交计数变更或快照超过 STATISTICS_SNAPSHOT_TTL 后重新读取计数器，
+        并发请求中只有一个线程查询数据库，其余线程等待后直接使用新快照。
+        :return: {'version', 'data', 'etag', ...}，version 在统计内容变化时递增
+        """
+        from app.utils.response import make_etag
+
+        snapshot = statistics_snapshot['current']
+        if TaskService._snapshot_is_fresh(snapshot):
+            return snapshot
+
+        with statistics_snapshot_lock:
+            snapshot = statistics_snapshot['current']
+            if TaskService._snapshot_is_fresh(snapshot):
+                return snapshot
+
+            # 先记录计数版本再查询，查询期间发生的变更会触发下一次刷新
+            counter_version = TaskCounter.local_version
+            data = TaskService.get_statistics_from_cache()
+
+            if snapshot is not None and snapshot['data'] == data:
+                version, etag = snapshot['version'], snapshot['etag']
+            else:
+                version = (snapshot['version'] if snapshot else 0) + 1
+                etag = make_etag('statistics', data)
+
+            snapshot = {
+                'counter_version': counter_version,
+                'version': version,
+                'loaded_at': time.monotonic(),
+                'data': data,
+                'etag': etag,
+            }
+            statistics_snapshot['current'] = snapshot
+            return snapshot
+
+    @staticmethod
+    def pending_tasks_query(user_id):
+        """用户待办任务查询"""
+        return Task.query.filter(
             Task.current_handler_id == user_id,
             Task.status.in_([TaskService.STATUS_PENDING, TaskService.STATUS_PROCESSING])
-        ).options(
-            joinedload(Task.creator),
-            joinedload(Task.current_handler)
-        ).order_by(Task.created_at.desc()).limit(limit).all()
+        ).order_by(Task.created_at.desc())
+
+    @staticmethod
+    def get_my_pending_tasks(user_id, limit=10):
+        """获取用户待办任务（带缓存）"""
+        def load():
+            query = TaskService.pending_tasks_query(user_id)
+            rows = TaskService.select_task_rows(query).limit(limit).all()
+            return TaskService.serialize_task_rows(rows)
 
-        return [task.to_dict() for task in tasks]
+        return TaskService._get_user_queue('pending', user_id, limit, load)
 
     @staticmethod
-    def get_urgent_tasks(hours=24):
-        """获取紧急任务列表"""
+    def get_user_notifications(user_id, limit=10):
+        """获取用户通知：新建/待响应的任务（带缓存）"""
+        def load():
+            rows = db.session.query(Task.id, Task.title, Task.created_at).filter(
+                Task.current_handler_id == user_id,
+                Task.status.in_([TaskService.STATUS_NEW, TaskService.STATUS_PENDING])
+            ).order_by(Task.created_at.desc()).limit(limit).all()
+
+            return [{
+                'id': row.id,
+                'title': '新任务待响应',
+                'content': row.title,
+                'task_id': row.id,
+                'timestamp': row.created_at.isoformat()
+            } for row in rows]
+
+        return TaskService._get_user_queue('notifications', user_id, limit, load)
+
+    @staticmethod
+    def get_cache_stats():
+        """进程内缓存命中统计"""
+        return {
+            'task_count': task_count_cache.stats(),
+            'user_queue': user_queue_cache.stats()
+        }
+
+    @staticmethod
+    def urgent_tasks_query(hours=24, now=None):
+        """即将到期或已逾期的任务查询"""
         from datetime import timedelta
 
-        now = datetime.now(timezone.utc)
+        now = now or datetime.now(timezone.utc)
         threshold = now + timedelta(hours=hours)
 
-        # 查询即将到期或已逾期的任务
-        tasks = Task.query.filter(
+        return Task.query.filter(
             Task.expected_end_time.isnot(None),
             Task.expected_end_time <= threshold,
             Task.status.in_([TaskService.STATUS_NEW, TaskService.STATUS_PENDING,
                            TaskService.STATUS_PROCESSING, TaskService.STATUS_SUSPENDED])
-        ).options(
-            joinedload(Task.creator),
-            joinedload(Task.current_handler)
-        ).order_by(Task.expected_end_time.asc()).all()
+        ).order_by(Task.expected_end_time.asc())
+
+    @staticmethod
+    def get_urgent_tasks(hours=24):
+        """获取紧急任务列表"""
+        now = datetime.now(timezone.utc)
+
+        # 查询即将到期或已逾期的任务
+        query = TaskService.urgent_tasks_query(hours, now)
+        rows = TaskService.select_task_rows(query).all()
 
         # 添加紧急程度标识
         result = []
-        for task in tasks:
-            task_dict = task.to_dict()
+        for row, task_dict in zip(rows, TaskService.serialize_task_rows(rows)):
             # 确保时间对象带时区信息
-            end_time = task.expected_end_time.replace(tzinfo=timezone.utc) if task.expected_end_time.tzinfo is None else task.expected_end_time
+            end_time = row.expected_end_time.replace(tzinfo=timezone.utc) if row.expected_end_time.tzinfo is None else row.expected_end_time
             if end_time < now:
                 task_dict['urgency'] = 'overdue'
                 task_dict['overdue_days'] = (now - end_time).days
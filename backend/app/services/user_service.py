@@ -3,9 +3,22 @@
 """
 from app import db
 from app.models.user import User
+from app.utils.cache import TTLCache
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
 from datetime import datetime, timezone
 
+# 已激活非管理员用户的列值缓存: ('id', 用户ID) -> {列名: 值}，('um_code', UM编号) -> 用户ID
+# 缓存中只保存列值，取出时重建为当前会话中的对象，避免跨请求共享ORM实例。
+# 修改用户只清除本进程的缓存，其他进程最长在过期时间(几秒)内读到旧数据；
+# 管理员不进入缓存，撤销管理员权限在所有进程立即生效，旧缓存只可能少给权限。
+# 密码哈希不进入缓存，缓存对象访问 password_hash 时从数据库加载，改密后旧密码在所有进程立即失效
+user_cache = TTLCache(maxsize=4096, ttl=5)
+
+# 不缓存的列
+UNCACHED_COLUMNS = {'password_hash'}
+
 
 class UserService:
     """用户业务逻辑服务"""
@@ -23,6 +36,7 @@ class UserService:
             # 更新最后登录时间
             user.last_login_at = datetime.now(timezone.utc)
             db.session.commit()
+            UserService.invalidate_user_cache(user)
             return user
         return None
 
@@ -54,15 +68,59 @@ class UserService:
             else:
                 raise ValueError("创建用户失败")
 
+    @staticmethod
+    def _cache_user(user):
+        """缓存已激活非管理员用户的列值"""
+        if user is not None and user.is_active and not user.is_admin:
+            values = {column.key: getattr(user, column.key) for column in User.__table__.columns
+                      if column.key not in UNCACHED_COLUMNS}
+            user_cache.set(('id', user.id), values)
+            user_cache.set(('um_code', user.um_code), user.id)
+        return user
+
+    @staticmethod
+    def _load_cached_user(user_id):
+        """从缓存取出用户并并入当前会话，不产生查询；未命中返回None"""
+        # 当前会话中已有该用户时直接使用，避免覆盖未提交的修改
+        existing = db.session.identity_map.get(identity_key(User, user_id))
+        if existing is not None:
+            return existing if existing.is_active else None
+
+        values = user_cache.get(('id', user_id))
+        if values is None:
+            return None
+        user = User(**values)
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+
+    @staticmethod
+    def invalidate_user_cache(user):
+        """用户信息变化后清除缓存"""
+        user_cache.delete(('id', user.id))
+        user_cache.delete(('um_code', user.um_code))
+
+    @staticmethod
+    def get_cache_stats():
+        """用户缓存命中统计"""
+        return user_cache.stats()
+
     @staticmethod
     def get_user_by_id(user_id):
         """根据ID获取用户"""
-        return User.query.filter_by(id=user_id, is_active=True).first()
+        user = UserService._load_cached_user(user_id)
+        if user is not None:
+            return user
+        return UserService._cache_user(User.query.filter_by(id=user_id, is_active=True).first())
 
     @staticmethod
     def get_user_by_um_code(um_code):
         """根据UM编号获取用户"""
-        return User.query.filter_by(um_code=um_code, is_active=True).first()
+        user_id = user_cache.get(('um_code', um_code))
+        if user_id is not None:
+            user = UserService._load_cached_user(user_id)
+            if user is not None and user.um_code == um_code:
+                return user
+        return UserService._cache_user(User.query.filter_by(um_code=um_code, is_active=True).first())
 
     @staticmethod
     def update_user(user_id, **kwargs):
@@ -81,8 +139,14 @@ class UserService:
             if key in allowed_fields:
                 setattr(user, key, value)
 
+        if 'name' in kwargs:
+            # 任务列表包含创建人/处理人姓名，姓名变化使列表ETag失效
+            from app.services.task_service import TaskService
+            TaskService.invalidate_list_cache()
+
         try:
             db.session.commit()
+            UserService.invalidate_user_cache(user)
             return user
         except IntegrityError:
             db.session.rollback()
@@ -90,8 +154,8 @@ class UserService:
 
     @staticmethod
     def change_password(user_id, old_password, new_password):
-        """修改密码"""
-        user = UserService.get_user_by_id(user_id)
+        """修改密码（从数据库读取用户，校验当前密码哈希）"""
+        user = User.query.filter_by(id=user_id, is_active=True).first()
         if not user:
             raise ValueError("用户不存在")
 
@@ -100,6 +164,7 @@ class UserService:
 
         user.set_password(new_password)
         db.session.commit()
+        UserService.invalidate_user_cache(user)
         return True
 
     @staticmethod
@@ -0,0 +1,366 @@
+"""
+任务预警服务
+进程内维护处理中任务的时间进度到达各预警阈值(80/90/95%)的时刻索引，
+定时任务在最近的时刻执行，只处理已到期的预警，每个阈值只预警一次并记录到 task_warnings 表
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+import threading
+
+from apscheduler.jobstores.base import JobLookupError
+from sqlalchemy import event, tuple_
+from sqlalchemy.orm import Session
+
+from app import db, scheduler
+from app.models.base import as_utc
+from app.models.task import Task
+from app.models.task_transfer import TaskTransfer
+from app.models.task_warning import TaskWarning
+from app.utils.deadline_index import DeadlineIndex
+
+# 键为任务ID，条目为 (阈值到达时间, (阈值, 期望完成时间))
+deadline_index = DeadlineIndex()
+
+# active: 索引是否已加载；transfer_id: 已同步的流转记录高水位；timer_due: 预警任务下次执行时间
+warning_state = {'active': False, 'transfer_id': 0, 'timer_due': None}
+warning_state_lock = threading.Lock()
+
+
+class WarningService:
+    """任务预警业务逻辑服务"""
+
+    # 时间进度预警阈值(%)
+    THRESHOLDS = [80, 90, 95]
+
+    # 预警定时任务ID，下次执行时间随索引中最早的到期时间调整
+    JOB_ID = 'check_task_warnings'
+
+    # 没有待触发预警时的兜底执行间隔
+    IDLE_INTERVAL = timedelta(hours=1)
+
+    # 启动加载和同步时每批读取的任务数
+    LOAD_CHUNK_SIZE = 5000
+
+    # 会话info中暂存本事务任务状态/期望时间变更的键
+    PENDING_KEY = 'task_deadline_changes'
+
+    # 流转记录高水位只推进到早于该时长的记录，避免并发事务晚提交的较小ID被高水位跳过
+    SAFETY_LAG = timedelta(seconds=30)
+
+    @staticmethod
+    def deadlines(start, end, now=None, fired=()):
+        """
+        计算任务时间进度到达各阈值的时刻
+        已经过去的阈值只保留最高的一个（立即到期），已预警过的阈值及低于它的阈值不再登记
+        :param fired: 当前期望完成时间下已预警过的阈值
+        :return: [(到达时间, (阈值, 期望完成时间))]
+        """
+        if not start or not end:
+            return []
+        start_utc = as_utc(start)
+        end_utc = as_utc(end)
+        if end_utc <= start_utc:
+            return []
+
+        now = now or datetime.now(timezone.utc)
+        highest_fired = max(fired, default=0)
+        passed = None
+        result = []
+        for threshold in WarningService.THRESHOLDS:
+            if threshold <= highest_fired:
+                continue
+            due_at = start_utc + (end_utc - start_utc) * threshold / 100
+            if due_at <= now:
+                passed = (due_at, (threshold, end))
+            else:
+                result.append((due_at, (threshold, end)))
+
+        if passed:
+            result.insert(0, passed)
+        return result
+
+    @staticmethod
+    def track(task_id, status, start, end, session=None):
+        """
+        记录任务状态或期望时间的变更，事务提交后更新预警索引
+        由 TaskService 在状态流转时调用；索引未加载的进程中忽略
+        """
+        if not warning_state['active']:
+            return
+        session = session or db.session
+        session.info.setdefault(WarningService.PENDING_KEY, []).append((task_id, status, start, end))
+
+    @staticmethod
+    def _fired_thresholds(rows):
+        """一次查询取出任务在当前期望完成时间下已预警过的阈值"""
+        fired = defaultdict(set)
+        if not rows:
+            return fired
+        for task_id, threshold in db.session.query(TaskWarning.task_id, TaskWarning.threshold).filter(
+            tuple_(TaskWarning.task_id, TaskWarning.expected_end_time).in_(
+                [(row.id, row.expected_end_time) for row in rows]
+            )
+        ):
+            fired[task_id].add(threshold)
+        return fired
+
+    @staticmethod
+    def _apply_changes(changes, fired=None):
+        """
+        按任务最新状态更新预警索引
+        :param changes: [(task_id, status, start, end)]
+        """
+        from app.services.task_service import TaskService
+
+        fired = fired or {}
+        now = datetime.now(timezone.utc)
+        earlier = False
+        for task_id, status, start, end in changes:
+            if status == TaskService.STATUS_PROCESSING:
+                earlier |= deadline_index.schedule(
+                    task_id, WarningService.deadlines(start, end, now, fired.get(task_id, ()))
+                )
+            else:
+                deadline_index.remove(task_id)
+
+        if earlier:
+            WarningService._wake_at(deadline_index.next_due())
+
+    @staticmethod
+    def _wake_at(due_at, force=False):
+        """
+        将预警任务的下次执行时间调整到 due_at
+        :param force: 为False时只提前不推后
+        """
+        now = datetime.now(timezone.utc)
+        if due_at is None:
+            due_at = now + WarningService.IDLE_INTERVAL
+
+        with warning_state_lock:
+            current = warning_state['timer_due']
+            if not force and current is not None and now <= current <= due_at:
+                return
+            warning_state['timer_due'] = due_at
+
+        try:
+            scheduler.modify_job(WarningService.JOB_ID, next_run_time=max(due_at, now))
+        except JobLookupError:
+            pass
+
+    @staticmethod
+    def load_deadlines():
+        """
+        启动时按任务ID分批加载处理中任务的预警时刻
+        :return: 加载的任务数
+        """
+        from app.services.task_service import TaskService
+
+        transfer_id = WarningService._settled_transfer_id()
+        last_id = 0
+        loaded = 0
+        while True:
+            rows = db.session.query(Task.id, Task.status, Task.expected_start_time, Task.expected_end_time).filter(
+                Task.id > last_id,
+                Task.status == TaskService.STATUS_PROCESSING,
+                Task.expected_start_time.isnot(None),
+                Task.expected_end_time.isnot(None)
+            ).order_by(Task.id.asc()).limit(WarningService.LOAD_CHUNK_SIZE).all()
+            if not rows:
+                break
+
+            WarningService._apply_changes(
+                [(row.id, row.status, row.expected_start_time, row.expected_end_time) for row in rows],
+                WarningService._fired_thresholds(rows)
+            )
+            last_id = rows[-1].id
+            loaded += len(rows)
+
+        with warning_state_lock:
+            warning_state['active'] = True
+            warning_state['transfer_id'] = max(warning_state['transfer_id'], transfer_id)
+
+        WarningService._wake_at(deadline_index.next_due(), force=True)
+        print(f'[{datetime.now()}] 预警索引加载完成，共 {loaded} 个处理中任务')
+        return loaded
+
+    @staticmethod
+    def unload_deadlines():
+        """失去调度器租约时清空索引，停止登记任务变更，重新成为主进程时重新加载"""
+        with warning_state_lock:
+            warning_state.update({'active': False, 'transfer_id': 0, 'timer_due': None})
+        deadline_index.clear()
+
+    @staticmethod
+    def _settled_transfer_id(now=None):
+        """早于安全时长的最大流转记录ID（按主键倒序找到第一条即停止），作为加载索引时的高水位"""
+        cutoff = (now or datetime.now(timezone.utc)) - WarningService.SAFETY_LAG
+        return db.session.query(TaskTransfer.id).filter(
+            TaskTransfer.created_at <= cutoff
+        ).order_by(TaskTransfer.id.desc()).limit(1).scalar() or 0
+
+    @staticmethod
+    def sync_deadlines(now=None):
+        """
+        按流转记录高水位同步其他进程产生的任务状态变更
+        高水位之后的记录每次都处理（按任务当前状态重新登记，重复处理无副作用），但高水位只推进到
+        早于 SAFETY_LAG 的连续记录为止：较新的记录之前可能有未提交事务占用的较小ID，下次重新扫描
+        :return: 同步的任务数
+        """
+        if not warning_state['active']:
+            return 0
+
+        cutoff = (now or datetime.now(timezone.utc)) - WarningService.SAFETY_LAG
+        transfers = db.session.query(TaskTransfer.id, TaskTransfer.task_id, TaskTransfer.created_at).filter(
+            TaskTransfer.id > warning_state['transfer_id']
+        ).order_by(TaskTransfer.id.asc()).limit(WarningService.LOAD_CHUNK_SIZE).all()
+        if not transfers:
+            return 0
+
+        task_ids = {row.task_id for row in transfers}
+        rows = db.session.query(
+            Task.id, Task.status, Task.expected_start_time, Task.expected_end_time
+        ).filter(Task.id.in_(task_ids)).all()
+
+        WarningService._apply_changes(
+            [(row.id, row.status, row.expected_start_time, row.expected_end_time) for row in rows],
+            WarningService._fired_thresholds(rows)
+        )
+        # 已删除的任务
+        for task_id in task_ids - {row.id for row in rows}:
+            deadline_index.remove(task_id)
+
+        settled = None
+        for row in transfers:
+            if as_utc(row.created_at) > cutoff:
+                break
+            settled = row.id
+        if settled is not None:
+            with warning_state_lock:
+                warning_state['transfer_id'] = max(warning_state['transfer_id'], settled)
+        return len(task_ids)
+
+    @staticmethod
+    def fire_due_warnings(now=None):
+        """
+        触发已到期的预警
+        逐条核对任务当前状态、期望完成时间和处理进度，仍满足条件的写入预警记录；
+        同一任务同时到期多个阈值时只预警最高的一个，预警记录唯一约束保证多进程下也只预警一次
+        :return: 新增的预警数
+        """
+        from app.services.task_service import TaskService
+
+        now = now or datetime.now(timezone.utc)
+        due = {}
+        for task_id, due_at, (threshold, end) in deadline_index.pop_due(now):
+            if task_id not in due or threshold > due[task_id][1]:
+                due[task_id] = (due_at, threshold, end)
+
+        fired = []
+        if due:
+            rows = {row.id: row for row in db.session.query(
+                Task.id, Task.title, Task.status, Task.progress, Task.current_handler_id, Task.expected_end_time
+            ).filter(Task.id.in_(due.keys()))}
+
+            for task_id, (due_at, threshold, end) in due.items():
+                row = rows.get(task_id)
+                if not row or row.status != TaskService.STATUS_PROCESSING or row.expected_end_time != end:
+                    continue
+                if (row.progress or 0) >= threshold:
+                    continue
+
+                warning = {
+                    'task_id': task_id,
+                    'handler_id': row.current_handler_id,
+                    'threshold': threshold,
+                    'progress': row.progress or 0,
+                    'expected_end_time': end,
+                    'due_at': due_at,
+                    'fired_at': now,
+                }
+                if WarningService._insert_warning(warning):
+                    fired.append((row, warning))
+            db.session.commit()
+
+        for row, warning in fired:
+            WarningService.notify(row, warning)
+
+        WarningService._wake_at(deadline_index.next_due(), force=True)
+        return len(fired)
+
+    @staticmethod
+    def notify(row, warning):
+        """
+        通过 SocketIO 向处理人专属房间(user_{处理人ID})推送预警通知
+        预警由调度主进程触发，多进程部署需配置 SOCKETIO_MESSAGE_QUEUE 才能送达连接在其他进程上的客户端；
+        推送失败不影响预警记录
+        """
+        from app import socketio
+
+        remaining = 100 - warning['threshold']
+        notification = {
+            'type': '任务预警',
+            'title': '任务预警',
+            'content': f'「{row.title}」即将到期(剩余{remaining}%时间)，当前进度{warning["progress"]}%',
+            'task_id': warning['task_id'],
+            'timestamp': warning['fired_at'].isoformat(),
+            'extra_data': {'threshold': warning['threshold'], 'warning_level': remaining},
+        }
+        try:
+            socketio.emit('notification', notification, room=f'user_{warning["handler_id"]}')
+        except Exception as e:
+            print(f'预警通知发送失败 task_id={warning["task_id"]}: {str(e)}')
+
+    @staticmethod
+    def _insert_warning(warning):
+        """
+        写入预警记录，同一任务、阈值和期望完成时间已存在时不写入
+        :return: 是否写入
+        """
+        dialect = db.session.get_bind().dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            if dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            stmt = insert(TaskWarning.__table__).on_conflict_do_nothing(
+                index_elements=['task_id', 'threshold', 'expected_end_time']
+            )
+            return db.session.execute(stmt, warning).rowcount == 1
+
+        exists = db.session.query(TaskWarning.id).filter_by(
+            task_id=warning['task_id'], threshold=warning['threshold'],
+            expected_end_time=warning['expected_end_time']
+        ).first()
+        if exists:
+            return False
+        db.session.execute(TaskWarning.__table__.insert(), warning)
+        return True
+
+    @staticmethod
+    def get_task_warnings(task_id):
+        """获取任务的预警记录，按预警时间倒序"""
+        warnings = TaskWarning.query.filter_by(task_id=task_id).order_by(TaskWarning.fired_at.desc()).all()
+        return [warning.to_dict() for warning in warnings]
+
+    @staticmethod
+    def get_index_stats():
+        """预警索引统计"""
+        stats = deadline_index.stats()
+        stats['active'] = warning_state['active']
+        stats['transfer_id'] = warning_state['transfer_id']
+        stats['timer_due'] = warning_state['timer_due']
+        return stats
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_deadline_changes(session):
+    """事务提交后按任务最新状态更新预警索引"""
+    changes = session.info.pop(WarningService.PENDING_KEY, None)
+    if changes:
+        WarningService._apply_changes(changes)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_deadline_changes(session):
+    """事务回滚时丢弃未提交的变更"""
+    session.info.pop(WarningService.PENDING_KEY, None)
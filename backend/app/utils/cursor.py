@@ -0,0 +1,42 @@
+"""
+游标分页工具
+游标为不透明字符串，内部是 (created_at, id) 排序键及翻页方向的 base64 编码
+"""
+import base64
+import json
+from datetime import datetime
+
+DIRECTION_NEXT = 'next'
+DIRECTION_PREV = 'prev'
+
+
+def encode_cursor(created_at, row_id, direction=DIRECTION_NEXT):
+    """将排序键编码为游标"""
+    payload = {
+        'c': created_at.isoformat(),
+        'i': row_id,
+        'd': direction
+    }
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    解析游标
+    :return: (created_at, id, direction)
+    :raises: ValueError
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        created_at = datetime.fromisoformat(payload['c'])
+        row_id = int(payload['i'])
+        direction = payload.get('d', DIRECTION_NEXT)
+    except Exception:
+        raise ValueError("无效的分页游标")
+
+    if direction not in (DIRECTION_NEXT, DIRECTION_PREV):
+        raise ValueError("无效的分页游标")
+
+    return created_at, row_id, direction
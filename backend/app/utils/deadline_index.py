@@ -0,0 +1,117 @@
+"""
+进程内到期时间索引
+"""
+import heapq
+import itertools
+import threading
+
+
+class DeadlineIndex:
+    """
+    按到期时间排序的线程安全最小堆
+    每个键可登记多个到期时间，重新登记或移除键时旧条目不从堆中删除，弹出时按代号识别并丢弃
+    """
+
+    def __init__(self):
+        self._heap = []  # [(due_at, seq, key, generation, payload)]
+        self._keys = {}  # {key: [generation, 剩余条目数]}
+        self._live = 0  # 堆中有效条目数
+        self._generations = itertools.count(1)
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    def schedule(self, key, deadlines):
+        """
+        登记键的全部到期时间，替换该键之前的登记
+        :param deadlines: [(due_at, payload)]，为空时等同于移除
+        :return: 堆顶是否变得更早
+        """
+        with self._lock:
+            self._discard(key)
+            if not deadlines:
+                return False
+
+            head = self._peek()
+            generation = next(self._generations)
+            self._keys[key] = [generation, len(deadlines)]
+            self._live += len(deadlines)
+            for due_at, payload in deadlines:
+                heapq.heappush(self._heap, (due_at, next(self._sequence), key, generation, payload))
+            self._compact()
+            return head is None or self._heap[0][0] < head
+
+    def remove(self, key):
+        """移除键的全部到期时间"""
+        with self._lock:
+            self._discard(key)
+
+    def clear(self):
+        """移除全部条目"""
+        with self._lock:
+            self._heap = []
+            self._keys = {}
+            self._live = 0
+
+    def pop_due(self, now):
+        """
+        弹出全部已到期的条目
+        :return: [(key, due_at, payload)]，按到期时间排序
+        """
+        result = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due_at, _, key, generation, payload = heapq.heappop(self._heap)
+                if self._release(key, generation):
+                    result.append((key, due_at, payload))
+        return result
+
+    def next_due(self):
+        """最早的到期时间，没有条目时返回None"""
+        with self._lock:
+            return self._peek()
+
+    def _peek(self):
+        """丢弃堆顶的失效条目后返回最早到期时间（调用方持有锁）"""
+        while self._heap:
+            due_at, _, key, generation, _ = self._heap[0]
+            entry = self._keys.get(key)
+            if entry and entry[0] == generation:
+                return due_at
+            heapq.heappop(self._heap)
+        return None
+
+    def _discard(self, key):
+        """使键的全部条目失效（调用方持有锁）"""
+        entry = self._keys.pop(key, None)
+        if entry:
+            self._live -= entry[1]
+
+    def _release(self, key, generation):
+        """条目出堆，返回其是否仍有效（调用方持有锁）"""
+        entry = self._keys.get(key)
+        if not entry or entry[0] != generation:
+            return False
+        entry[1] -= 1
+        self._live -= 1
+        if entry[1] <= 0:
+            del self._keys[key]
+        return True
+
+    def _compact(self):
+        """失效条目超过有效条目时重建堆（调用方持有锁）"""
+        if len(self._heap) > 1024 and len(self._heap) > 2 * self._live:
+            self._heap = [item for item in self._heap
+                          if self._keys.get(item[2], (None,))[0] == item[3]]
+            heapq.heapify(self._heap)
+
+    def stats(self):
+        """索引规模统计"""
+        with self._lock:
+            return {
+                'keys': len(self._keys),
+                'entries': len(self._heap),
+                'next_due': self._peek(),
+            }
+
+    def __len__(self):
+        return len(self._keys)
@@ -1,15 +1,92 @@
 """
 API响应工具
 """
-from flask import jsonify
+from flask import current_app, request
 from functools import wraps
+from datetime import datetime, date, timezone
 from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
 from app.services.user_service import UserService
+import hashlib
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson为可选依赖，未安装时使用标准库编码
+    orjson = None
+
+
+def _json_default(obj):
+    """标准库编码器无法处理的类型，datetime无时区信息时按UTC处理"""
+    if isinstance(obj, datetime):
+        if obj.tzinfo is None:
+            obj = obj.replace(tzinfo=timezone.utc)
+        return obj.isoformat()
+    if isinstance(obj, date):
+        return obj.isoformat()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def encode_stdlib(payload):
+    """标准库JSON编码（紧凑格式，不排序键）"""
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':'), default=_json_default).encode('utf-8')
+
+
+def encode_orjson(payload):
+    """orjson编码，原生支持datetime，无时区信息时按UTC输出"""
+    return orjson.dumps(payload, option=orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS)
+
+
+RESPONSE_ENCODERS = {'stdlib': encode_stdlib}
+if orjson is not None:
+    RESPONSE_ENCODERS['orjson'] = encode_orjson
+
+
+def init_response_encoder(app):
+    """
+    根据配置选择响应编码器
+    RESPONSE_JSON_ENCODER: auto(默认，优先orjson) / orjson / stdlib
+    """
+    name = app.config.get('RESPONSE_JSON_ENCODER', 'auto')
+    if name == 'auto':
+        name = 'orjson' if 'orjson' in RESPONSE_ENCODERS else 'stdlib'
+    if name not in RESPONSE_ENCODERS:
+        raise ValueError(f"不可用的响应编码器: {name}")
+    app.extensions['response_encoder'] = RESPONSE_ENCODERS[name]
+
+
+def encode_json(payload):
+    """使用当前应用的编码器将数据编码为JSON字节串"""
+    encoder = current_app.extensions.get('response_encoder', encode_stdlib)
+    return encoder(payload)
+
+
+def json_response(payload, status_code=200):
+    """构造JSON响应"""
+    return current_app.response_class(encode_json(payload), status=status_code, mimetype='application/json')
+
+
+def make_etag(*parts):
+    """根据版本信息生成ETag"""
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+
+def conditional_response(etag, build_response):
+    """
+    条件GET：请求的 If-None-Match 与ETag一致时直接返回304，不构造响应体
+    :param build_response: 生成完整响应的函数
+    """
+    if etag in request.if_none_match:
+        response = current_app.response_class(status=304)
+    else:
+        response = build_response()
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 
 def success_response(data=None, message='success', code=0):
     """成功响应"""
-    return jsonify({
+    return json_response({
         'code': code,
         'message': message,
         'data': data
@@ -18,7 +95,7 @@ def success_response(data=None, message='success', code=0):
 
 def error_response(message='error', code=400, status_code=400):
     """错误响应"""
-    return jsonify({
+    return json_response({
         'code': code,
         'message': message,
         'data': None
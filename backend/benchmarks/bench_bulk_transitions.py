@@ -0,0 +1,73 @@
+"""
+批量状态流转对比：逐个调用 transfer_task/close_task 与 bulk_transition
+
+逐个调用时每个任务各自查询任务和用户、更新统计并提交；
+批量接口一次查询校验权限，一条UPDATE更新状态，批量插入流转记录，统计增量一次写入。
+
+用法（在 backend 目录下执行）:
+    python benchmarks/bench_bulk_transitions.py --tasks 1000
+"""
+import argparse
+import time
+
+from sqlalchemy import event
+
+from common import create_bench_app, seed_users, seed_tasks
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量状态流转对比')
+    parser.add_argument('--tasks', type=int, default=1000, help='每次操作的任务数')
+    args = parser.parse_args()
+
+    create_bench_app()
+
+    from app import db
+    from app.models.task import Task
+    from app.services.task_service import TaskService
+
+    user_ids = seed_users()
+
+    statement_count = [0]
+
+    def count_statement(*_):
+        statement_count[0] += 1
+
+    event.listen(db.engine, 'before_cursor_execute', count_statement)
+
+    def fresh_task_ids():
+        """写入一批处理中的新任务并返回其ID"""
+        max_id = db.session.query(db.func.max(Task.id)).scalar() or 0
+        seed_tasks(args.tasks, user_ids)
+        Task.query.filter(Task.id > max_id).update({'status': TaskService.STATUS_PROCESSING})
+        db.session.commit()
+        TaskService.calculate_full_statistics()
+        return [task_id for task_id, in db.session.query(Task.id).filter(Task.id > max_id).order_by(Task.id).all()]
+
+    def run(label, fn):
+        task_ids = fresh_task_ids()
+        statement_count[0] = 0
+        started = time.perf_counter()
+        fn(task_ids)
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f'{label:<28} {elapsed:>10.1f} ms {statement_count[0]:>8} 条SQL')
+
+    admin_id, target_id = user_ids[0], user_ids[1]
+
+    print(f'{"操作（" + str(args.tasks) + "个任务）":<28} {"耗时":>13} {"SQL数":>10}')
+    run('逐个 transfer_task', lambda ids: [
+        TaskService.transfer_task(task_id, admin_id, target_id, '批量交接') for task_id in ids
+    ])
+    run('bulk_transition(transfer)', lambda ids: TaskService.bulk_transition(
+        'transfer', ids, admin_id, target_user_id=target_id, message='批量交接'
+    ))
+    run('逐个 close_task', lambda ids: [
+        TaskService.close_task(task_id, admin_id, '版本发布完成') for task_id in ids
+    ])
+    run('bulk_transition(close)', lambda ids: TaskService.bulk_transition(
+        'close', ids, admin_id, message='版本发布完成'
+    ))
+
+
+if __name__ == '__main__':
+    main()
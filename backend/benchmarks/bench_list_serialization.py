@@ -0,0 +1,51 @@
+"""
+任务列表序列化开销对比：ORM对象 + to_dict() 与列投影直接构造字典
+
+用法（在 backend 目录下执行）:
+    python benchmarks/bench_list_serialization.py --sizes 100 1000 10000
+"""
+import argparse
+
+from common import create_bench_app, seed_users, seed_tasks, measure
+
+
+def main():
+    parser = argparse.ArgumentParser(description='任务列表序列化开销对比')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000], help='每次查询的行数')
+    parser.add_argument('--repeat', type=int, default=5, help='每项重复次数')
+    args = parser.parse_args()
+
+    create_bench_app()
+
+    from app import db
+    from app.models.task import Task
+    from app.services.task_service import TaskService
+    from sqlalchemy.orm import joinedload
+
+    user_ids = seed_users()
+    seed_tasks(max(args.sizes), user_ids)
+
+    def orm_path(size):
+        tasks = Task.query.options(
+            joinedload(Task.creator),
+            joinedload(Task.current_handler)
+        ).order_by(Task.created_at.desc()).limit(size).all()
+        result = [task.to_dict() for task in tasks]
+        db.session.expunge_all()
+        return result
+
+    def projection_path(size):
+        query = Task.query.order_by(Task.created_at.desc())
+        rows = TaskService.select_task_rows(query).limit(size).all()
+        return TaskService.serialize_task_rows(rows)
+
+    print(f'{"行数":>8} {"to_dict(us/行)":>16} {"投影(us/行)":>14} {"加速比":>8}')
+    for size in args.sizes:
+        orm_ms = measure(lambda: orm_path(size), args.repeat)
+        projection_ms = measure(lambda: projection_path(size), args.repeat)
+        print(f'{size:>8} {orm_ms * 1000 / size:>16.1f} {projection_ms * 1000 / size:>14.1f} '
+              f'{orm_ms / projection_ms:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+页码分页与游标分页延迟对比
+
+用法（在 backend 目录下执行）:
+    python benchmarks/bench_pagination.py --rows 200020 --per-page 20
+"""
+import argparse
+
+from common import create_bench_app, seed_users, seed_tasks, measure
+
+
+def main():
+    parser = argparse.ArgumentParser(description='页码分页与游标分页延迟对比')
+    parser.add_argument('--rows', type=int, default=200020, help='任务行数')
+    parser.add_argument('--per-page', type=int, default=20, help='每页条数')
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 100, 10000], help='对比的页码')
+    parser.add_argument('--repeat', type=int, default=5, help='每项重复次数')
+    args = parser.parse_args()
+
+    create_bench_app()
+
+    from app import db
+    from app.models.task import Task
+    from app.services.task_service import TaskService
+    from app.utils.cursor import encode_cursor
+
+    user_ids = seed_users()
+    seed_tasks(args.rows, user_ids)
+    print(f'已写入 {args.rows} 条任务，每页 {args.per_page} 条')
+    print(f'{"页码":>8} {"offset(ms)":>12} {"cursor(ms)":>12}')
+
+    for page in args.pages:
+        offset = (page - 1) * args.per_page
+        if offset >= args.rows:
+            print(f'{page:>8} {"-":>12} {"-":>12}  (超出数据范围)')
+            continue
+
+        # 游标取上一页最后一行的排序键，构造过程不计入耗时
+        cursor = None
+        if offset > 0:
+            created_at, last_id = db.session.query(Task.created_at, Task.id)\
+                .order_by(Task.created_at.desc(), Task.id.desc())\
+                .offset(offset - 1).limit(1).one()
+            cursor = encode_cursor(created_at, last_id)
+
+        offset_ms = measure(lambda: TaskService.list_tasks(page, args.per_page), args.repeat)
+        cursor_ms = measure(lambda: TaskService.list_tasks_by_cursor(cursor, args.per_page), args.repeat)
+        print(f'{page:>8} {offset_ms:>12.2f} {cursor_ms:>12.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+周期任务生成开销
+
+  - 空闲：没有到期规则时，按 (is_active, next_run_at) 索引的一次范围查询
+  - 到期：模拟调度器停机一段时间后恢复，补建全部错过的执行
+
+用法（在 backend 目录下执行）:
+    python benchmarks/bench_recurrence.py --rules 10000 --downtime-hours 6
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from common import create_bench_app, seed_users
+
+
+def main():
+    parser = argparse.ArgumentParser(description='周期任务生成开销')
+    parser.add_argument('--rules', type=int, default=10000, help='周期规则数（每天在随机时刻执行一次）')
+    parser.add_argument('--downtime-hours', type=int, default=6, help='模拟停机时长（小时）')
+    args = parser.parse_args()
+
+    create_bench_app()
+
+    from app import db
+    from app.models.task import Task
+    from app.models.task_recurrence import TaskRecurrence
+    from app.services.recurrence_service import RecurrenceService
+
+    user_ids = seed_users()
+    rng = random.Random(0)
+    now = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+
+    started = time.perf_counter()
+    recurrences = []
+    for i in range(args.rules):
+        recurrence = TaskRecurrence(
+            title=f'周期任务{i}', category='定时周期任务', description='',
+            creator_id=rng.choice(user_ids), handler_id=rng.choice(user_ids),
+            rule_type='cron', rule=f'{rng.randrange(60)} {rng.randrange(24)} * * *',
+            dtstart=now - timedelta(days=1), duration_minutes=24 * 60, catch_up=True, is_active=True
+        )
+        recurrence.next_run_at = RecurrenceService.next_run(recurrence, now)
+        recurrences.append(recurrence)
+    db.session.add_all(recurrences)
+    db.session.commit()
+    print(f'写入 {args.rules} 个周期规则: {(time.perf_counter() - started) * 1000:.0f} ms')
+
+    plan = db.session.execute(db.text(
+        'EXPLAIN QUERY PLAN SELECT * FROM task_recurrences WHERE is_active = 1 AND next_run_at <= :now '
+        'ORDER BY next_run_at LIMIT 500'
+    ), {'now': now}).fetchall()
+    print('查询计划: ' + '; '.join(row[-1] for row in plan))
+
+    started = time.perf_counter()
+    rounds = 100
+    for _ in range(rounds):
+        RecurrenceService.generate_due(now=now)
+    print(f'无到期规则: {(time.perf_counter() - started) * 1000 / rounds:.2f} ms/次')
+
+    resumed_at = now + timedelta(hours=args.downtime_hours)
+    started = time.perf_counter()
+    created = 0
+    while True:
+        batch = RecurrenceService.generate_due(now=resumed_at)
+        if not batch:
+            break
+        created += batch
+    elapsed = time.perf_counter() - started
+    print(f'停机 {args.downtime_hours} 小时后恢复: 生成 {created} 个任务，{elapsed * 1000:.0f} ms'
+          f'（{elapsed * 1000000 / max(created, 1):.0f} us/个）')
+
+    due = db.session.query(TaskRecurrence.id).filter(
+        TaskRecurrence.is_active.is_(True), TaskRecurrence.next_run_at <= resumed_at
+    ).count()
+    print(f'恢复后仍到期的规则: {due}，任务总数: {Task.query.count()}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+响应编码器吞吐量对比：GET /api/tasks?per_page=100
+
+分别对比 jsonify（原实现）、标准库编码器、orjson编码器的
+单次编码耗时与端到端请求吞吐量。
+
+用法（在 backend 目录下执行）:
+    python benchmarks/bench_response_encoder.py --requests 200
+"""
+import argparse
+import time
+
+from common import create_bench_app, seed_users, seed_tasks, measure
+
+
+def main():
+    parser = argparse.ArgumentParser(description='响应编码器吞吐量对比')
+    parser.add_argument('--rows', type=int, default=1000, help='任务行数')
+    parser.add_argument('--requests', type=int, default=200, help='每种编码器的请求次数')
+    args = parser.parse_args()
+
+    application, _ = create_bench_app()
+
+    from flask import jsonify
+    from flask_jwt_extended import create_access_token
+    from app.models.task import Task
+    from app.services.task_service import TaskService
+    from app.utils.response import RESPONSE_ENCODERS
+
+    user_ids = seed_users()
+    seed_tasks(args.rows, user_ids)
+
+    # jsonify 需要先将时间字段格式化为字符串，orjson/标准库编码器直接处理datetime，
+    # 因此两者都计入行序列化耗时
+    rows = TaskService.select_task_rows(Task.query.order_by(Task.created_at.desc())).limit(100).all()
+
+    def encode_with_jsonify():
+        return jsonify({'code': 0, 'message': 'success',
+                        'data': TaskService.serialize_task_rows(rows, format_datetimes=True)})
+
+    def encode_with(encoder):
+        return encoder({'code': 0, 'message': 'success', 'data': TaskService.serialize_task_rows(rows)})
+
+    print('序列化+编码耗时（per_page=100）')
+    with application.test_request_context():
+        print(f'{"jsonify":>10}: {measure(encode_with_jsonify, 50):.3f} ms')
+        for name, encoder in RESPONSE_ENCODERS.items():
+            print(f'{name:>10}: {measure(lambda: encode_with(encoder), 50):.3f} ms')
+
+    client = application.test_client()
+    headers = {'Authorization': f'Bearer {create_access_token(identity=str(user_ids[0]))}'}
+
+    print(f'\n端到端吞吐量（{args.requests} 次 GET /api/tasks?per_page=100&count=none）')
+    for name, encoder in RESPONSE_ENCODERS.items():
+        application.extensions['response_encoder'] = encoder
+        started = time.perf_counter()
+        for _ in range(args.requests):
+            response = client.get('/api/tasks?per_page=100&count=none', headers=headers)
+            assert response.status_code == 200
+        elapsed = time.perf_counter() - started
+        print(f'{name:>10}: {args.requests / elapsed:.1f} req/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+定时任务执行开销对比
+
+  - 每次执行调用 create_app()：重建Flask应用、扩展和蓝图，并为新应用创建数据库引擎（原实现）
+  - 复用应用实例：SchedulerService.run_job 在已有应用上推入新的应用上下文
+
+任务本身只做一次计数查询，耗时差异即为每次执行的固定开销；同时统计执行后仍存活的数据库引擎数。
+
+用法（在 backend 目录下执行）:
+    python benchmarks/bench_scheduler_jobs.py --runs 50
+"""
+import argparse
+import gc
+import os
+import tempfile
+import time
+
+from common import create_bench_app, seed_users, seed_tasks
+
+
+def main():
+    parser = argparse.ArgumentParser(description='定时任务执行开销对比')
+    parser.add_argument('--runs', type=int, default=50, help='每种方式的执行次数')
+    parser.add_argument('--rows', type=int, default=1000, help='任务行数')
+    args = parser.parse_args()
+
+    # 每次 create_app() 都会创建新引擎，内存数据库无法共享数据，使用文件数据库
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    application, ctx = create_bench_app(f'sqlite:///{path}')
+
+    from app import create_app, db
+    from app.models.task import Task
+    from app.services.scheduler_service import SchedulerService, job_stats
+
+    user_ids = seed_users()
+    seed_tasks(args.rows, user_ids)
+    ctx.pop()
+
+    def job():
+        return Task.query.count()
+
+    def create_app_per_job():
+        app = create_app('testing')
+        with app.app_context():
+            rows = job()
+            db.session.commit()
+        return rows
+
+    def reuse_app():
+        return SchedulerService.run_job(application, 'bench', job)
+
+    cases = [('create_app()', create_app_per_job), ('复用应用实例', reuse_app)]
+
+    print(f'{"方式":<14} {"平均(ms)":>10} {"最大(ms)":>10} {"存活引擎数":>10}')
+    for name, func in cases:
+        gc.collect()
+        engines_before = len(db._app_engines)
+        durations = []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            assert func() == args.rows
+            durations.append((time.perf_counter() - started) * 1000)
+        engines_after = len(db._app_engines)
+        print(f'{name:<14} {sum(durations) / len(durations):>10.2f} {max(durations):>10.2f} '
+              f'{engines_after - engines_before:>10}')
+
+    stats = job_stats['bench']
+    print(f'\nrun_job 记录: 执行 {stats["runs"]} 次，平均 {stats["total_duration_ms"] / stats["runs"]:.2f} ms，'
+          f'共 {stats["total_rows"]} 行')
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+统计接口在并发刷新下的延迟对比
+
+多个线程模拟仪表盘并发刷新统计数据，同时一个写线程持续提交计数变更，对比：
+  - 逐项查询：每个统计项一次查询（原实现，13次查询）
+  - 单次查询：一次读取全部计数器
+  - 进程内快照：计数变更后由一个线程刷新，其余请求直接读取快照
+
+用法（在 backend 目录下执行）:
+    python benchmarks/bench_statistics.py --threads 8 --duration 3
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from common import create_bench_app, seed_users, seed_tasks
+
+
+def main():
+    parser = argparse.ArgumentParser(description='统计接口并发刷新延迟对比')
+    parser.add_argument('--threads', type=int, default=8, help='并发读取线程数')
+    parser.add_argument('--duration', type=float, default=3, help='每种方式的持续时间(秒)')
+    parser.add_argument('--write-interval', type=float, default=0.01, help='写线程提交计数变更的间隔(秒)')
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    application, _ = create_bench_app(f'sqlite:///{path}')
+
+    from app import db
+    from app.models.task_statistics import TaskCounter
+    from app.services.task_service import TaskService
+
+    user_ids = seed_users()
+    seed_tasks(10000, user_ids)
+    TaskService.calculate_full_statistics()
+
+    statuses = [TaskService.STATUS_NEW, TaskService.STATUS_PENDING, TaskService.STATUS_PROCESSING,
+                TaskService.STATUS_SUSPENDED, TaskService.STATUS_COMPLETED, TaskService.STATUS_CLOSED]
+    categories = [TaskService.CATEGORY_VERSION, TaskService.CATEGORY_URGENT, TaskService.CATEGORY_NORMAL,
+                  TaskService.CATEGORY_PERIODIC, TaskService.CATEGORY_OTHER]
+
+    def per_key_queries():
+        """原实现：总数、各状态、各分类、最后更新时间分别查询"""
+        def get_count(counter_type, counter_key):
+            return db.session.query(TaskCounter.count).filter_by(
+                counter_type=counter_type, counter_key=counter_key).scalar() or 0
+
+        return {
+            'total': get_count('overview', 'total'),
+            'status_distribution': {status: get_count('status_distribution', status) for status in statuses},
+            'category_distribution': {category: get_count('category_distribution', category)
+                                      for category in categories},
+            'updated_at': db.session.query(db.func.max(TaskCounter.updated_at)).scalar(),
+        }
+
+    cases = [
+        ('逐项查询(13次)', per_key_queries),
+        ('单次查询', TaskService.get_statistics_from_cache),
+        ('进程内快照', TaskService.get_statistics_snapshot),
+    ]
+
+    print(f'{args.threads} 个读线程持续 {args.duration:.0f} 秒，写线程每 {args.write_interval * 1000:.0f}ms 提交一次计数变更')
+    print(f'{"方式":<14} {"p50(ms)":>9} {"p99(ms)":>9} {"吞吐(次/秒)":>12} {"写入次数":>8}')
+
+    for label, fn in cases:
+        stop = threading.Event()
+        writes = [0]
+        timings = []
+        timings_lock = threading.Lock()
+
+        def writer():
+            with application.app_context():
+                while not stop.is_set():
+                    TaskService.apply_statistics_deltas({('status_distribution', TaskService.STATUS_NEW): 1})
+                    db.session.commit()
+                    writes[0] += 1
+                    time.sleep(args.write_interval)
+
+        def reader():
+            local = []
+            deadline = time.perf_counter() + args.duration
+            with application.app_context():
+                while time.perf_counter() < deadline:
+                    started = time.perf_counter()
+                    fn()
+                    local.append((time.perf_counter() - started) * 1000)
+                    db.session.remove()
+            with timings_lock:
+                timings.extend(local)
+
+        writer_thread = threading.Thread(target=writer)
+        reader_threads = [threading.Thread(target=reader) for _ in range(args.threads)]
+        writer_thread.start()
+        started = time.perf_counter()
+        for thread in reader_threads:
+            thread.start()
+        for thread in reader_threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        stop.set()
+        writer_thread.join()
+
+        timings.sort()
+        p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+        print(f'{label:<14} {statistics.median(timings):>9.3f} {p99:>9.3f} '
+              f'{len(timings) / elapsed:>12.0f} {writes[0]:>8}')
+
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
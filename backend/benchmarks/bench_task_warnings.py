@@ -0,0 +1,93 @@
+"""
+任务预警检查开销对比
+
+  - 全量扫描：加载全部处理中任务，逐个计算时间进度并逐个提交（原每小时执行的实现）
+  - 到期索引：启动时分批加载预警时刻，之后每次只处理已到期的预警
+
+用法（在 backend 目录下执行）:
+    python benchmarks/bench_task_warnings.py --rows 10000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from common import create_bench_app, seed_users, seed_tasks
+
+
+def main():
+    parser = argparse.ArgumentParser(description='任务预警检查开销对比')
+    parser.add_argument('--rows', type=int, default=10000, help='处理中任务数')
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    create_bench_app(f'sqlite:///{path}')
+
+    from app import db
+    from app.models.task import Task
+    from app.models.task_warning import TaskWarning
+    from app.services.task_service import TaskService
+    from app.services.warning_service import WarningService, deadline_index
+
+    user_ids = seed_users()
+    seed_tasks(args.rows, user_ids)
+
+    # 期望时间在过去10天到未来10天之间随机分布，全部置为处理中
+    rng = random.Random(0)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    rows = []
+    for task_id, in db.session.query(Task.id):
+        start = now - timedelta(hours=rng.uniform(0, 240))
+        rows.append({'b_id': task_id, 'b_start': start, 'b_end': start + timedelta(hours=rng.uniform(1, 480))})
+    db.session.execute(Task.__table__.update().where(Task.id == db.bindparam('b_id')).values(
+        status=TaskService.STATUS_PROCESSING, progress=0,
+        expected_start_time=db.bindparam('b_start'), expected_end_time=db.bindparam('b_end')
+    ), rows)
+    db.session.commit()
+
+    def full_scan():
+        tasks = Task.query.filter(
+            Task.status == TaskService.STATUS_PROCESSING,
+            Task.expected_start_time.isnot(None),
+            Task.expected_end_time.isnot(None)
+        ).all()
+        warnings = 0
+        for task in tasks:
+            task.time_progress = task.calculate_time_progress()
+            db.session.commit()
+            if task.time_progress >= 80 and task.progress < 80:
+                warnings += 1
+        db.session.expunge_all()
+        return warnings
+
+    started = time.perf_counter()
+    warnings = full_scan()
+    print(f'全量扫描: {(time.perf_counter() - started) * 1000:.0f} ms，{warnings} 个任务满足预警条件（每小时重复输出）')
+
+    started = time.perf_counter()
+    loaded = WarningService.load_deadlines()
+    print(f'启动加载索引: {(time.perf_counter() - started) * 1000:.0f} ms，{loaded} 个任务，'
+          f'{deadline_index.stats()["entries"]} 个预警时刻')
+
+    started = time.perf_counter()
+    fired = WarningService.fire_due_warnings()
+    print(f'首次触发（补发已过阈值）: {(time.perf_counter() - started) * 1000:.0f} ms，新增 {fired} 条预警')
+
+    for hours in [1, 24]:
+        at = datetime.now(timezone.utc) + timedelta(hours=hours)
+        started = time.perf_counter()
+        fired = WarningService.fire_due_warnings(now=at)
+        print(f'{hours}小时后触发: {(time.perf_counter() - started) * 1000:.1f} ms，新增 {fired} 条预警')
+
+    started = time.perf_counter()
+    fired = WarningService.fire_due_warnings(now=at)
+    print(f'无到期预警时: {(time.perf_counter() - started) * 1000:.2f} ms，新增 {fired} 条预警')
+    print(f'预警记录总数: {TaskWarning.query.count()}')
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+定时刷新时间进度的耗时对比
+
+  - 逐行ORM：加载全部处理中任务对象，逐个计算后一次提交（原实现）
+  - 数据库端UPDATE：TaskService.refresh_time_progress 按ID区间分块，每块一条UPDATE并提交
+
+全部任务均为处理中，期望时间覆盖未开始、进行中、已超期和时长非法等情况；
+执行后与 calculate_time_progress 的结果逐行核对。
+
+用法（在 backend 目录下执行）:
+    python benchmarks/bench_time_progress.py --sizes 10000 100000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from common import create_bench_app, seed_users, seed_tasks
+
+
+def main():
+    parser = argparse.ArgumentParser(description='定时刷新时间进度耗时对比')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000], help='处理中任务数')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='每个事务覆盖的任务ID区间大小')
+    args = parser.parse_args()
+
+    create_bench_app()
+
+    from app import db
+    from app.models.task import Task, calculate_time_progress
+    from app.services.task_service import TaskService
+
+    user_ids = seed_users()
+    now = datetime.now(timezone.utc)
+    naive_now = now.replace(tzinfo=None)
+
+    def prepare(size):
+        """写入任务并随机分布期望时间，时间进度全部置0"""
+        db.session.query(Task).delete()
+        db.session.commit()
+        seed_tasks(size, user_ids)
+
+        rng = random.Random(size)
+        rows = []
+        for task_id, in db.session.query(Task.id):
+            start = naive_now + timedelta(hours=rng.uniform(-240, 48))
+            end = start + timedelta(hours=rng.choice([rng.uniform(1, 480), 0, -1]))
+            rows.append({'id': task_id, 'expected_start_time': start, 'expected_end_time': end})
+        db.session.execute(Task.__table__.update().where(Task.id == db.bindparam('task_id')).values(
+            status=TaskService.STATUS_PROCESSING, time_progress=0,
+            expected_start_time=db.bindparam('start'), expected_end_time=db.bindparam('end')
+        ), [{'task_id': r['id'], 'start': r['expected_start_time'], 'end': r['expected_end_time']} for r in rows])
+        db.session.commit()
+
+    def reset_progress():
+        db.session.execute(Task.__table__.update().values(time_progress=0))
+        db.session.commit()
+
+    def orm_path():
+        tasks = Task.query.filter(
+            Task.status.in_([TaskService.STATUS_PROCESSING]),
+            Task.expected_start_time.isnot(None),
+            Task.expected_end_time.isnot(None)
+        ).all()
+        for task in tasks:
+            task.time_progress = calculate_time_progress(task.expected_start_time, task.expected_end_time, now)
+        db.session.commit()
+        db.session.expunge_all()
+        return len(tasks)
+
+    def sql_path():
+        return TaskService.refresh_time_progress(args.chunk_size, now)
+
+    def verify():
+        mismatched = sum(
+            1 for row in db.session.query(Task.time_progress, Task.expected_start_time, Task.expected_end_time)
+            if row.time_progress != calculate_time_progress(row.expected_start_time, row.expected_end_time, now)
+        )
+        return mismatched
+
+    print(f'{"任务数":>8} {"方式":<16} {"耗时(ms)":>10} {"写入行数":>10} {"不一致行数":>10}')
+    for size in args.sizes:
+        prepare(size)
+        for name, func in [('逐行ORM', orm_path), ('数据库端UPDATE', sql_path)]:
+            reset_progress()
+            started = time.perf_counter()
+            rows = func()
+            elapsed = (time.perf_counter() - started) * 1000
+            print(f'{size:>8} {name:<16} {elapsed:>10.1f} {rows:>10} {verify():>10}')
+
+        # 进度未变化时再次执行，只扫描不写入
+        started = time.perf_counter()
+        rows = sql_path()
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f'{size:>8} {"UPDATE(无变化)":<16} {elapsed:>10.1f} {rows:>10} {verify():>10}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+用户缓存对请求SQL数的影响
+
+对比每次请求前清空用户缓存（等同于未启用缓存）与缓存命中时，
+常见接口单次请求执行的SQL语句数和耗时。
+
+用法（在 backend 目录下执行）:
+    python benchmarks/bench_user_cache.py --requests 200
+"""
+import argparse
+import time
+
+from sqlalchemy import event
+
+from common import create_bench_app, seed_users, seed_tasks
+
+
+def main():
+    parser = argparse.ArgumentParser(description='用户缓存对请求SQL数的影响')
+    parser.add_argument('--requests', type=int, default=200, help='每个接口的请求次数')
+    args = parser.parse_args()
+
+    application, _ = create_bench_app()
+
+    from app import db
+    from app.models.task import Task
+    from app.services.user_service import UserService, user_cache
+    from flask_jwt_extended import create_access_token
+
+    user_ids = seed_users()
+    seed_tasks(args.requests * 2, user_ids)
+    db.session.query(Task).update({'current_handler_id': user_ids[1], 'status': '新建'})
+    db.session.commit()
+    task_ids = [task_id for task_id, in db.session.query(Task.id).order_by(Task.id).all()]
+    um_code = UserService.get_user_by_id(user_ids[1]).um_code
+
+    client = application.test_client()
+    admin_headers = {'Authorization': f'Bearer {create_access_token(identity=str(user_ids[0]))}'}
+    handler_headers = {'Authorization': f'Bearer {create_access_token(identity=str(user_ids[1]))}'}
+
+    statement_count = [0]
+
+    def count_statement(*_):
+        statement_count[0] += 1
+
+    event.listen(db.engine, 'before_cursor_execute', count_statement)
+
+    def run(label, request_fn, use_cache):
+        user_cache.clear()
+        statement_count[0] = 0
+        started = time.perf_counter()
+        for i in range(args.requests):
+            if not use_cache:
+                user_cache.clear()
+            response = request_fn(i)
+            assert response.status_code == 200, response.get_json()
+        elapsed = (time.perf_counter() - started) * 1000
+        return statement_count[0] / args.requests, elapsed / args.requests
+
+    pending_task_ids = iter(task_ids)
+
+    def respond(_):
+        return client.post(f'/api/tasks/{next(pending_task_ids)}/respond', json={}, headers=handler_headers)
+
+    cases = [
+        ('GET /api/tasks/my-pending', lambda i: client.get('/api/tasks/my-pending', headers=handler_headers)),
+        ('GET /api/tasks/cache-stats', lambda i: client.get('/api/tasks/cache-stats', headers=admin_headers)),
+        ('GET /api/users/notifications', lambda i: client.get(f'/api/users/notifications?um_code={um_code}')),
+        ('POST /api/tasks/<id>/respond', respond),
+    ]
+
+    print(f'{"接口":<32} {"无缓存SQL/请求":>14} {"缓存SQL/请求":>12} {"无缓存ms":>10} {"缓存ms":>8}')
+    for label, request_fn in cases:
+        uncached_sql, uncached_ms = run(label, request_fn, use_cache=False)
+        cached_sql, cached_ms = run(label, request_fn, use_cache=True)
+        print(f'{label:<32} {uncached_sql:>14.2f} {cached_sql:>12.2f} {uncached_ms:>10.2f} {cached_ms:>8.2f}')
+
+    print(f'\n用户缓存: {UserService.get_cache_stats()}')
+
+
+if __name__ == '__main__':
+    main()
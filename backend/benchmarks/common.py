@@ -0,0 +1,98 @@
+"""
+基准测试公共工具
+在内存SQLite中构造测试应用和批量数据，供 benchmarks 目录下的脚本复用
+
+用法（在 backend 目录下执行）:
+    python benchmarks/bench_pagination.py --rows 200000
+"""
+import os
+import sys
+import time
+import statistics
+from datetime import datetime, timedelta, timezone
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from app import create_app, db  # noqa: E402
+
+CATEGORIES = ['版本任务', '紧急任务', '其他任务', '定时周期任务', '普通任务']
+STATUSES = ['新建', '待响应', '处理中', '挂起', '已完成', '关闭']
+
+
+def create_bench_app(database_uri=None):
+    """
+    创建测试应用并建表，返回已推入的应用上下文
+    :param database_uri: 默认使用内存SQLite；多线程场景需传入文件数据库
+    """
+    import app.models  # noqa: F401
+    import app.models.task_statistics  # noqa: F401
+    import app.models.task_attachment  # noqa: F401
+    import app.models.scheduler_lease  # noqa: F401
+    from config import TestingConfig
+
+    if database_uri:
+        TestingConfig.SQLALCHEMY_DATABASE_URI = database_uri
+    application = create_app('testing')
+    ctx = application.app_context()
+    ctx.push()
+    db.create_all()
+    return application, ctx
+
+
+def seed_users(count=20):
+    """批量写入用户，返回用户ID列表"""
+    from app.models.user import User
+
+    now = datetime.now(timezone.utc)
+    rows = [{
+        'um_code': f'BENCH{i:05d}',
+        'name': f'测试用户{i}',
+        'email': f'bench{i}@example.com',
+        'password_hash': 'x',
+        'is_admin': i == 0,
+        'is_active': True,
+        'created_at': now,
+        'updated_at': now,
+    } for i in range(count)]
+    db.session.execute(User.__table__.insert(), rows)
+    db.session.commit()
+    return [row[0] for row in db.session.query(User.id).order_by(User.id).all()]
+
+
+def seed_tasks(count, user_ids, chunk_size=10000):
+    """批量写入任务，创建时间按秒递减分布"""
+    from app.models.task import Task
+
+    base = datetime.now(timezone.utc).replace(tzinfo=None)
+    for start in range(0, count, chunk_size):
+        rows = []
+        for i in range(start, min(start + chunk_size, count)):
+            created_at = base - timedelta(seconds=i)
+            rows.append({
+                'title': f'基准任务{i} 版本发布检查',
+                'category': CATEGORIES[i % len(CATEGORIES)],
+                'description': '任务描述' * 50,
+                'status': STATUSES[i % len(STATUSES)],
+                'progress': i % 101,
+                'time_progress': 0,
+                'creator_id': user_ids[i % len(user_ids)],
+                'current_handler_id': user_ids[(i * 7) % len(user_ids)],
+                'expected_start_time': created_at,
+                'expected_end_time': created_at + timedelta(days=7),
+                'created_at': created_at,
+                'updated_at': created_at,
+            })
+        db.session.execute(Task.__table__.insert(), rows)
+    db.session.commit()
+
+
+def measure(fn, repeat=5):
+    """多次执行函数，返回耗时中位数（毫秒）"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
@@ -35,6 +35,9 @@ class Config:
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'pdf', 'doc', 'docx', 'xls', 'xlsx'}
 
+    # 响应JSON编码器: auto(优先orjson) / orjson / stdlib
+    RESPONSE_JSON_ENCODER = os.environ.get('RESPONSE_JSON_ENCODER', 'auto')
+
     # 日志配置
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
     LOG_FILE = os.path.join(basedir, 'logs', 'app.log')
@@ -42,6 +45,10 @@ class Config:
     # 定时任务配置
     SCHEDULER_API_ENABLED = True
     SCHEDULER_TIMEZONE = 'Asia/Shanghai'
+    # 是否在本进程启动调度器；多进程部署时各进程通过数据库租约选出唯一执行定时任务的主进程
+    SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', 'true').lower() == 'true'
+    # 调度器租约时长(秒)，持有者每1/3时长续约一次，失联后其他进程最迟一个时长后接管
+    SCHEDULER_LEASE_TTL = int(os.environ.get('SCHEDULER_LEASE_TTL', 30))
 
 
 class DevelopmentConfig(Config):
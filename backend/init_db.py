@@ -2,6 +2,11 @@
 数据库初始化脚本
 创建管理员账户
 """
+import os
+
+# 一次性脚本不启动定时任务调度器
+os.environ.setdefault('SCHEDULER_ENABLED', 'false')
+
 from app import create_app, db
 from app.models.user import User
 
@@ -0,0 +1,25 @@
+"""
+将旧的定时周期任务转换为周期规则脚本
+"""
+import os
+
+# 一次性脚本不启动定时任务调度器
+os.environ.setdefault('SCHEDULER_ENABLED', 'false')
+
+from app import create_app, db
+from app.services.recurrence_service import RecurrenceService
+
+def init_recurrences():
+    """为尚未关联周期规则的定时周期任务创建每周执行的周期规则"""
+    app = create_app()
+    with app.app_context():
+        print('开始转换定时周期任务...')
+        try:
+            converted = RecurrenceService.convert_legacy_tasks()
+            print(f'定时周期任务转换完成，共创建 {converted} 个周期规则！')
+        except Exception as e:
+            print(f'转换失败: {str(e)}')
+            db.session.rollback()
+
+if __name__ == '__main__':
+    init_recurrences()
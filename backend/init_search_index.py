@@ -0,0 +1,25 @@
+"""
+初始化/重建任务全文搜索索引脚本
+"""
+import os
+
+# 一次性脚本不启动定时任务调度器
+os.environ.setdefault('SCHEDULER_ENABLED', 'false')
+
+from app import create_app, db
+from app.services.search_service import SearchService
+
+def init_search_index():
+    """创建全文索引并根据现有任务重建"""
+    app = create_app()
+    with app.app_context():
+        print('开始重建全文搜索索引...')
+        try:
+            SearchService.rebuild_index()
+            print('全文搜索索引重建完成！')
+        except Exception as e:
+            print(f'重建失败: {str(e)}')
+            db.session.rollback()
+
+if __name__ == '__main__':
+    init_search_index()
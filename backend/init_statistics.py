@@ -1,6 +1,13 @@
 """
 初始化统计数据脚本
+按任务表重置全局统计计数并校正人员工作量计数，也可用于手动校正；
+同时删除已停用的JSON统计表 task_statistics（统计已改为 task_counters 计数器）
 """
+import os
+
+# 一次性脚本不启动定时任务调度器
+os.environ.setdefault('SCHEDULER_ENABLED', 'false')
+
 from app import create_app, db
 from app.services.task_service import TaskService
 
@@ -10,7 +17,10 @@ def init_statistics():
     with app.app_context():
         print('开始初始化统计数据...')
         try:
+            db.session.execute(db.text('DROP TABLE IF EXISTS task_statistics'))
+            db.session.commit()
             TaskService.calculate_full_statistics()
+            TaskService.reconcile_workload_counters()
             print('统计数据初始化完成！')
         except Exception as e:
             print(f'初始化失败: {str(e)}')
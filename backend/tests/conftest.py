@@ -0,0 +1,103 @@
+"""
+测试公共夹具
+每个测试使用独立的测试应用和数据库；测试配置通过子类生成，不修改 TestingConfig，
+进程内缓存和预警索引在测试前后清空，避免测试之间互相影响
+"""
+import os
+import sys
+from datetime import datetime, timezone
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def create_test_app(database_uri='sqlite:///:memory:', monkeypatch=None):
+    """
+    创建使用指定数据库的测试应用并建表，返回已推入的应用上下文
+    :param monkeypatch: 传入时配置登记在测试结束后撤销；子进程中不传，随进程退出释放
+    """
+    import app.models  # noqa: F401
+    import app.models.task_statistics  # noqa: F401
+    import app.models.task_attachment  # noqa: F401
+    import app.models.scheduler_lease  # noqa: F401
+    from app import create_app, db
+    from config import TestingConfig, config
+
+    config_name = f'testing:{database_uri}'
+    test_config = type('TestConfig', (TestingConfig,), {'SQLALCHEMY_DATABASE_URI': database_uri})
+    if monkeypatch:
+        monkeypatch.setitem(config, config_name, test_config)
+    else:
+        config[config_name] = test_config
+
+    application = create_app(config_name)
+    ctx = application.app_context()
+    ctx.push()
+    db.create_all()
+    return application, ctx
+
+
+def reset_process_state():
+    """清空进程内缓存、统计快照和预警索引"""
+    from app.services.search_service import _index_available
+    from app.services.task_service import task_count_cache, user_queue_cache, statistics_snapshot
+    from app.services.user_service import user_cache
+    from app.services.warning_service import WarningService
+
+    task_count_cache.clear()
+    user_queue_cache.clear()
+    user_cache.clear()
+    statistics_snapshot['current'] = None
+    _index_available.clear()
+    WarningService.unload_deadlines()
+
+
+@pytest.fixture
+def app(monkeypatch):
+    """内存数据库测试应用"""
+    from app import db
+
+    reset_process_state()
+    application, ctx = create_test_app(monkeypatch=monkeypatch)
+    yield application
+    db.session.remove()
+    db.engine.dispose()
+    ctx.pop()
+    reset_process_state()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def users(app):
+    """管理员和两个普通用户，返回 {'admin': id, 'alice': id, 'bob': id}"""
+    from app import db
+    from app.models.user import User
+
+    now = datetime.now(timezone.utc)
+    result = {}
+    for index, name in enumerate(['admin', 'alice', 'bob']):
+        user = User(um_code=f'UM{index:04d}', name=name, email=f'{name}@example.com',
+                    is_admin=name == 'admin', is_active=True, created_at=now)
+        user.set_password('password')
+        db.session.add(user)
+        db.session.flush()
+        result[name] = user.id
+    db.session.commit()
+    return result
+
+
+@pytest.fixture
+def auth_headers(app, users):
+    """按用户名生成请求头，如 auth_headers('alice')"""
+    from flask_jwt_extended import create_access_token
+
+    def make(name):
+        return {'Authorization': f'Bearer {create_access_token(identity=str(users[name]))}'}
+    return make
@@ -0,0 +1,120 @@
+"""
+批量创建和批量流转测试
+atomic 为 true 时任一失败整批不处理，否则部分成功并返回逐条错误
+"""
+from app import db
+
+
+def task_count():
+    from app.models.task import Task
+
+    return db.session.query(Task.id).count()
+
+
+def bulk_create(client, headers, items, atomic=False):
+    return client.post('/api/tasks/bulk', headers=headers, json={'tasks': items, 'atomic': atomic})
+
+
+def test_bulk_create_partial_failure(client, users, auth_headers):
+    from app.models.task_transfer import TaskTransfer
+
+    items = [
+        {'title': '任务A', 'category': '普通任务', 'current_handler_id': users['bob']},
+        {'title': '缺少处理人', 'category': '普通任务'},
+        {'title': '任务B', 'category': '紧急任务', 'current_handler_id': str(users['alice'])},
+        {'title': '未知分类', 'category': '不存在', 'current_handler_id': users['bob']},
+        {'title': '处理人不存在', 'category': '普通任务', 'current_handler_id': 9999},
+    ]
+    response = bulk_create(client, auth_headers('alice'), items)
+    assert response.status_code == 200
+    data = response.get_json()['data']
+
+    assert [item['index'] for item in data['created']] == [0, 2]
+    assert [error['index'] for error in data['errors']] == [1, 3, 4]
+    assert task_count() == 2
+    assert db.session.query(TaskTransfer).filter_by(transfer_type='创建').count() == 2
+
+
+def test_bulk_create_atomic_failure_creates_nothing(client, users, auth_headers):
+    items = [
+        {'title': '任务A', 'category': '普通任务', 'current_handler_id': users['bob']},
+        {'title': '时间错误', 'category': '普通任务', 'current_handler_id': users['bob'],
+         'expected_start_time': '2026-01-02T00:00:00', 'expected_end_time': '2026-01-01T00:00:00'},
+    ]
+    response = bulk_create(client, auth_headers('alice'), items, atomic=True)
+    assert response.status_code == 400
+    assert response.get_json()['data']['errors'] == [{'index': 1, 'message': '期望完成时间必须大于期望开始时间'}]
+    assert task_count() == 0
+
+    response = bulk_create(client, auth_headers('alice'), items[:1], atomic=True)
+    assert response.status_code == 200
+    assert task_count() == 1
+
+
+def test_bulk_create_rejects_bad_payload(client, auth_headers):
+    headers = auth_headers('alice')
+    assert bulk_create(client, headers, []).status_code == 400
+    assert bulk_create(client, headers, [{}] * 501).status_code == 400
+
+
+def create_tasks(client, users, auth_headers, count=3):
+    items = [{'title': f'任务{i}', 'category': '普通任务', 'current_handler_id': users['bob']} for i in range(count)]
+    data = bulk_create(client, auth_headers('alice'), items).get_json()['data']
+    return [item['id'] for item in data['created']]
+
+
+def bulk_transition(client, headers, action, **payload):
+    return client.post(f'/api/tasks/bulk/{action}', headers=headers, json=payload)
+
+
+def statuses(task_ids):
+    from app.models.task import Task
+
+    db.session.expire_all()
+    return [db.session.get(Task, task_id).status for task_id in task_ids]
+
+
+def test_bulk_transition_partial_failure(client, users, auth_headers):
+    task_ids = create_tasks(client, users, auth_headers)
+    headers = auth_headers('bob')
+    assert bulk_transition(client, headers, 'close', task_ids=[task_ids[2]]).status_code == 200
+
+    response = bulk_transition(client, headers, 'complete', task_ids=task_ids + [9999])
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    assert data['updated'] == task_ids[:2]
+    assert {error['task_id'] for error in data['errors']} == {task_ids[2], 9999}
+    assert statuses(task_ids) == ['已完成', '已完成', '关闭']
+
+
+def test_bulk_transition_atomic_failure_updates_nothing(client, users, auth_headers):
+    task_ids = create_tasks(client, users, auth_headers)
+
+    # alice 不是处理人也不是管理员，无权完成；atomic 时整批不处理
+    response = bulk_transition(client, auth_headers('alice'), 'complete', task_ids=task_ids, atomic=True)
+    assert response.status_code == 400
+    assert len(response.get_json()['data']['errors']) == 3
+    assert statuses(task_ids) == ['新建'] * 3
+
+    response = bulk_transition(client, auth_headers('admin'), 'transfer', task_ids=task_ids,
+                               target_user_id=str(users['alice']), atomic=True)
+    assert response.status_code == 200
+    assert response.get_json()['data']['updated'] == task_ids
+    assert statuses(task_ids) == ['待响应'] * 3
+
+
+def test_bulk_transition_validates_types(client, users, auth_headers):
+    task_ids = create_tasks(client, users, auth_headers, count=1)
+    headers = auth_headers('bob')
+
+    for target_user_id in (True, 'abc', 1.5, '-1', [users['alice']]):
+        response = bulk_transition(client, headers, 'transfer', task_ids=task_ids, target_user_id=target_user_id)
+        assert response.status_code == 400
+        assert response.get_json()['message'] == 'target_user_id参数格式错误'
+    assert bulk_transition(client, headers, 'transfer', task_ids=task_ids).get_json()['message'] == '请指定流转目标用户'
+
+    for bad_ids in ([True], ['1'], [1.0]):
+        response = bulk_transition(client, headers, 'complete', task_ids=bad_ids)
+        assert response.status_code == 400
+        assert response.get_json()['message'] == 'task_ids参数格式错误'
+    assert statuses(task_ids) == ['新建']
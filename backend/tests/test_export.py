@@ -0,0 +1,42 @@
+"""
+导出格式测试
+CSV公式注入转义，XLSX控制字符和公式文本处理
+"""
+from datetime import datetime, timezone
+
+COLUMNS = [('title', '标题'), ('content', '内容'), ('progress', '进度'), ('created_at', '时间')]
+
+
+def test_csv_escapes_formula_prefixes(app):
+    from app.services.export_service import ExportService
+
+    rows = [
+        {'title': '=HYPERLINK("http://x")', 'content': '@SUM(A1)', 'progress': -5,
+         'created_at': datetime(2026, 1, 1, tzinfo=timezone.utc)},
+        {'title': '+1', 'content': '-1', 'progress': 0, 'created_at': None},
+        {'title': '\t=1', 'content': '普通文本 = 1', 'progress': 1, 'created_at': None},
+    ]
+    lines = ''.join(ExportService.stream_csv(iter(rows), COLUMNS)).lstrip('﻿').splitlines()
+
+    assert lines[1] == '"\'=HYPERLINK(""http://x"")",\'@SUM(A1),-5,2026-01-01T00:00:00+00:00'
+    assert lines[2] == "'+1,'-1,0,"
+    assert lines[3] == "'\t=1,普通文本 = 1,1,"
+
+
+def test_xlsx_strips_illegal_characters_and_keeps_formulas_as_text(app):
+    import os
+
+    from openpyxl import load_workbook
+
+    from app.services.export_service import ExportService
+
+    rows = [{'title': '=1+1', 'content': '控制\x01字符\x1b', 'progress': -5,
+             'created_at': datetime(2026, 1, 1, tzinfo=timezone.utc)}]
+    path = ExportService.write_xlsx(iter(rows), COLUMNS, 'tasks')
+    try:
+        cells = list(load_workbook(path).active.iter_rows(min_row=2))[0]
+        assert [(cell.value, cell.data_type) for cell in cells[:3]] == \
+            [('=1+1', 's'), ('控制字符', 's'), (-5, 'n')]
+        assert cells[3].value == datetime(2026, 1, 1)
+    finally:
+        os.remove(path)
@@ -0,0 +1,91 @@
+"""
+周期任务生成测试
+停机补建、重复执行的幂等性，以及单个规则插入失败时不影响其他规则
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+
+@pytest.fixture
+def now():
+    return datetime.now(timezone.utc).replace(minute=30, second=0, microsecond=0)
+
+
+def create_rule(users, now, title, catch_up=True, missed_hours=5):
+    """每小时整点执行的规则，next_run_at 回拨 missed_hours 小时模拟停机"""
+    from app import db
+    from app.services.recurrence_service import RecurrenceService
+
+    recurrence = RecurrenceService.create_recurrence({
+        'title': title, 'rule': '0 * * * *', 'current_handler_id': users['bob'],
+        'dtstart': (now - timedelta(days=1)).isoformat(), 'catch_up': catch_up,
+    }, users['alice'])
+    recurrence.next_run_at = now.replace(minute=0) - timedelta(hours=missed_hours - 1)
+    db.session.commit()
+    return recurrence.id
+
+
+def generated(recurrence_id):
+    from app.models.task import Task
+
+    return Task.query.filter_by(recurrence_id=recurrence_id).order_by(Task.scheduled_at).all()
+
+
+def test_catch_up_and_latest_only(users, now):
+    from app import db
+    from app.models.task_recurrence import TaskRecurrence
+    from app.services.recurrence_service import RecurrenceService
+
+    all_runs = create_rule(users, now, '逐次补建')
+    latest_only = create_rule(users, now, '只补建最近一次', catch_up=False)
+
+    assert RecurrenceService.generate_due(now) == 6
+
+    tasks = generated(all_runs)
+    assert len(tasks) == 5
+    assert [task.scheduled_at.hour for task in tasks] == \
+        [(now - timedelta(hours=hours)).hour for hours in range(4, -1, -1)]
+    assert len(generated(latest_only)) == 1
+    assert generated(latest_only)[0].scheduled_at == tasks[-1].scheduled_at
+
+    recurrence = db.session.get(TaskRecurrence, all_runs)
+    assert recurrence.next_run_at == (now.replace(minute=0) + timedelta(hours=1)).replace(tzinfo=None)
+
+
+def test_generate_is_idempotent(users, now):
+    from app.services.recurrence_service import RecurrenceService
+
+    recurrence_id = create_rule(users, now, '重复执行')
+    assert RecurrenceService.generate_due(now) == 5
+    assert RecurrenceService.generate_due(now) == 0
+    assert RecurrenceService.generate_due(now + timedelta(minutes=10)) == 0
+    assert len(generated(recurrence_id)) == 5
+
+
+def test_conflicting_rule_does_not_block_others(users, now):
+    from app import db
+    from app.models.task_recurrence import TaskRecurrence
+    from app.services.recurrence_service import RecurrenceService
+    from app.services.task_service import TaskService
+
+    conflicting = create_rule(users, now, '已生成', missed_hours=2)
+    RecurrenceService.generate_due(now)
+    # 规则的 next_run_at 回到生成前（例如其他进程的旧写入），再次生成会违反唯一约束
+    recurrence = db.session.get(TaskRecurrence, conflicting)
+    recurrence.next_run_at = now.replace(minute=0) - timedelta(hours=1)
+    db.session.commit()
+    other = create_rule(users, now, '正常规则', missed_hours=1)
+    totals = TaskService.get_statistics_from_cache()
+
+    assert RecurrenceService.generate_due(now) == 1
+
+    assert len(generated(conflicting)) == 2
+    assert len(generated(other)) == 1
+    recurrence = db.session.get(TaskRecurrence, conflicting, populate_existing=True)
+    assert recurrence.next_run_at == (now.replace(minute=0) + timedelta(hours=1)).replace(tzinfo=None)
+
+    # 放弃的任务不计入统计增量
+    assert TaskService.get_statistics_from_cache()['total'] == totals['total'] + 1
+    TaskService.calculate_full_statistics()
+    assert TaskService.get_statistics_from_cache()['total'] == totals['total'] + 1
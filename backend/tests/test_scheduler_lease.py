@@ -0,0 +1,151 @@
+"""
+调度器租约多进程测试（SQLite文件数据库）
+
+启动多个进程，每个进程都启动调度器并注册同一个测试任务（每次执行写入一行执行记录）：
+  - 无租约：每个进程都执行，同一周期的任务被执行多次（对照组，证明校验能够发现重复执行）
+  - 有租约：只有持有租约的进程执行；运行中强制结束主进程(SIGKILL)，租约过期后由其他进程以新令牌接管
+
+用法（在 backend 目录下执行）:
+    python -m pytest tests/test_scheduler_lease.py
+"""
+import multiprocessing
+import os
+import signal
+import time
+
+import pytest
+
+from conftest import create_test_app
+
+WORKERS = 4
+INTERVAL = 0.5
+TTL = 3
+
+pytestmark = pytest.mark.skipif(not hasattr(signal, 'SIGKILL'), reason='需要 SIGKILL')
+
+RUNS_TABLE = 'CREATE TABLE lease_test_runs (id INTEGER PRIMARY KEY, pid INTEGER, token INTEGER, ran_at REAL)'
+
+
+def record_run():
+    """测试任务：写入一行执行记录"""
+    from app import db
+    from app.services.lease_service import lease_state
+
+    db.session.execute(db.text('INSERT INTO lease_test_runs (pid, token, ran_at) VALUES (:pid, :token, :ran_at)'), {
+        'pid': os.getpid(), 'token': lease_state['token'], 'ran_at': time.time()
+    })
+    db.session.commit()
+    return 1
+
+
+def worker(path, duration, leader_only):
+    """子进程：启动调度器，注册租约续约任务和测试任务"""
+    application, _ = create_test_app(f'sqlite:///{path}')
+    application.config['SCHEDULER_LEASE_TTL'] = TTL
+
+    from app import scheduler
+    from app.services.scheduler_service import add_job, add_lease_job
+
+    add_lease_job(application)
+    add_job(application, record_run, 'lease_test', leader_only=leader_only, trigger='interval', seconds=INTERVAL)
+    scheduler.start()
+    time.sleep(duration)
+    # 不等待执行中的任务：shutdown(wait=True) 持有任务存储锁等待任务结束，续约任务成为主进程时注册任务会互相等待
+    scheduler.shutdown(wait=False)
+
+
+def run_workers(monkeypatch, path, duration, leader_only, kill_after=None):
+    """
+    启动全部进程，等待结束后返回按时间排序的执行记录
+    :param kill_after: 首次获得租约后多少秒强制结束持有租约的进程
+    :return: (执行记录[(pid, token, ran_at)], 被结束的进程号, 被结束时的令牌)
+    """
+    _, ctx = create_test_app(f'sqlite:///{path}', monkeypatch)
+
+    from app import db
+    from app.models.scheduler_lease import SchedulerLease
+
+    db.session.execute(db.text(RUNS_TABLE))
+    db.session.commit()
+
+    spawn = multiprocessing.get_context('spawn')
+    processes = [spawn.Process(target=worker, args=(path, duration, leader_only)) for _ in range(WORKERS)]
+    for process in processes:
+        process.start()
+
+    killed = killed_token = None
+    try:
+        if kill_after:
+            # 等到某个进程获得租约后再计时
+            lease = None
+            while lease is None and any(process.is_alive() for process in processes):
+                time.sleep(0.1)
+                db.session.rollback()
+                lease = db.session.get(SchedulerLease, 'scheduler')
+            assert lease is not None, '没有进程获得调度器租约'
+
+            time.sleep(kill_after)
+            db.session.rollback()
+            lease = db.session.get(SchedulerLease, 'scheduler', populate_existing=True)
+            killed, killed_token = int(lease.owner.split(':')[1]), lease.token
+            os.kill(killed, signal.SIGKILL)
+
+        for process in processes:
+            process.join(duration + 30)
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.kill()
+
+    db.session.rollback()
+    runs = db.session.execute(db.text('SELECT pid, token, ran_at FROM lease_test_runs ORDER BY ran_at')).fetchall()
+    db.session.remove()
+    db.engine.dispose()
+    ctx.pop()
+    return [tuple(run) for run in runs], killed, killed_token
+
+
+def count_duplicates(runs):
+    """相邻两次执行间隔小于半个周期视为同一周期的重复执行"""
+    return sum(1 for previous, current in zip(runs, runs[1:]) if current[2] - previous[2] < INTERVAL / 2)
+
+
+def test_without_lease_every_worker_runs(tmp_path, monkeypatch):
+    """对照组：不受租约限制时多个进程重复执行同一任务"""
+    runs, _, _ = run_workers(monkeypatch, str(tmp_path / 'lease.db'), duration=5, leader_only=False)
+
+    assert len({pid for pid, _, _ in runs}) > 1
+    assert count_duplicates(runs) > 0
+
+
+def test_lease_single_executor_and_takeover(tmp_path, monkeypatch):
+    """有租约时同一时刻只有一个进程执行，主进程被强制结束后由其他进程以新令牌接管"""
+    runs, killed, killed_token = run_workers(monkeypatch, str(tmp_path / 'lease.db'), duration=12,
+                                             leader_only=True, kill_after=3)
+
+    assert runs, '主进程没有执行任务'
+    assert count_duplicates(runs) == 0
+
+    # 每个令牌只属于一个进程，令牌随时间单调不减
+    owners = {}
+    for pid, token, _ in runs:
+        assert token is not None
+        owners.setdefault(token, set()).add(pid)
+    assert all(len(pids) == 1 for pids in owners.values()), owners
+    assert all(previous[1] <= current[1] for previous, current in zip(runs, runs[1:]))
+
+    # 不同进程的执行时间段互不重叠
+    spans = {}
+    for pid, _, ran_at in runs:
+        start, end = spans.get(pid, (ran_at, ran_at))
+        spans[pid] = (min(start, ran_at), max(end, ran_at))
+    ordered = sorted(spans.values())
+    assert all(current[0] > previous[1] for previous, current in zip(ordered, ordered[1:]))
+
+    # 被结束的主进程执行过任务，之后由其他进程以更大的令牌接管，接管间隔不超过两个租约时长
+    killed_runs = [ran_at for pid, _, ran_at in runs if pid == killed]
+    assert killed_runs
+    following = [(pid, token, ran_at) for pid, token, ran_at in runs if ran_at > max(killed_runs)]
+    assert following, '主进程被结束后没有其他进程接管'
+    assert all(pid != killed and token > killed_token for pid, token, _ in following)
+    assert following[0][2] - max(killed_runs) < 2 * TTL
@@ -0,0 +1,73 @@
+"""
+全文搜索测试
+索引只包含去除标签后的描述；短检索词退化为LIKE匹配
+"""
+from datetime import datetime
+
+import pytest
+
+from app import db
+from app.services.search_service import SearchService
+
+
+def insert_task(users, title, description):
+    from app.models.task import Task
+
+    now = datetime(2026, 1, 1, 12, 0)
+    db.session.execute(Task.__table__.insert(), [{
+        'title': title, 'category': '普通任务', 'description': description,
+        'status': '新建', 'progress': 0, 'time_progress': 0,
+        'creator_id': users['alice'], 'current_handler_id': users['bob'],
+        'created_at': now, 'updated_at': now,
+    }])
+    db.session.commit()
+    return db.session.query(Task.id).filter(Task.title == title).scalar()
+
+
+@pytest.fixture
+def search_index(users):
+    """写入一个任务后重建索引，之后的任务由触发器同步"""
+    task_id = insert_task(users, '登录页面改版',
+                          '<p class="highlight-box"><a href="https://example.com/wiki">需求文档</a>已确认</p>')
+    SearchService.rebuild_index()
+    return task_id
+
+
+def hit_ids(keyword):
+    return [hit['id'] for hit in SearchService.search(keyword)]
+
+
+def test_markup_is_not_indexed(users, search_index):
+    assert hit_ids('需求文档') == [search_index]
+    assert hit_ids('highlight') == []
+    assert hit_ids('example.com') == []
+
+    # 触发器写入的任务同样只索引纯文本
+    task_id = insert_task(users, '导出报表', '<span style="color:red">按月统计</span>')
+    assert hit_ids('按月统计') == [task_id]
+    assert hit_ids('color') == []
+
+
+def test_update_and_delete_keep_index_in_sync(users, search_index):
+    from app.models.task import Task
+
+    db.session.execute(Task.__table__.update().where(Task.id == search_index)
+                       .values(description='<div>接口联调完成</div>'))
+    db.session.commit()
+    assert hit_ids('需求文档') == []
+    assert hit_ids('接口联调') == [search_index]
+
+    db.session.execute(Task.__table__.delete().where(Task.id == search_index))
+    db.session.commit()
+    assert hit_ids('接口联调') == []
+
+
+def test_short_terms_fall_back_to_like(users, search_index):
+    assert SearchService.build_match_query('文档') is None
+
+    hits = SearchService.search('文档')
+    assert [hit['id'] for hit in hits] == [search_index]
+    assert hits[0]['rank'] is None and hits[0]['snippet'] is None
+
+    # 退化查询同样按纯文本匹配，不会命中标签
+    assert hit_ids('p') == []
@@ -0,0 +1,103 @@
+"""
+任务计数器测试
+全局统计和人员工作量计数与任务表一致；按任务表重置计数时锁住计数器
+"""
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from conftest import create_test_app
+
+
+def read_counters(counter_types):
+    """{(计数类型, 计数键): 计数}，忽略计数为0的行"""
+    from app import db
+    from app.models.task_statistics import TaskCounter
+
+    rows = db.session.query(TaskCounter.counter_type, TaskCounter.counter_key, TaskCounter.count).filter(
+        TaskCounter.counter_type.in_(counter_types)
+    ).all()
+    return {(counter_type, key): count for counter_type, key, count in rows if count}
+
+
+def create_tasks(users, count=4):
+    from app.services.task_service import TaskService
+
+    end = datetime.now(timezone.utc) + timedelta(days=1)
+    return [TaskService.create_task(f'任务{i}', TaskService.CATEGORIES[i % 2], '', users['alice'],
+                                    users['bob'], end - timedelta(days=2), end).id for i in range(count)]
+
+
+def test_reconcile_workload_counters(users):
+    from app import db
+    from app.models.task_statistics import TaskCounter
+    from app.services.task_service import TaskService
+
+    task_ids = create_tasks(users)
+    TaskService.respond_task(task_ids[0], users['bob'])
+    TaskService.complete_task(task_ids[1], users['bob'])
+    expected = read_counters(TaskService.WORKLOAD_COUNTER_TYPES)
+
+    # 人为造成计数偏差：5分钟统计任务只重置全局统计，工作量计数由每日校正修复
+    TaskCounter.set_counts('handler_status', {f'{users["bob"]}:新建': 99})
+    db.session.commit()
+    TaskService.calculate_full_statistics()
+    assert read_counters(['handler_status']) == {('handler_status', f'{users["bob"]}:新建'): 99}
+
+    TaskService.reconcile_workload_counters()
+    assert read_counters(TaskService.WORKLOAD_COUNTER_TYPES) == expected
+
+
+def test_lock_counters_blocks_concurrent_deltas(tmp_path, monkeypatch):
+    from app import db
+    from app.models.task_statistics import TaskCounter
+    from app.services.task_service import TaskService
+
+    path = tmp_path / 'counters.db'
+    _, ctx = create_test_app(f'sqlite:///{path}', monkeypatch)
+    other = sqlite3.connect(path, timeout=0.1)
+    insert = "INSERT INTO task_counters (counter_type, counter_key, count, updated_at) " \
+             "VALUES ('overview', 'total', 1, '2026-01-01 00:00:00')"
+    try:
+        TaskCounter.lock_counters(TaskService.OVERVIEW_COUNTER_TYPES)
+        with pytest.raises(sqlite3.OperationalError):
+            other.execute(insert)
+        db.session.commit()
+
+        other.execute(insert)
+        other.commit()
+    finally:
+        other.close()
+        db.session.remove()
+        db.engine.dispose()
+        ctx.pop()
+
+
+def test_counters_match_tasks_after_transitions(client, users, auth_headers):
+    """单个和批量流转后，增量维护的计数与按任务表重新统计的结果一致"""
+    from app.services.task_service import TaskService
+
+    counter_types = TaskService.OVERVIEW_COUNTER_TYPES + TaskService.WORKLOAD_COUNTER_TYPES
+    task_ids = create_tasks(users, count=6)
+    response = client.post('/api/tasks/bulk', headers=auth_headers('alice'), json={'tasks': [
+        {'title': '批量任务', 'category': '紧急任务', 'current_handler_id': users['alice']}
+    ]})
+    assert response.status_code == 200
+
+    TaskService.respond_task(task_ids[0], users['bob'])
+    TaskService.suspend_task(task_ids[0], users['bob'])
+    TaskService.transfer_task(task_ids[1], users['bob'], users['alice'])
+    TaskService.respond_task(task_ids[1], users['alice'])
+    TaskService.complete_task(task_ids[1], users['alice'])
+    TaskService.close_task(task_ids[2], users['bob'])
+    TaskService.bulk_transition('transfer', task_ids[3:], users['admin'], target_user_id=users['alice'])
+    TaskService.bulk_transition('complete', task_ids[3:5], users['alice'])
+    TaskService.bulk_transition('close', task_ids[4:], users['admin'])
+
+    incremental = read_counters(counter_types)
+    assert incremental[('overview', 'total')] == 7
+
+    TaskService.calculate_full_statistics()
+    TaskService.reconcile_workload_counters()
+    assert read_counters(counter_types) == incremental
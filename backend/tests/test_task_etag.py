@@ -0,0 +1,80 @@
+"""
+任务列表和紧急任务ETag测试
+ETag由规范化后的请求参数和任务列表版本号生成，条件请求不扫描任务表
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event
+
+
+@pytest.fixture
+def task_id(client, users, auth_headers):
+    end = datetime.now(timezone.utc) + timedelta(hours=2)
+    response = client.post('/api/tasks', headers=auth_headers('alice'), json={
+        'title': '版本发布检查', 'category': '普通任务', 'current_handler_id': users['bob'],
+        'expected_start_time': (end - timedelta(days=1)).isoformat(), 'expected_end_time': end.isoformat(),
+    })
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['data']['id']
+
+
+def get_etag(client, headers, url):
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    return response.headers['ETag'].strip('"')
+
+
+def capture_statements(app):
+    from app import db
+
+    statements = []
+    event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    return statements
+
+
+def test_list_etag_without_scanning_tasks(app, client, auth_headers, task_id):
+    headers = auth_headers('alice')
+    etag = get_etag(client, headers, '/api/tasks?status=新建&fields=id,title')
+
+    # 参数顺序不同时ETag一致
+    assert get_etag(client, headers, '/api/tasks?fields=id,title&status=新建') == etag
+
+    statements = capture_statements(app)
+    response = client.get('/api/tasks?status=新建&fields=id,title',
+                          headers={**headers, 'If-None-Match': f'"{etag}"'})
+    assert response.status_code == 304
+    assert not [sql for sql in statements if 'FROM tasks' in sql]
+
+    # 不同的字段、分页参数生成不同的ETag
+    assert get_etag(client, headers, '/api/tasks?status=新建&fields=id') != etag
+    assert get_etag(client, headers, '/api/tasks?status=新建&fields=id,title&cursor=') != etag
+
+
+def test_list_etag_changes_with_tasks_and_names(client, users, auth_headers, task_id):
+    from app.services.user_service import UserService
+
+    headers = auth_headers('bob')
+    etag = get_etag(client, headers, '/api/tasks')
+
+    response = client.put(f'/api/tasks/{task_id}', headers=headers, json={'progress': 30})
+    assert response.status_code == 200
+    updated = get_etag(client, headers, '/api/tasks')
+    assert updated != etag
+
+    UserService.update_user(users['bob'], name='bob2')
+    assert get_etag(client, headers, '/api/tasks') != updated
+
+
+def test_urgent_etag(app, client, auth_headers, task_id):
+    headers = auth_headers('bob')
+    etag = get_etag(client, headers, '/api/tasks/urgent?hours=24')
+    assert get_etag(client, headers, '/api/tasks/urgent?hours=48') != etag
+
+    statements = capture_statements(app)
+    response = client.get('/api/tasks/urgent?hours=24', headers={**headers, 'If-None-Match': f'"{etag}"'})
+    assert response.status_code == 304
+    assert not [sql for sql in statements if 'FROM tasks' in sql]
+
+    client.post(f'/api/tasks/{task_id}/respond', headers=headers, json={})
+    assert get_etag(client, headers, '/api/tasks/urgent?hours=24') != etag
@@ -0,0 +1,125 @@
+"""
+任务列表测试
+游标分页前后翻页、总数统计方式和列投影
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+
+
+@pytest.fixture
+def task_ids(users):
+    """写入9个任务，其中3个创建时间相同；返回按 (created_at, id) 倒序排列的任务ID"""
+    from app.models.task import Task
+
+    base = datetime(2026, 1, 1, 12, 0)
+    rows = []
+    for i in range(9):
+        created_at = base + timedelta(minutes=min(i, 4))
+        rows.append({
+            'title': f'任务{i}', 'category': '普通任务' if i % 2 else '紧急任务', 'description': '',
+            'status': '新建' if i < 6 else '处理中', 'progress': 0, 'time_progress': 0,
+            'creator_id': users['alice'], 'current_handler_id': users['bob'],
+            'created_at': created_at, 'updated_at': created_at,
+        })
+    db.session.execute(Task.__table__.insert(), rows)
+    db.session.commit()
+    return [task_id for task_id, in db.session.query(Task.id).order_by(Task.created_at.desc(), Task.id.desc())]
+
+
+def get_list(client, headers, **params):
+    response = client.get('/api/tasks', headers=headers, query_string=params)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['data']
+
+
+def ids(data):
+    return [task['id'] for task in data['tasks']]
+
+
+def test_cursor_pagination_forward_and_back(client, auth_headers, task_ids):
+    headers = auth_headers('alice')
+
+    pages = []
+    data = get_list(client, headers, cursor='', per_page=4)
+    assert data['prev_cursor'] is None
+    while True:
+        pages.append(data)
+        if not data['next_cursor']:
+            break
+        data = get_list(client, headers, cursor=data['next_cursor'], per_page=4)
+
+    assert [ids(page) for page in pages] == [task_ids[:4], task_ids[4:8], task_ids[8:]]
+    assert pages[-1]['next_cursor'] is None
+    assert pages[0]['total'] is None
+
+    # 从最后一页向前翻，回到同样的页面
+    data = get_list(client, headers, cursor=pages[-1]['prev_cursor'], per_page=4)
+    assert ids(data) == task_ids[4:8]
+    data = get_list(client, headers, cursor=data['prev_cursor'], per_page=4)
+    assert ids(data) == task_ids[:4]
+    assert data['prev_cursor'] is None
+    assert ids(get_list(client, headers, cursor=data['next_cursor'], per_page=4)) == task_ids[4:8]
+
+
+def test_cursor_pages_stable_when_tasks_are_added(client, users, auth_headers, task_ids):
+    from app.services.task_service import TaskService
+
+    headers = auth_headers('alice')
+    first = get_list(client, headers, cursor='', per_page=4)
+    TaskService.create_task('新任务', '普通任务', '', users['alice'], users['bob'])
+
+    assert ids(get_list(client, headers, cursor=first['next_cursor'], per_page=4)) == task_ids[4:8]
+
+
+def test_cursor_pagination_with_filters_and_invalid_cursor(client, auth_headers, task_ids):
+    headers = auth_headers('alice')
+    data = get_list(client, headers, cursor='', per_page=2, status='处理中')
+    assert ids(data) == task_ids[:2]
+    assert ids(get_list(client, headers, cursor=data['next_cursor'], per_page=2, status='处理中')) == task_ids[2:3]
+
+    response = client.get('/api/tasks?cursor=not-a-cursor', headers=headers)
+    assert response.status_code == 400
+
+
+def test_count_modes(client, users, auth_headers, task_ids):
+    from app.services.task_service import TaskService, task_count_cache
+
+    headers = auth_headers('alice')
+    TaskService.calculate_full_statistics()
+
+    data = get_list(client, headers, per_page=2)
+    assert data['total'] == 9 and data['has_more']
+    assert get_list(client, headers, per_page=2, status='处理中')['total'] == 3
+    assert get_list(client, headers, count='estimate', category='紧急任务')['total'] == 5
+    data = get_list(client, headers, count='none', page=5, per_page=2)
+    assert data['total'] is None and not data['has_more'] and ids(data) == task_ids[8:]
+    assert get_list(client, headers, cursor='', count='exact')['total'] == 9
+
+    # 命中缓存的总数在任务变更后失效
+    hits = task_count_cache.stats()['hits']
+    assert get_list(client, headers, status='处理中')['total'] == 3
+    assert task_count_cache.stats()['hits'] == hits + 1
+    TaskService.respond_task(task_ids[-1], users['bob'])
+    assert get_list(client, headers, status='处理中')['total'] == 4
+
+    response = client.get('/api/tasks?count=all', headers=headers)
+    assert response.status_code == 400
+
+
+def test_fields_projection(client, auth_headers, task_ids):
+    from app.services.task_service import TaskService
+
+    headers = auth_headers('alice')
+    data = get_list(client, headers, cursor='', per_page=2, fields='id,title,time_progress')
+    assert [sorted(task) for task in data['tasks']] == [['id', 'time_progress', 'title']] * 2
+
+    task = get_list(client, headers, per_page=1)['tasks'][0]
+    assert sorted(task) == sorted(TaskService.LIST_FIELDS)
+    assert task['creator_name'] == 'alice' and task['current_handler_name'] == 'bob'
+
+    response = client.get('/api/tasks?fields=id,password_hash', headers=headers)
+    assert response.status_code == 400
+    assert 'password_hash' in response.get_json()['message']
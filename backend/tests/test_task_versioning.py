@@ -0,0 +1,86 @@
+"""
+任务乐观锁测试
+编辑和状态流转以 UPDATE ... WHERE version=? 完成，版本号不一致时返回409
+"""
+import pytest
+from sqlalchemy import event
+
+from app import db
+
+
+@pytest.fixture
+def task(client, users, auth_headers):
+    response = client.post('/api/tasks', headers=auth_headers('alice'), json={
+        'title': '并发修改', 'category': '普通任务', 'current_handler_id': users['bob'],
+    })
+    return response.get_json()['data']
+
+
+@pytest.fixture
+def concurrent_update(app):
+    """在下一条 UPDATE tasks 执行前，模拟其他请求已提交对同一任务的修改（版本号加1）"""
+    fired = []
+
+    def bump(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('UPDATE tasks SET') and not fired:
+            fired.append(statement)
+            conn.connection.cursor().execute('UPDATE tasks SET version = version + 1')
+
+    event.listen(db.engine, 'before_cursor_execute', bump)
+    yield fired
+    event.remove(db.engine, 'before_cursor_execute', bump)
+
+
+def current_version(task_id):
+    from app.models.task import Task
+
+    db.session.expire_all()
+    return db.session.get(Task, task_id).version
+
+
+def test_edit_with_stale_version_returns_409(client, auth_headers, task):
+    headers = auth_headers('bob')
+    url = f'/api/tasks/{task["id"]}'
+
+    response = client.put(url, headers=headers, json={'progress': 10, 'version': task['version']})
+    assert response.status_code == 200
+    assert response.get_json()['data']['version'] == task['version'] + 1
+
+    response = client.put(url, headers=headers, json={'progress': 20, 'version': task['version']})
+    assert response.status_code == 409
+    assert response.get_json()['code'] == 409
+    assert current_version(task['id']) == task['version'] + 1
+
+    assert client.put(url, headers=headers, json={'progress': 20, 'version': 'x'}).status_code == 400
+
+
+def test_transition_with_stale_version_returns_409(client, auth_headers, task):
+    headers = auth_headers('bob')
+    client.put(f'/api/tasks/{task["id"]}', headers=headers, json={'progress': 10})
+
+    response = client.post(f'/api/tasks/{task["id"]}/respond', headers=headers, json={'version': task['version']})
+    assert response.status_code == 409
+
+    response = client.post(f'/api/tasks/{task["id"]}/respond', headers=headers,
+                           json={'version': task['version'] + 1})
+    assert response.status_code == 200
+    assert response.get_json()['data']['status'] == '处理中'
+
+
+def test_concurrent_edit_returns_409(client, auth_headers, task, concurrent_update):
+    response = client.put(f'/api/tasks/{task["id"]}', headers=auth_headers('bob'), json={'progress': 10})
+    assert concurrent_update
+    assert response.status_code == 409
+
+    from app.models.task import Task
+    db.session.expire_all()
+    assert db.session.get(Task, task['id']).progress == 0
+
+
+def test_concurrent_transition_returns_409(client, auth_headers, task, concurrent_update):
+    from app.models.task_transfer import TaskTransfer
+
+    response = client.post(f'/api/tasks/{task["id"]}/complete', headers=auth_headers('bob'), json={})
+    assert concurrent_update
+    assert response.status_code == 409
+    assert db.session.query(TaskTransfer).filter_by(task_id=task['id'], transfer_type='完成').count() == 0
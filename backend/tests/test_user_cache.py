@@ -0,0 +1,36 @@
+"""
+用户缓存测试
+缓存不保存密码哈希，改密后其他进程的缓存不会继续接受旧密码
+"""
+import pytest
+
+from app import db
+from app.models.user import User
+from app.services.user_service import UserService, user_cache
+
+
+def test_password_hash_is_not_cached(users):
+    UserService.get_user_by_id(users['alice'])
+    assert 'password_hash' not in user_cache.get(('id', users['alice']))
+
+
+def test_password_change_elsewhere_takes_effect_immediately(users):
+    UserService.get_user_by_id(users['alice'])
+    db.session.remove()
+
+    # 模拟其他进程改密：直接写数据库，本进程缓存未失效
+    user = db.session.get(User, users['alice'])
+    user.set_password('new-password')
+    db.session.commit()
+    db.session.remove()
+    assert user_cache.get(('id', users['alice'])) is not None
+
+    cached = UserService.get_user_by_id(users['alice'])
+    assert not cached.check_password('password')
+    assert cached.check_password('new-password')
+    db.session.remove()
+
+    with pytest.raises(ValueError, match='原密码错误'):
+        UserService.change_password(users['alice'], 'password', 'other-password')
+    assert UserService.change_password(users['alice'], 'new-password', 'other-password')
+    assert UserService.authenticate('alice@example.com', 'other-password') is not None
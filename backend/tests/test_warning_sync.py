@@ -0,0 +1,73 @@
+"""
+预警索引同步测试
+流转记录高水位只推进到早于安全时长的记录，晚提交的较小ID不会被跳过
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+
+@pytest.fixture
+def processing_tasks(app, users):
+    """两个处理中任务，返回任务ID列表"""
+    from app import db
+    from app.models.task import Task
+
+    now = datetime.now(timezone.utc)
+    tasks = [Task(title=f'任务{i}', category='普通任务', status='处理中', creator_id=users['alice'],
+                  current_handler_id=users['bob'], expected_start_time=now - timedelta(days=1),
+                  expected_end_time=now + timedelta(days=1)) for i in range(2)]
+    db.session.add_all(tasks)
+    db.session.commit()
+    return [task.id for task in tasks]
+
+
+def add_transfer(task_id, users, transfer_id, created_at):
+    from app import db
+    from app.models.task_transfer import TaskTransfer
+
+    db.session.add(TaskTransfer(id=transfer_id, task_id=task_id, operator_id=users['bob'],
+                                target_user_id=users['bob'], transfer_type='响应', created_at=created_at))
+    db.session.commit()
+
+
+def test_sync_keeps_watermark_behind_recent_transfers(users, processing_tasks):
+    from app.services.warning_service import WarningService, deadline_index, warning_state
+
+    WarningService.load_deadlines()
+    assert warning_state['transfer_id'] == 0
+    first, second = processing_tasks
+    deadline_index.clear()
+
+    # ID 2 由尚未提交的事务占用，先提交的ID 3 是最新记录
+    now = datetime.now(timezone.utc)
+    add_transfer(first, users, 1, now - timedelta(minutes=5))
+    add_transfer(first, users, 3, now)
+
+    assert WarningService.sync_deadlines(now) == 1
+    assert warning_state['transfer_id'] == 1
+    assert deadline_index.next_due() is not None
+
+    # ID 2 晚提交，下次同步仍能处理
+    add_transfer(second, users, 2, now - timedelta(seconds=1))
+    deadline_index.clear()
+    assert WarningService.sync_deadlines(now) == 2
+    assert warning_state['transfer_id'] == 1
+    assert len(deadline_index) == 2
+
+    # 超过安全时长后高水位推进到最新记录
+    later = now + WarningService.SAFETY_LAG + timedelta(seconds=1)
+    WarningService.sync_deadlines(later)
+    assert warning_state['transfer_id'] == 3
+    assert WarningService.sync_deadlines(later) == 0
+
+
+def test_load_uses_settled_watermark(users, processing_tasks):
+    from app.services.warning_service import WarningService, warning_state
+
+    now = datetime.now(timezone.utc)
+    add_transfer(processing_tasks[0], users, 1, now - timedelta(minutes=5))
+    add_transfer(processing_tasks[0], users, 2, now)
+
+    WarningService.load_deadlines()
+    assert warning_state['transfer_id'] == 1
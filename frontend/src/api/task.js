@@ -8,6 +8,14 @@ export function getTasks(params) {
   })
 }
 
+export function getTasksBatch(ids, fields) {
+  return request({
+    url: '/tasks/batch',
+    method: 'get',
+    params: { ids: ids.join(','), fields }
+  })
+}
+
 export function getTaskDetail(taskId) {
   return request({
     url: `/tasks/${taskId}`,
@@ -15,6 +23,14 @@ export function getTaskDetail(taskId) {
   })
 }
 
+export function getTaskBundle(taskId, include) {
+  return request({
+    url: `/tasks/${taskId}/bundle`,
+    method: 'get',
+    params: { include }
+  })
+}
+
 export function createTask(data) {
   return request({
     url: '/tasks',
@@ -31,10 +47,11 @@ export function transferTask(taskId, data) {
   })
 }
 
-export function respondTask(taskId) {
+export function respondTask(taskId, data) {
   return request({
     url: `/tasks/${taskId}/respond`,
-    method: 'post'
+    method: 'post',
+    data
   })
 }
 